@@ -1,14 +1,25 @@
 import streamlit as st
 import os
-import hashlib
 import pandas as pd
-import json
-import shutil
+import re
 import time
-from datetime import datetime
-from typing import List, Dict
+from typing import List, Dict, Optional
 from pathlib import Path
 
+from hashing import available_algorithms, is_cryptographic, DEFAULT_WORKERS, CONFIRM_ALGORITHM
+from chunking import DEFAULT_CHUNK_SIZE
+from hash_cache import HashCache
+from image_similarity import DEFAULT_MAX_DISTANCE, PERCEPTUAL_METHODS, images_available
+from dedup import DEDUP_MODES, dedup_groups
+from engine import DuplicateGroup, KEEPER_POLICIES, SimilarImageGroup, apply_keeper_policy, format_timestamp
+from file_mover import BatchMover, find_incomplete_journals
+from filters import BUILTIN_PROFILES, ScanFilter, delete_profile, load_profiles, parse_size, save_profile
+from jobs import JOB_STATES, JobManager, ScanJob
+from report import groups_from_report, list_reports, report_path
+from scanner import scan_files
+from verify import VERIFICATION_STATES
+from watcher import WATCH_MODES, WATCH_STATES, DuplicateWatcher
+
 def format_file_size(size_bytes: int) -> str:
     """Converte bytes para formato legível"""
     if size_bytes == 0:
@@ -20,16 +31,14 @@ def format_file_size(size_bytes: int) -> str:
         i += 1
     return f"{size_bytes:.2f} {size_names[i]}"
 
-def calculate_md5(file_path: str) -> str:
-    """Calcula hash MD5 de um arquivo"""
-    hash_md5 = hashlib.md5()
-    try:
-        with open(file_path, "rb") as f:
-            for chunk in iter(lambda: f.read(4096), b""):
-                hash_md5.update(chunk)
-        return hash_md5.hexdigest()
-    except:
-        return ""
+def format_duration(seconds: float) -> str:
+    """Converte segundos para formato legível (ex.: 1h 02min, 3min 05s)"""
+    seconds = int(seconds)
+    if seconds >= 3600:
+        return f"{seconds // 3600}h {seconds % 3600 // 60:02d}min"
+    if seconds >= 60:
+        return f"{seconds // 60}min {seconds % 60:02d}s"
+    return f"{seconds}s"
 
 def select_folder(label: str) -> str:
     """Abre diálogo para seleção de pasta usando PowerShell"""
@@ -71,47 +80,435 @@ if ($result -eq [System.Windows.Forms.DialogResult]::OK) {
         except:
             return ""
 
-class FileComparator:
-    def find_duplicates_in_folder(self, all_files: List[Dict]) -> List[Dict]:
-        """Encontra arquivos duplicados em uma pasta"""
-        duplicates = []
-        hash_groups = {}
-        
-        # Agrupar arquivos por hash
-        for file_info in all_files:
-            file_hash = file_info['hash']
-            if file_hash and file_hash != "":
-                if file_hash not in hash_groups:
-                    hash_groups[file_hash] = []
-                hash_groups[file_hash].append(file_info)
-        
-        # Identificar duplicatas
-        for file_hash, files in hash_groups.items():
-            if len(files) > 1:
-                # Ordenar por data de modificação (mais antigo primeiro)
-                files.sort(key=lambda x: x['modified_time'])
-                original_file = files[0]  # Mais antigo = original
-                
-                for duplicate_file in files[1:]:  # Demais = duplicados
-                    duplicates.append({
-                        'file_name': original_file['name'],
-                        'file_size': original_file['size'],
-                        'hash': file_hash,
-                        'original_file': original_file['path'],
-                        'duplicate_file': duplicate_file['path'],
-                        'original_date': datetime.fromtimestamp(original_file['modified_time']).strftime('%Y-%m-%d %H:%M:%S'),
-                        'duplicate_date': datetime.fromtimestamp(duplicate_file['modified_time']).strftime('%Y-%m-%d %H:%M:%S')
-                    })
-        
-        return duplicates
+def get_file_count(folder: str, include_subdirs: bool, scan_filter: Optional[ScanFilter] = None) -> int:
+    """Conta os arquivos (filtrados) da pasta, sem guardar a listagem; recontados só se a pasta ou os filtros mudarem"""
+    key = (str(folder), include_subdirs, repr(scan_filter))
+    cached = st.session_state.get('sidebar_file_count')
+    if cached is None or cached[0] != key:
+        st.session_state.sidebar_file_count = (key, sum(1 for _ in scan_files(str(folder), include_subdirs, filters=scan_filter)))
+    return st.session_state.sidebar_file_count[1]
+
+def apply_filter_profile():
+    """Preenche os campos de filtro com as regras do perfil escolhido"""
+    rules = load_profiles().get(st.session_state.filter_profile, {})
+    scan_filter = ScanFilter.from_dict(rules)
+    st.session_state.filter_exclude = "\n".join(scan_filter.exclude)
+    st.session_state.filter_include = "\n".join(scan_filter.include)
+    st.session_state.filter_exclude_regex = "\n".join(scan_filter.exclude_regex)
+    st.session_state.filter_include_regex = "\n".join(scan_filter.include_regex)
+    st.session_state.scan_filter_extensions = ", ".join(scan_filter.extensions)
+    st.session_state.scan_filter_min_size = str(scan_filter.min_size) if scan_filter.min_size else ""
+    st.session_state.scan_filter_max_size = str(scan_filter.max_size) if scan_filter.max_size is not None else ""
+
+def render_filter_options() -> Optional[ScanFilter]:
+    """Campos de filtro da barra lateral, com perfis salvos; None se alguma regra for inválida"""
+    profiles = load_profiles()
+    if st.session_state.get('filter_profile') not in [""] + list(profiles):
+        # Primeira execução (ou perfil removido): começa pelo perfil que ignora pastas de sistema
+        st.session_state.filter_profile = 'sistema'
+        apply_filter_profile()
+
+    def lines(text: str) -> List[str]:
+        return [line.strip() for line in text.splitlines() if line.strip()]
+
+    with st.sidebar.expander("🧹 Filtros da varredura"):
+        st.selectbox(
+            "Perfil", [""] + list(profiles), key="filter_profile", on_change=apply_filter_profile,
+            format_func=lambda name: name or "(nenhum)"
+        )
+        exclude = st.text_area(
+            "Ignorar (glob)", key="filter_exclude", height=100,
+            help="Um padrão por linha, comparado com o nome de arquivos e pastas (ou com o caminho relativo, se tiver '/'). "
+                 "Pastas ignoradas não são percorridas."
+        )
+        include = st.text_area("Incluir só (glob)", key="filter_include", height=68,
+                               help="Um padrão por linha; se preenchido, só arquivos cujo nome casa são analisados")
+        exclude_regex = st.text_area("Ignorar (regex)", key="filter_exclude_regex", height=68,
+                                     help="Expressões regulares buscadas no caminho relativo (separador '/'), uma por linha")
+        include_regex = st.text_area("Incluir só (regex)", key="filter_include_regex", height=68)
+        extensions = st.text_input("Extensões", key="scan_filter_extensions", help="Ex.: jpg, png, mp4 (vazio = todas)")
+        col1, col2 = st.columns(2)
+        with col1:
+            min_size = st.text_input("Tamanho mínimo", key="scan_filter_min_size", help="Ex.: 1, 4K, 1.5M")
+        with col2:
+            max_size = st.text_input("Tamanho máximo", key="scan_filter_max_size", help="Ex.: 2G (vazio = sem limite)")
 
-    def save_results(self, duplicates: List[Dict], filename: str = "duplicados_encontrados.json"):
-        """Salva resultados em arquivo JSON"""
         try:
-            with open(filename, 'w', encoding='utf-8') as f:
-                json.dump(duplicates, f, indent=2, ensure_ascii=False)
-        except Exception as e:
-            st.error(f"Erro ao salvar arquivo: {str(e)}")
+            scan_filter = ScanFilter(
+                include=lines(include), exclude=lines(exclude),
+                include_regex=lines(include_regex), exclude_regex=lines(exclude_regex),
+                extensions=[extension for extension in extensions.split(",") if extension.strip()],
+                min_size=parse_size(min_size) if min_size.strip() else 0,
+                max_size=parse_size(max_size) if max_size.strip() else None
+            )
+        except (ValueError, re.error) as e:
+            st.error(f"Filtro inválido: {str(e)}")
+            return None
+
+        profile_name = st.text_input("Salvar como perfil", placeholder="nome do perfil").strip()
+        col1, col2 = st.columns(2)
+        with col1:
+            if st.button("💾 Salvar", disabled=not profile_name):
+                try:
+                    save_profile(profile_name, scan_filter)
+                    st.success(f"Perfil '{profile_name}' salvo")
+                except (OSError, ValueError) as e:
+                    st.error(f"Erro ao salvar perfil: {str(e)}")
+        with col2:
+            selected = st.session_state.filter_profile
+            if st.button("🗑️ Remover perfil", disabled=not selected or selected in BUILTIN_PROFILES):
+                delete_profile(selected)
+                st.rerun()
+    return scan_filter
+
+def relative_to(path: str, folder: str) -> str:
+    """Caminho relativo à pasta analisada (o absoluto, se estiver em outra unidade)"""
+    try:
+        return os.path.relpath(path, folder)
+    except ValueError:
+        return path
+
+def common_folder(paths: List[str]) -> str:
+    """Pasta comum a todos os caminhos (o primeiro, se estiverem em unidades diferentes)"""
+    if not paths:
+        return ""
+    try:
+        return os.path.commonpath([os.path.abspath(path) for path in paths])
+    except ValueError:
+        return paths[0]
+
+# Ordenações disponíveis na lista de resultados: coluna e sentido
+SORT_OPTIONS = {
+    "Espaço recuperável": ('reclaimable_bytes', False),
+    "Tamanho (maior primeiro)": ('file_size', False),
+    "Tamanho (menor primeiro)": ('file_size', True),
+    "Pasta": ('folder', True),
+    "Extensão": ('extension', True),
+    "Nome": ('file_name', True),
+}
+
+def build_duplicates_dataframe(groups: List[DuplicateGroup], source_folder: str) -> pd.DataFrame:
+    """Monta o DataFrame com uma linha por grupo e as colunas derivadas usadas nos filtros"""
+    df = pd.DataFrame({
+        'file_name': [group.keeper.name for group in groups],
+        'file_size': [group.size for group in groups],
+        'file_count': [len(group.members) for group in groups],
+        'reclaimable_bytes': [group.reclaimable_bytes for group in groups],
+        'keeper_relative': [relative_to(group.keeper.path, source_folder) for group in groups],
+        'copies_relative': [
+            "; ".join(relative_to(member.path, source_folder) for member in group.copies)
+            for group in groups
+        ],
+        'verification': [VERIFICATION_STATES[group.verification] for group in groups],
+    })
+    df['file_size_formatted'] = df['file_size'].apply(format_file_size)
+    df['reclaimable_formatted'] = df['reclaimable_bytes'].apply(format_file_size)
+    df['folder'] = [os.path.dirname(path) for path in df['keeper_relative']]
+    df['extension'] = [os.path.splitext(name)[1].lower() or "(sem extensão)" for name in df['file_name']]
+    return df
+
+def filter_and_sort_duplicates(df: pd.DataFrame, name_filter: str, folder_filter: str,
+                               extensions: List[str], min_size: int, sort_by: str) -> pd.DataFrame:
+    """Aplica filtros e ordenação; o índice original é mantido para identificar cada item"""
+    mask = df['file_size'] >= min_size
+    if name_filter:
+        mask &= df['file_name'].str.contains(name_filter, case=False, regex=False)
+    if folder_filter:
+        mask &= df['folder'].str.contains(folder_filter, case=False, regex=False)
+    if extensions:
+        mask &= df['extension'].isin(extensions)
+    column, ascending = SORT_OPTIONS[sort_by]
+    return df[mask].sort_values(column, ascending=ascending, kind='stable')
+
+@st.cache_resource
+def get_job_manager() -> JobManager:
+    """Gerenciador de análises em segundo plano, único no servidor (sobrevive aos reruns e recarregamentos)"""
+    return JobManager()
+
+@st.cache_resource
+def get_watchers() -> Dict[str, DuplicateWatcher]:
+    """Monitoramentos ativos por pasta, únicos no servidor (como as análises em segundo plano)"""
+    return {}
+
+# Intervalo (segundos) de atualização do painel da análise em andamento
+JOB_POLL_INTERVAL = 0.25
+# Intervalo (segundos) de atualização automática do painel de monitoramento
+WATCH_REFRESH_INTERVAL = 2
+
+# Eventos do monitoramento exibidos no painel
+WATCH_EVENT_LABELS = {
+    'duplicate': "🆕 Duplicado",
+    'resolved': "✅ Resolvido",
+    'error': "❌ Erro de leitura",
+    'fallback': "⚠️ Consulta periódica",
+}
+
+# Descrição das etapas exibida durante a análise
+STAGE_LABELS = {
+    'scan': "Iniciando varredura",
+    'scanning': "Varrendo pastas",
+    'scanned': "Varredura concluída",
+    'head': "Hash do bloco inicial",
+    'tail': "Hash do bloco final",
+    'full': "Hash do conteúdo completo",
+    'image': "Hash perceptual das imagens",
+    'hashed': "Procurando arquivos duplicados",
+    'grouped': "Salvando resultados",
+    'chunks': "Dividindo arquivos em blocos",
+    'chunked': "Salvando resultados",
+    'verify': "Conferindo os grupos byte a byte",
+    'verified': "Conferência concluída",
+}
+
+# Nomes das etapas e contadores no painel de diagnóstico
+METRIC_LABELS = {
+    'scan': "Varredura",
+    'stat': "Consulta de metadados (stat)",
+    'snapshot': "Snapshot incremental",
+    'hash': "Hash",
+    'hash_head': "Hash do bloco inicial",
+    'hash_tail': "Hash do bloco final",
+    'hash_full': "Hash do conteúdo completo",
+    'hash_image': "Hash perceptual das imagens",
+    'hash_chunks': "Divisão em blocos",
+    'hash_verify': "Conferência byte a byte",
+    'verify': "Conferência byte a byte",
+    'reference': "Acervo de referência",
+    'group': "Agrupamento",
+    'dirs_visited': "Pastas visitadas",
+    'files_stated': "Arquivos consultados",
+    'files_hashed': "Arquivos lidos",
+    'bytes_hashed': "Bytes lidos",
+    'files_chunked': "Arquivos divididos em blocos",
+    'bytes_chunked': "Bytes divididos em blocos",
+    'groups_verified': "Grupos conferidos idênticos",
+    'groups_split': "Grupos separados na conferência",
+    'groups_unreadable': "Grupos com arquivos ilegíveis na conferência",
+    'bytes_verified': "Bytes lidos na conferência",
+    'cache_hits': "Acertos no cache",
+    'cache_misses': "Faltas no cache",
+}
+
+def render_diagnostics(metrics: Dict):
+    """Painel de diagnóstico: tempo por etapa, contadores, erros por tipo e arquivos mais lentos"""
+    with st.expander("🩺 Diagnóstico da análise"):
+        st.caption("Tempos de hash por etapa somam as leituras de todas as threads/processos")
+        col1, col2 = st.columns(2)
+        with col1:
+            st.markdown("**Tempo por etapa**")
+            st.dataframe(pd.DataFrame(
+                [{'Etapa': METRIC_LABELS.get(stage, stage), 'Segundos': round(seconds, 3)}
+                 for stage, seconds in metrics['stage_seconds'].items()]
+            ), hide_index=True, use_container_width=True)
+        with col2:
+            st.markdown("**Contadores**")
+            st.dataframe(pd.DataFrame(
+                [{'Contador': METRIC_LABELS.get(name, name),
+                  'Valor': format_file_size(value) if name == 'bytes_hashed' else str(value)}
+                 for name, value in metrics['counters'].items()]
+            ), hide_index=True, use_container_width=True)
+
+        if metrics['errors']:
+            st.markdown("**Erros de leitura (ignorados na análise)**")
+            st.write(", ".join(f"{error_type}: {count}" for error_type, count in metrics['errors'].items()))
+            st.dataframe(pd.DataFrame(metrics['error_samples']).rename(
+                columns={'path': 'Caminho', 'type': 'Tipo', 'message': 'Mensagem'}
+            ), hide_index=True, use_container_width=True)
+        else:
+            st.caption("✅ Nenhum erro de leitura")
+
+        if metrics['slowest_files']:
+            st.markdown("**Arquivos mais lentos**")
+            st.dataframe(pd.DataFrame(
+                [{'Caminho': item['path'], 'Etapa': METRIC_LABELS.get(f"hash_{item['stage']}", item['stage']),
+                  'Tamanho': format_file_size(item['size']), 'Segundos': round(item['seconds'], 3)}
+                 for item in metrics['slowest_files']]
+            ), hide_index=True, use_container_width=True)
+
+def render_chunk_analysis(analysis: Dict, source_folder: str):
+    """Pares de arquivos com blocos em comum e economia estimada de uma deduplicação por blocos"""
+    stats = analysis['stats']
+    st.subheader("🧩 Conteúdo Compartilhado")
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("Arquivos Divididos em Blocos", stats['files'])
+    with col2:
+        st.metric("Blocos Distintos", f"{stats['unique_chunks']} de {stats['chunks']}")
+    with col3:
+        st.metric("Economia por Blocos", format_file_size(stats['dedup_savings']),
+                  help="Bytes que uma deduplicação por blocos deixaria de guardar (inclui as cópias idênticas)")
+    if not analysis['pairs']:
+        st.info("ℹ️ Nenhum par de arquivos diferentes com blocos em comum")
+        return
+    st.dataframe(pd.DataFrame([
+        {'Arquivo A': relative_to(pair['path_a'], source_folder),
+         'Arquivo B': relative_to(pair['path_b'], source_folder),
+         'Em Comum': format_file_size(pair['shared_bytes']),
+         '% do Menor': pair['shared_percent']}
+        for pair in analysis['pairs']
+    ]), hide_index=True, use_container_width=True)
+
+def job_roots(job: ScanJob) -> List[str]:
+    return [job.root] if isinstance(job.root, str) else list(job.root)
+
+def finish_scan_job(job: ScanJob):
+    """Guarda o resultado de uma análise concluída no session_state e grava o relatório.
+
+    Os avisos ficam em 'scan_warnings' (nível, mensagem) e são exibidos com os
+    resultados: mostrados aqui, sumiriam no st.rerun() seguinte.
+    """
+    result = job.result
+    groups = result['groups']
+    hash_stats = result['hash_stats']
+    warnings = []
+    if hash_stats.get('cache_error'):
+        warnings.append(('warning', f"Cache de hashes indisponível ({hash_stats['cache_error']})"))
+    
+    # Um relatório por análise (JSON Lines, gravado pela análise à medida que os grupos ficam prontos)
+    if job.report_error:
+        warnings.append(('error', f"Erro ao salvar arquivo: {job.report_error}"))
+    elif job.report_path:
+        st.session_state.report_path = job.report_path
+    
+    # Armazenar no session_state para persistir (só contagens e duplicados,
+    # não a lista de arquivos analisados)
+    st.session_state.duplicate_groups = groups
+    st.session_state.pop('duplicates_df_key', None)
+    st.session_state.file_count = len(result['all_files'])
+    st.session_state.source_folder_analysis = common_folder(job_roots(job))
+    reference_root = job.scan_options.get('reference_root')
+    if reference_root:
+        # Comparação com acervo: mantém por padrão o arquivo do acervo
+        st.session_state.keeper_policy = 'preferred_folder'
+        st.session_state.preferred_folder = reference_root
+    elif job.scan_options.get('image_method'):
+        # Imagens parecidas: mantém por padrão a de maior resolução
+        st.session_state.keeper_policy = 'largest'
+    st.session_state.hash_stats = hash_stats
+    st.session_state.scan_metrics = result['metrics']
+    st.session_state.chunk_analysis = result.get('chunk_analysis')
+    st.session_state.verify_stats = result.get('verify_stats')
+    errors = sum(result['metrics']['errors'].values())
+    if errors:
+        warnings.append(('warning', f"⚠️ {errors} arquivo(s) ou pasta(s) não puderam ser lidos e foram ignorados (ver Diagnóstico)"))
+    st.session_state.scan_warnings = warnings
+    detach_scan_job(job)
+
+def detach_scan_job(job: ScanJob):
+    """Desvincula a análise da sessão e a descarta do gerenciador"""
+    st.session_state.pop('scan_job_id', None)
+    st.query_params.pop('job', None)
+    get_job_manager().remove(job.job_id)
+
+def render_scan_job(job: ScanJob):
+    """Painel ao vivo da análise em segundo plano: etapa, taxas, ETA e controles.
+
+    Os botões usam callbacks, então um clique interrompe só esta exibição; a
+    análise continua na thread e o painel é redesenhado no rerun.
+    """
+    st.header("⏳ Análise em Andamento")
+    st.info(f"**Pasta:** {', '.join(job_roots(job))}")
+    if job.scan_options.get('reference_root'):
+        st.info(f"**Acervo de referência:** {job.scan_options['reference_root']}")
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        if job.state == 'paused':
+            st.button("▶️ Retomar", on_click=job.resume)
+        else:
+            st.button("⏸️ Pausar", on_click=job.pause, disabled=job.state != 'running')
+    with col2:
+        st.button("⏹️ Cancelar", on_click=job.cancel, disabled=job.state not in ('running', 'paused'))
+    
+    progress_bar = st.progress(0.0)
+    status_text = st.empty()
+    metrics = st.empty()
+    
+    while True:
+        status = job.status()
+        if status['stage_bytes_total']:
+            progress_bar.progress(min(status['stage_bytes'] / status['stage_bytes_total'], 1.0))
+        stage_label = STAGE_LABELS.get(status['stage'], status['stage'])
+        status_text.text(f"{JOB_STATES[status['state']]} · {stage_label} · {format_duration(status['elapsed'])}")
+        with metrics.container():
+            col1, col2, col3, col4 = st.columns(4)
+            with col1:
+                st.metric("Arquivos Listados", status['files_scanned'])
+            with col2:
+                st.metric("Arquivos/s", f"{status['files_per_sec']:.0f}")
+            with col3:
+                st.metric("Leitura/s", format_file_size(status['bytes_per_sec']))
+            with col4:
+                st.metric("ETA da Etapa", format_duration(status['eta']) if status['eta'] is not None else "—")
+        if not job.active:
+            break
+        time.sleep(JOB_POLL_INTERVAL)
+    
+    if job.state == 'done':
+        finish_scan_job(job)
+        st.rerun()
+    elif job.state == 'cancelled':
+        st.warning("⏹️ Análise cancelada")
+    else:
+        st.error(f"Erro durante a análise: {job.error}")
+    detach_scan_job(job)
+
+def render_watch_status(watcher: DuplicateWatcher, folder: str):
+    """Estado, contadores e duplicados que chegaram desde o início do monitoramento"""
+    st.info(f"**{WATCH_STATES[watcher.state]}** · {WATCH_MODES[watcher.mode]} · "
+            f"desde {format_timestamp(watcher.started_at)}")
+    if watcher.error:
+        st.error(f"Erro no monitoramento: {watcher.error}")
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("Arquivos Monitorados", watcher.stats['files'])
+    with col2:
+        st.metric("Grupos de Duplicados", len(watcher.groups()))
+    with col3:
+        st.metric("Duplicados Novos", watcher.stats['duplicates'])
+    with col4:
+        st.metric("Bytes Lidos", format_file_size(watcher.stats['bytes_hashed']))
+    events = [event for event in watcher.recent_events() if event['event'] in WATCH_EVENT_LABELS]
+    if not events:
+        st.caption("Nenhum duplicado novo desde o início do monitoramento")
+        return
+    st.dataframe(pd.DataFrame([
+        {'Hora': time.strftime('%H:%M:%S', time.localtime(event['time'])),
+         'Evento': WATCH_EVENT_LABELS[event['event']],
+         'Arquivo': relative_to(event['path'], folder) if event.get('path') else event.get('message', ''),
+         'Igual a': relative_to(event.get('original') or event.get('remaining') or '', folder)
+                    if event.get('original') or event.get('remaining') else ''}
+        for event in reversed(events)
+    ]), hide_index=True, use_container_width=True)
+
+if hasattr(st, 'fragment'):
+    # Streamlit >= 1.37: só o painel é redesenhado periodicamente, sem rerun da página
+    render_watch_status = st.fragment(run_every=WATCH_REFRESH_INTERVAL)(render_watch_status)
+
+def render_watch_panel(watcher: DuplicateWatcher, folder: str):
+    """Painel do monitoramento da pasta: eventos ao vivo e controles"""
+    st.header("👁️ Monitoramento ao Vivo")
+    render_watch_status(watcher, folder)
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.button("🔄 Atualizar", key="watch_refresh")
+    with col2:
+        if st.button("📥 Abrir nos Resultados", disabled=watcher.state != 'watching',
+                     help="Carrega os grupos atuais na lista de resultados, para mover ou deduplicar as cópias"):
+            groups = watcher.groups()
+            st.session_state.duplicate_groups = groups
+            st.session_state.pop('duplicates_df_key', None)
+            st.session_state.file_count = watcher.stats['files']
+            st.session_state.source_folder_analysis = folder
+            st.session_state.hash_stats = {}
+            for key in ('scan_metrics', 'chunk_analysis', 'verify_stats', 'report_path', 'scan_warnings'):
+                st.session_state.pop(key, None)
+            st.rerun()
+    with col3:
+        if st.button("⏹️ Parar Monitoramento"):
+            watcher.stop()
+            get_watchers().pop(folder, None)
+            st.rerun()
 
 def create_delete_folder(base_path: str) -> str:
     """Cria pasta 'ArquivosDuplicados' se não existir"""
@@ -123,32 +520,6 @@ def create_delete_folder(base_path: str) -> str:
         st.error(f"Erro ao criar pasta ArquivosDuplicados: {str(e)}")
         return None
 
-def move_file_to_delete_folder(file_path: str, delete_folder: str) -> bool:
-    """Move arquivo para a pasta ArquivosDuplicados"""
-    try:
-        if not os.path.exists(file_path):
-            return False
-        
-        if not os.path.exists(delete_folder):
-            return False
-        
-        file_name = os.path.basename(file_path)
-        destination = os.path.join(delete_folder, file_name)
-        
-        # Se arquivo já existe no destino, adiciona numeração
-        counter = 1
-        original_destination = destination
-        while os.path.exists(destination):
-            name, ext = os.path.splitext(file_name)
-            destination = os.path.join(delete_folder, f"{name}_{counter}{ext}")
-            counter += 1
-        
-        shutil.move(file_path, destination)
-        return True
-    except Exception as e:
-        st.error(f"Erro ao mover arquivo {file_path}: {str(e)}")
-        return False
-
 def main():
     st.set_page_config(
         page_title="Detector de Arquivos Duplicados",
@@ -245,6 +616,104 @@ def main():
     # Configurações adicionais
     st.sidebar.subheader("Opções de Análise")
     include_subdirs = st.sidebar.checkbox("📁 Incluir subpastas", value=True, help="Analisar arquivos em subpastas também")
+    incremental_scan = st.sidebar.checkbox(
+        "⏱️ Análise incremental", value=False,
+        help="Lista apenas as pastas alteradas desde a última análise desta pasta e recalcula só os grupos afetados. "
+             "Arquivos editados sem mudar a pasta (mesmo nome) só são detectados numa análise completa."
+    )
+    extra_folders = [
+        line.strip() for line in st.sidebar.text_area(
+            "➕ Pastas adicionais", height=68,
+            help="Uma pasta por linha, analisadas junto com a pasta selecionada: duplicados entre pastas diferentes formam um mesmo grupo"
+        ).splitlines() if line.strip()
+    ]
+    reference_root = st.sidebar.text_input(
+        "🗄️ Acervo de referência",
+        help="Se informado, procura os arquivos das pastas neste acervo (arquivos já arquivados) em vez de duplicados entre elas. "
+             "O acervo é indexado uma vez e depois consultado por tamanho e hash, sem reler o conteúdo a cada análise."
+    ).strip() or None
+    image_method = None
+    image_distance = DEFAULT_MAX_DISTANCE
+    if st.sidebar.checkbox(
+        "🖼️ Buscar imagens parecidas", value=False, disabled=not images_available(),
+        help="Compara as imagens pelo hash perceptual e encontra fotos recodificadas ou redimensionadas, "
+             "não só cópias idênticas" + ("" if images_available() else " (requer os pacotes numpy e Pillow)")
+    ):
+        image_method = st.sidebar.selectbox("Método", list(PERCEPTUAL_METHODS), format_func=PERCEPTUAL_METHODS.get)
+        image_distance = st.sidebar.slider(
+            "Distância máxima (bits)", min_value=0, max_value=16, value=DEFAULT_MAX_DISTANCE,
+            help="Quantos dos 64 bits do hash podem diferir entre imagens parecidas; valores maiores encontram mais, com mais falsos positivos"
+        )
+    chunk_size = None
+    if st.sidebar.checkbox(
+        "🧩 Conteúdo parcialmente repetido", value=False,
+        help="Divide os arquivos em blocos definidos pelo conteúdo e mostra os pares que compartilham parte dos bytes "
+             "(backups, imagens de máquinas virtuais, logs que cresceram). Lê todos os arquivos por completo."
+    ):
+        chunk_size = st.sidebar.select_slider(
+            "Tamanho médio dos blocos", options=[2048, 4096, 8192, 16384, 65536], value=DEFAULT_CHUNK_SIZE,
+            format_func=format_file_size,
+            help="Blocos menores encontram trechos em comum menores, mas usam mais memória no índice"
+        )
+    verify_bytes = st.sidebar.checkbox(
+        "🔬 Conferir byte a byte", value=False,
+        help="Antes de mostrar os resultados, compara o conteúdo dos arquivos de cada grupo, bloco a bloco, "
+             "e separa os que diferem (colisão de hash ou arquivo alterado). Recomendado antes de mover ou substituir cópias."
+    )
+    scan_filter = render_filter_options()
+    use_hash_cache = st.sidebar.checkbox(
+        "💾 Usar cache de hashes", value=True,
+        help="Reaproveita hashes de arquivos que não mudaram desde a última análise"
+    )
+    hash_workers = st.sidebar.slider(
+        "⚡ Leituras simultâneas", min_value=1, max_value=32, value=DEFAULT_WORKERS,
+        help="Quantidade de arquivos lidos em paralelo no cálculo dos hashes (SSD/NVMe e rede se beneficiam de valores maiores)"
+    )
+    use_processes = st.sidebar.checkbox(
+        "🧮 Usar processos em vez de threads", value=False,
+        help="Distribui o cálculo dos hashes entre processos; útil quando a CPU é o gargalo"
+    )
+    hash_algorithm = st.sidebar.selectbox(
+        "🔐 Algoritmo de hash", available_algorithms(), index=0,
+        help="MD5 é o padrão; BLAKE2/BLAKE3/xxHash são mais rápidos quando o disco não é o gargalo"
+    )
+    confirm_algorithm = None
+    confirm_default = not is_cryptographic(hash_algorithm)
+    if st.sidebar.checkbox(
+        f"🛡️ Confirmar com {CONFIRM_ALGORITHM.upper()}", value=confirm_default,
+        help="Recalcula com hash criptográfico apenas os arquivos que colidiram no algoritmo escolhido"
+    ):
+        confirm_algorithm = CONFIRM_ALGORITHM
+    if use_hash_cache and st.sidebar.button("🧹 Limpar cache de hashes"):
+        with HashCache() as cache:
+            cache.clear()
+        st.sidebar.success("Cache de hashes limpo")
+    
+    # Relatórios anteriores: reabre os resultados sem varrer a pasta de novo
+    saved_reports = list_reports()
+    if saved_reports:
+        with st.sidebar.expander("📄 Relatórios anteriores"):
+            selected_report = st.selectbox(
+                "Relatório", saved_reports[:20], format_func=os.path.basename, label_visibility="collapsed"
+            )
+            if st.button("📂 Abrir relatório"):
+                try:
+                    loaded_groups = list(groups_from_report(selected_report))
+                except (OSError, ValueError, KeyError) as e:
+                    st.error(f"Erro ao abrir relatório: {str(e)}")
+                else:
+                    member_dirs = [member.directory for group in loaded_groups for member in group.members]
+                    st.session_state.duplicate_groups = loaded_groups
+                    st.session_state.pop('duplicates_df_key', None)
+                    st.session_state.file_count = len(member_dirs)
+                    st.session_state.source_folder_analysis = common_folder(member_dirs)
+                    st.session_state.hash_stats = {}
+                    st.session_state.pop('scan_metrics', None)
+                    st.session_state.pop('chunk_analysis', None)
+                    st.session_state.pop('verify_stats', None)
+                    st.session_state.pop('scan_warnings', None)
+                    st.session_state.report_path = selected_report
+                    st.rerun()
     
     # Usar a pasta do session state
     source_folder = st.session_state.source_folder
@@ -253,22 +722,37 @@ def main():
     folder_valid = False
     if source_folder:
         if os.path.exists(source_folder):
-            folder_valid = True
-            try:
-                if include_subdirs:
-                    file_count = sum([len(files) for r, d, files in os.walk(source_folder)])
-                else:
-                    file_count = len([f for f in os.listdir(source_folder) if os.path.isfile(os.path.join(source_folder, f))])
-                st.sidebar.info(f"📊 Aproximadamente {file_count} arquivos encontrados")
-            except:
-                pass
+            folder_valid = scan_filter is not None
+            if incremental_scan:
+                # Contar exigiria listar a pasta inteira, o que o modo incremental evita
+                st.sidebar.info("⏱️ Modo incremental: só pastas alteradas desde a última análise serão listadas")
+            elif 'duplicate_groups' not in st.session_state:
+                # Com resultados na tela, a pasta não é listada de novo
+                try:
+                    file_count = get_file_count(source_folder, include_subdirs, scan_filter)
+                    st.sidebar.info(f"📊 Aproximadamente {file_count} arquivos encontrados")
+                except:
+                    pass
         else:
             st.sidebar.error("❌ Pasta não existe")
+    for folder in extra_folders + ([reference_root] if reference_root else []):
+        if not os.path.isdir(folder):
+            st.sidebar.error(f"❌ Pasta não existe: {folder}")
+            folder_valid = False
+    if image_method and reference_root:
+        st.sidebar.error("❌ A busca por imagens parecidas não pode ser combinada com o acervo de referência")
+        folder_valid = False
+    if verify_bytes and image_method:
+        st.sidebar.error("❌ A conferência byte a byte não se aplica à busca por imagens parecidas")
+        folder_valid = False
+    if chunk_size and (image_method or reference_root):
+        st.sidebar.error("❌ A análise de conteúdo parcialmente repetido só se aplica à busca normal de duplicados")
+        folder_valid = False
 
     # PRIMEIRO: Verificar se há resultados no session_state
-    if 'duplicates' in st.session_state and 'all_files' in st.session_state and 'source_folder_analysis' in st.session_state:
-        duplicates = st.session_state.duplicates
-        all_files = st.session_state.all_files
+    if 'duplicate_groups' in st.session_state and 'file_count' in st.session_state and 'source_folder_analysis' in st.session_state:
+        groups = st.session_state.duplicate_groups
+        file_count = st.session_state.file_count
         source_folder = st.session_state.source_folder_analysis
         
         # Exibir resultados
@@ -277,169 +761,211 @@ def main():
         # Botão Nova Análise
         if st.button("🔄 Nova Análise", help="Limpar resultados e fazer nova análise"):
             # Limpar resultados do session_state
-            keys_to_delete = ['duplicates', 'all_files', 'source_folder_analysis', 'selected_individual_files']
+            keys_to_delete = ['duplicate_groups', 'file_count', 'source_folder_analysis', 'selected_groups',
+                              'hash_stats', 'sidebar_file_count', 'duplicates_df', 'duplicates_df_key', 'results_editor_version',
+                              'report_path', 'scan_metrics', 'chunk_analysis', 'verify_stats', 'scan_warnings']
             for key in keys_to_delete:
                 if key in st.session_state:
                     del st.session_state[key]
             st.rerun()
         
+        # Avisos da análise concluída (cache, relatório, arquivos ilegíveis)
+        for level, message in st.session_state.get('scan_warnings', []):
+            getattr(st, level)(message)
+        
+        removable_copies = sum(len(group.members) - 1 for group in groups)
+        reclaimable_bytes = sum(group.reclaimable_bytes for group in groups)
+        
         # Estatísticas
         st.subheader("📊 Estatísticas da Análise")
         col1, col2, col3 = st.columns(3)
         with col1:
-            st.metric("Arquivos Analisados", len(all_files))
+            st.metric("Arquivos Analisados", file_count)
         with col2:
-            if duplicates:
-                total_size = sum(dup['file_size'] for dup in duplicates)
-                st.metric("Espaço Duplicado", format_file_size(total_size))
-            else:
-                st.metric("Espaço Duplicado", "0 B")
+            st.metric("Espaço Recuperável", format_file_size(reclaimable_bytes))
         with col3:
-            unique_files = len(all_files) - len(duplicates)
+            unique_files = file_count - removable_copies
             st.metric("Arquivos Únicos", unique_files)
         
+        # Economia de leitura: só arquivos que colidem em todas as etapas são lidos por completo
+        hash_stats = st.session_state.get('hash_stats', {})
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.metric("Arquivos com Hash Completo", hash_stats.get('full_hashed', 0))
+        with col2:
+            st.metric("Bytes Lidos", format_file_size(hash_stats.get('bytes_read', 0)))
+        with col3:
+            st.metric("Leitura Evitada", format_file_size(hash_stats.get('bytes_avoided', 0)))
+        if hash_stats.get('cache_hits'):
+            st.caption(f"💾 {hash_stats['cache_hits']} hash(es) reaproveitado(s) do cache")
+        verify_stats = st.session_state.get('verify_stats')
+        if verify_stats:
+            st.caption(
+                f"🔬 Conferência byte a byte: {verify_stats['groups_verified']} de {verify_stats['groups_checked']} "
+                f"grupo(s) idênticos, {verify_stats['groups_split']} separado(s), "
+                f"{verify_stats['files_dropped']} arquivo(s) sem cópia idêntica removido(s) dos resultados, "
+                f"{verify_stats['groups_unreadable']} grupo(s) com arquivos ilegíveis (ver Diagnóstico)"
+            )
+        if st.session_state.get('report_path'):
+            st.caption(f"📄 Relatório: `{st.session_state.report_path}`")
+        if st.session_state.get('scan_metrics'):
+            render_diagnostics(st.session_state.scan_metrics)
+        if st.session_state.get('chunk_analysis'):
+            render_chunk_analysis(st.session_state.chunk_analysis, source_folder)
+        
         # Duplicados Encontrados em destaque
-        st.metric("🔍 Duplicados Encontrados", len(duplicates))
+        col1, col2 = st.columns(2)
+        with col1:
+            st.metric("🔍 Grupos de Duplicados", len(groups))
+        with col2:
+            st.metric("📄 Cópias Removíveis", removable_copies)
         
-        if duplicates:
-            st.success(f"✅ Encontrados {len(duplicates)} arquivos duplicados!")
+        if groups:
+            st.success(f"✅ Encontrados {len(groups)} grupos com {removable_copies} cópias removíveis!")
             
-            # Criar DataFrame para exibição
-            df = pd.DataFrame(duplicates)
-            df['file_size_formatted'] = df['file_size'].apply(format_file_size)
-            filtered_df = df.copy()
+            # Política do arquivo mantido em cada grupo
+            col1, col2 = st.columns(2)
+            with col1:
+                keeper_policy = st.selectbox(
+                    "📌 Manter em cada grupo", list(KEEPER_POLICIES.keys()),
+                    format_func=KEEPER_POLICIES.get, key="keeper_policy"
+                )
+            with col2:
+                preferred_folder = st.text_input(
+                    "📂 Pasta preferida", key="preferred_folder",
+                    disabled=keeper_policy != 'preferred_folder',
+                    help="Arquivos dentro desta pasta são mantidos; os demais são as cópias"
+                )
+            
+            # DataFrame montado uma vez por análise e política (não a cada rerun)
+            df_key = (keeper_policy, preferred_folder if keeper_policy == 'preferred_folder' else None)
+            if st.session_state.get('duplicates_df_key') != df_key:
+                apply_keeper_policy(groups, *df_key)
+                st.session_state.duplicates_df = build_duplicates_dataframe(groups, source_folder)
+                st.session_state.duplicates_df_key = df_key
+            df = st.session_state.duplicates_df
             
-            # Lista de Arquivos Duplicados
+            # Lista de Grupos de Duplicados
             st.subheader("📋 Lista de Arquivos Duplicados")
             
-            # Inicializar session state para seleção individual
-            if 'selected_individual_files' not in st.session_state:
-                st.session_state.selected_individual_files = {}
+            # Inicializar session state para seleção por grupo
+            if 'selected_groups' not in st.session_state:
+                st.session_state.selected_groups = {}
+            if 'results_editor_version' not in st.session_state:
+                st.session_state.results_editor_version = 0
+            selections = st.session_state.selected_groups
             
-            # Botões de seleção rápida
-            st.write("**🎯 Seleção Rápida:**")
+            # Filtros e ordenação (aplicados no servidor, antes de montar a tabela)
             col1, col2, col3 = st.columns(3)
             with col1:
-                if st.button("📄 Selecionar Todos os Duplicados", help="Seleciona todos os arquivos duplicados (recomendado)"):
-                    for idx in range(len(filtered_df)):
-                        st.session_state.selected_individual_files[f"duplicate_{idx}"] = True
-                        st.session_state.selected_individual_files[f"original_{idx}"] = False
+                name_filter = st.text_input("🔎 Nome contém", key="filter_name")
+                folder_filter = st.text_input("📂 Pasta contém", key="filter_folder")
             with col2:
-                if st.button("📁 Selecionar Todos os Originais"):
-                    for idx in range(len(filtered_df)):
-                        st.session_state.selected_individual_files[f"original_{idx}"] = True
-                        st.session_state.selected_individual_files[f"duplicate_{idx}"] = False
+                extension_filter = st.multiselect(
+                    "🏷️ Extensões", sorted(df['extension'].unique()), key="filter_extensions"
+                )
+                min_size_mb = st.number_input("📏 Tamanho mínimo (MB)", min_value=0.0, value=0.0, step=1.0, key="filter_min_size")
             with col3:
+                sort_by = st.selectbox("↕️ Ordenar por", list(SORT_OPTIONS.keys()), key="sort_by")
+                page_size = st.selectbox("📄 Itens por página", [25, 50, 100, 250], index=1, key="page_size")
+            
+            filtered_df = filter_and_sort_duplicates(
+                df, name_filter, folder_filter, extension_filter, int(min_size_mb * 1024 * 1024), sort_by
+            )
+            
+            # Botões de seleção rápida (aplicados a todos os grupos filtrados, não só à página)
+            st.write(f"**🎯 Seleção Rápida** ({len(filtered_df)} de {len(df)} grupos no filtro atual):")
+            col1, col2 = st.columns(2)
+            with col1:
+                if st.button("📄 Selecionar Todos os Duplicados", help="Marca as cópias de todos os grupos filtrados (o arquivo mantido nunca é movido)"):
+                    for idx in filtered_df.index:
+                        selections[idx] = True
+                    st.session_state.results_editor_version += 1
+            with col2:
                 if st.button("❌ Limpar Todas as Seleções"):
-                    for idx in range(len(filtered_df)):
-                        st.session_state.selected_individual_files[f"original_{idx}"] = False
-                        st.session_state.selected_individual_files[f"duplicate_{idx}"] = False
+                    for idx in filtered_df.index:
+                        selections[idx] = False
+                    st.session_state.results_editor_version += 1
             
-            st.markdown("---")
+            # Paginação: só a página atual é enviada ao navegador
+            total_pages = max(1, -(-len(filtered_df) // page_size))
+            page = st.number_input(f"Página (de {total_pages})", min_value=1, max_value=total_pages, value=1, step=1, key="results_page")
+            page_df = filtered_df.iloc[(page - 1) * page_size:page * page_size]
             
-            # Exibir grupos de arquivos duplicados
-            for idx, row in filtered_df.iterrows():
-                original_idx = filtered_df.index.get_loc(idx)
-                
-                with st.container():
-                    st.markdown(f"### 📄 {row['file_name']}")
-                    
-                    # Informações básicas
-                    col1, col2, col3 = st.columns(3)
-                    with col1:
-                        st.write(f"**Tamanho:** {format_file_size(row['file_size'])}")
-                    with col2:
-                        st.write(f"**Hash MD5:** `{row['hash'][:16]}...`")
-                    with col3:
-                        st.write(f"**Duplicados encontrados:** 2")
-                    
-                    # Arquivos lado a lado
-                    col1, col2 = st.columns(2)
-                    
-                    # Arquivo Original
-                    with col1:
-                        st.markdown("#### 📁 Arquivo Original (Mais Antigo)")
-                        original_path = row['original_file']
-                        relative_path = os.path.relpath(original_path, source_folder)
-                        
-                        st.write(f"**📍 Caminho Relativo:**")
-                        st.code(relative_path, language=None)
-                        st.write(f"**📅 Data:** {row['original_date']}")
-                        st.write(f"**📂 Pasta:** `{os.path.dirname(relative_path)}`")
-                        
-                        # Checkbox para selecionar original
-                        select_original = st.checkbox(
-                            "🚚 Selecionar para mover",
-                            key=f"select_original_{original_idx}",
-                            value=st.session_state.selected_individual_files.get(f"original_{original_idx}", False)
-                        )
-                        if select_original:
-                            st.session_state.selected_individual_files[f"original_{original_idx}"] = True
-                            st.session_state.selected_individual_files[f"duplicate_{original_idx}"] = False
-                        else:
-                            st.session_state.selected_individual_files[f"original_{original_idx}"] = False
-                    
-                    # Arquivo Duplicado
-                    with col2:
-                        st.markdown("#### 📄 Arquivo Duplicado (Mais Recente)")
-                        duplicate_path = row['duplicate_file']
-                        relative_path_dup = os.path.relpath(duplicate_path, source_folder)
-                        
-                        st.write(f"**📍 Caminho Relativo:**")
-                        st.code(relative_path_dup, language=None)
-                        st.write(f"**📅 Data:** {row['duplicate_date']}")
-                        st.write(f"**📂 Pasta:** `{os.path.dirname(relative_path_dup)}`")
-                        
-                        # Checkbox para selecionar duplicado
-                        select_duplicate = st.checkbox(
-                            "🚚 Selecionar para mover (Recomendado)",
-                            key=f"select_duplicate_{original_idx}",
-                            value=st.session_state.selected_individual_files.get(f"duplicate_{original_idx}", False)
-                        )
-                        if select_duplicate:
-                            st.session_state.selected_individual_files[f"duplicate_{original_idx}"] = True
-                            st.session_state.selected_individual_files[f"original_{original_idx}"] = False
-                        else:
-                            st.session_state.selected_individual_files[f"duplicate_{original_idx}"] = False
-                    
-                    # Botões de ação
-                    col1, col2, col3 = st.columns(3)
+            table = pd.DataFrame({
+                'mover_copias': [selections.get(idx, False) for idx in page_df.index],
+                'nome': page_df['file_name'],
+                'tamanho': page_df['file_size_formatted'],
+                'arquivos': page_df['file_count'],
+                'recuperavel': page_df['reclaimable_formatted'],
+                'mantido': page_df['keeper_relative'],
+                'copias': page_df['copies_relative'],
+                'conferencia': page_df['verification'],
+            }, index=page_df.index)
+            
+            editor_key = f"results_editor_{st.session_state.results_editor_version}_{df_key}_{page}_{page_size}_{sort_by}_{name_filter}_{folder_filter}_{extension_filter}_{min_size_mb}"
+            edited = st.data_editor(
+                table,
+                key=editor_key,
+                hide_index=True,
+                use_container_width=True,
+                disabled=['nome', 'tamanho', 'arquivos', 'recuperavel', 'mantido', 'copias', 'conferencia'],
+                column_config={
+                    'mover_copias': st.column_config.CheckboxColumn("🚚 Mover cópias", help="Move todas as cópias do grupo, mantendo o arquivo indicado"),
+                    'nome': "Nome",
+                    'tamanho': "Tamanho",
+                    'arquivos': "Arquivos",
+                    'recuperavel': "Recuperável",
+                    'mantido': "📁 Mantido",
+                    'copias': "📄 Cópias",
+                    'conferencia': st.column_config.TextColumn("🔬 Conferência", help="Se o conteúdo dos arquivos do grupo foi comparado byte a byte"),
+                }
+            )
+            
+            # Sincroniza as edições da página com a seleção
+            for idx, selected in edited['mover_copias'].items():
+                selections[idx] = bool(selected)
+            
+            # Detalhes de um grupo da página
+            if len(page_df) > 0:
+                detail_idx = st.selectbox(
+                    "🔍 Detalhes do grupo", page_df.index,
+                    format_func=lambda idx: f"{df.at[idx, 'file_name']} ({df.at[idx, 'file_count']} arquivos)",
+                    key="detail_group"
+                )
+                group = groups[detail_idx]
+                similar = isinstance(group, SimilarImageGroup)
+                if similar:
+                    st.write(f"**Hash perceptual {group.algorithm.upper()}:** `{group.digest}` | "
+                             f"**Distância máxima:** {max(group.distances)} bits")
+                else:
+                    st.write(f"**Hash {group.algorithm.upper()}:** `{group.digest[:16]}...` | **Tamanho:** {format_file_size(group.size)}")
+                for member_idx, member in enumerate(group.members):
+                    col1, col2 = st.columns([4, 1])
                     with col1:
-                        if st.button("📂 Abrir Pasta Original", key=f"open_orig_{original_idx}"):
-                            os.startfile(os.path.dirname(original_path))
+                        label = "📁 Mantido" if member_idx == group.keeper_index else "📄 Cópia"
+                        details = f" · {format_file_size(member.size)} · distância {group.distances[member_idx]}" if similar else ""
+                        st.write(f"{label} · {format_timestamp(member.modified_time)}{details} · `{relative_to(member.path, source_folder)}`")
                     with col2:
-                        if st.button("📂 Abrir Pasta Duplicado", key=f"open_dup_{original_idx}"):
-                            os.startfile(os.path.dirname(duplicate_path))
-                    with col3:
-                        if st.button("🔄 Selecionar Duplicado", key=f"auto_select_{original_idx}"):
-                            st.session_state.selected_individual_files[f"duplicate_{original_idx}"] = True
-                            st.session_state.selected_individual_files[f"original_{original_idx}"] = False
-                
-                st.markdown("---")
+                        if st.button("📂 Abrir Pasta", key=f"open_member_{detail_idx}_{member_idx}"):
+                            os.startfile(os.path.dirname(member.path))
+            
+            st.markdown("---")
             
             # Seção de movimentação
             st.subheader("🚚 Movimentação de Arquivos")
             
-            # Coletar arquivos selecionados
+            # Coletar arquivos selecionados: as cópias de cada grupo marcado
             selected_files_list = []
-            if 'selected_individual_files' in st.session_state:
-                for key, selected in st.session_state.selected_individual_files.items():
-                    if selected:
-                        file_type, idx_str = key.split('_', 1)
-                        idx = int(idx_str)
-                        if idx < len(filtered_df):
-                            row = filtered_df.iloc[idx]
-                            if file_type == 'original':
-                                file_path = row['original_file']
-                            else:
-                                file_path = row['duplicate_file']
-                            
-                            selected_files_list.append({
-                                'path': file_path,
-                                'name': row['file_name'],
-                                'size': row['file_size'],
-                                'type': file_type
-                            })
+            for idx, selected in selections.items():
+                if selected and idx < len(groups):
+                    for member in groups[idx].copies:
+                        selected_files_list.append({
+                            'path': member.path,
+                            'name': member.name,
+                            'size': member.size,
+                            'type': 'duplicate'
+                        })
             
             # Informações sobre seleções
             col1, col2 = st.columns(2)
@@ -457,27 +983,19 @@ def main():
                     delete_folder = create_delete_folder(source_folder)
                     
                     if delete_folder:
-                        moved_count = 0
-                        errors = []
-                        
                         progress_bar = st.progress(0)
                         status_text = st.empty()
                         
-                        total_files = len(selected_files_list)
+                        def update_move_progress(processed: int, total: int):
+                            progress_bar.progress(processed / total)
+                            status_text.text(f"Movendo: {processed}/{total}")
                         
-                        for i, file_info in enumerate(selected_files_list):
-                            file_to_move = file_info['path']
-                            status_text.text(f"Movendo: {file_info['name']}")
-                            
-                            if os.path.exists(file_to_move):
-                                if move_file_to_delete_folder(file_to_move, delete_folder):
-                                    moved_count += 1
-                                else:
-                                    errors.append(f"Erro ao mover: {file_info['name']}")
-                            else:
-                                errors.append(f"Arquivo não encontrado: {file_info['name']}")
-                            
-                            progress_bar.progress((i + 1) / total_files)
+                        result = BatchMover(delete_folder).move(
+                            [file_info['path'] for file_info in selected_files_list], update_move_progress
+                        )
+                        moved_count = result['moved']
+                        errors = [f"{os.path.basename(path)}: {message}" for path, message in result['errors']]
+                        st.session_state.last_move_journal = result['journal']
                         
                         progress_bar.empty()
                         status_text.empty()
@@ -486,8 +1004,9 @@ def main():
                             st.success(f"🎉 {moved_count} arquivo(s) movido(s) com sucesso para:\n`{delete_folder}`")
                             
                             # Limpar seleções
-                            if 'selected_individual_files' in st.session_state:
-                                st.session_state.selected_individual_files.clear()
+                            if 'selected_groups' in st.session_state:
+                                st.session_state.selected_groups.clear()
+                                st.session_state.results_editor_version += 1
                             
                             if st.button("📂 Abrir Pasta de Destino", key="open_dest"):
                                 os.startfile(delete_folder)
@@ -501,6 +1020,59 @@ def main():
                 else:
                     st.warning("⚠️ Nenhum arquivo selecionado para mover!")
             
+            # Deduplicação: substitui as cópias por links, liberando espaço sem mover arquivos
+            if any(isinstance(group, SimilarImageGroup) for group in groups):
+                st.info("ℹ️ Deduplicação por links não se aplica a imagens parecidas: os arquivos têm conteúdos diferentes")
+            else:
+                st.subheader("🔗 Deduplicação por Links")
+                selected_groups_list = [groups[idx] for idx, selected in selections.items() if selected and idx < len(groups)]
+                dedup_mode = st.selectbox(
+                    "Tipo de link",
+                    options=list(DEDUP_MODES),
+                    format_func=lambda mode: DEDUP_MODES[mode],
+                    help="Hardlink: as cópias passam a ser o mesmo arquivo (alterar um altera todos). "
+                         "Reflink: cada cópia continua independente, com os blocos compartilhados até ser alterada (btrfs/XFS)."
+                )
+                if st.button("🔗 Substituir Cópias por Links", disabled=not selected_groups_list,
+                             help="Confere byte a byte cada cópia e a troca, de forma atômica, por um link para o arquivo mantido"):
+                    dedup_progress = st.progress(0)
+                    result = dedup_groups(
+                        selected_groups_list, dedup_mode,
+                        lambda processed, total: dedup_progress.progress(processed / total)
+                    )
+                    dedup_progress.empty()
+                    st.success(f"✅ {result['linked']} cópia(s) substituída(s) · {format_file_size(result['bytes_reclaimed'])} liberados")
+                    if result['already_linked']:
+                        st.info(f"ℹ️ {result['already_linked']} cópia(s) já eram links do arquivo mantido")
+                    if result['cross_device']:
+                        st.info(f"ℹ️ {result['cross_device']} cópia(s) mantida(s) por estar(em) em outro sistema de arquivos; "
+                                "as demais cópias do mesmo sistema viraram links para ela")
+                    for path, message in result['errors']:
+                        st.error(f"• {path}: {message}")
+            
+            # Lotes interrompidos e desfazer a última movimentação
+            delete_folder_path = os.path.join(source_folder, "ArquivosDuplicados")
+            incomplete_journals = find_incomplete_journals(delete_folder_path) if os.path.isdir(delete_folder_path) else []
+            if incomplete_journals:
+                st.warning(f"⚠️ {len(incomplete_journals)} movimentação(ões) interrompida(s) encontrada(s)")
+                if st.button("▶️ Retomar Movimentação Interrompida", key="resume_move"):
+                    mover = BatchMover(delete_folder_path)
+                    for journal_path in incomplete_journals:
+                        result = mover.resume(journal_path)
+                        st.session_state.last_move_journal = journal_path
+                        st.success(f"✅ {result['moved']} arquivo(s) movido(s) ao retomar")
+                        for path, message in result['errors']:
+                            st.error(f"• {os.path.basename(path)}: {message}")
+            
+            last_journal = st.session_state.get('last_move_journal')
+            if last_journal and os.path.exists(last_journal):
+                if st.button("↩️ Desfazer Última Movimentação", key="undo_move"):
+                    result = BatchMover(os.path.dirname(last_journal)).undo(last_journal)
+                    st.session_state.last_move_journal = None
+                    st.success(f"✅ {result['restored']} arquivo(s) devolvido(s) à pasta de origem")
+                    for path, message in result['errors']:
+                        st.error(f"• {os.path.basename(path)}: {message}")
+            
             # Instruções
             if not selected_files_list:
                 st.info("ℹ️ **Como usar:** Marque os checkboxes '🚚 Selecionar para mover' ao lado dos arquivos que deseja mover para a pasta ArquivosDuplicados.")
@@ -522,73 +1094,63 @@ def main():
         else:
             st.info("🔍 **Modo:** Análise apenas da pasta principal")
     
+    # Análise em segundo plano desta sessão (ou da URL, após recarregar a página)
+    job_manager = get_job_manager()
+    job = job_manager.get(st.session_state.get('scan_job_id') or st.query_params.get('job'))
+    if job is None:
+        # Sessão nova: permite reconectar às análises que continuam rodando
+        for active_job in job_manager.active_jobs():
+            if st.button(f"🔌 Acompanhar análise em andamento: {', '.join(job_roots(active_job))}", key=f"attach_{active_job.job_id}"):
+                st.session_state.scan_job_id = active_job.job_id
+                st.query_params['job'] = active_job.job_id
+                st.rerun()
+    else:
+        st.session_state.scan_job_id = job.job_id
+        render_scan_job(job)
+    
+    # Monitoramento contínuo da pasta selecionada (ex.: Downloads), compartilhado entre as sessões
+    watchers = get_watchers()
+    watcher = watchers.get(str(source_folder)) if source_folder else None
+    if watcher is not None:
+        render_watch_panel(watcher, str(source_folder))
+    elif st.button("👁️ Monitorar Pasta", disabled=not folder_valid,
+                   help="Faz uma análise normal e continua acompanhando a pasta: cada arquivo que chegar e for "
+                        "cópia de outro aparece em segundos, sem nova análise completa"):
+        watchers[str(source_folder)] = DuplicateWatcher(
+            str(source_folder),
+            recursive=include_subdirs,
+            filters=scan_filter,
+            algorithm=hash_algorithm,
+            confirm_algorithm=confirm_algorithm,
+            workers=hash_workers,
+            use_cache=use_hash_cache
+        ).start()
+        st.rerun()
+    
     # Botão para iniciar análise
     if st.button("🔍 Iniciar Análise", disabled=not folder_valid, type="primary"):
         if folder_valid:
-            comparator = FileComparator()
-            
-            with st.spinner("Analisando arquivos..."):
-                progress_bar = st.progress(0)
-                status_text = st.empty()
-                
-                status_text.text("Escaneando pasta e coletando informações dos arquivos...")
-                all_files = []
-                
-                if include_subdirs:
-                    for root, dirs, files in os.walk(source_folder):
-                        for file in files:
-                            file_path = os.path.join(root, file)
-                            try:
-                                file_stat = os.stat(file_path)
-                                file_info = {
-                                    'name': file,
-                                    'path': file_path,
-                                    'size': file_stat.st_size,
-                                    'modified_time': file_stat.st_mtime,
-                                    'hash': calculate_md5(file_path)
-                                }
-                                all_files.append(file_info)
-                            except:
-                                continue
-                else:
-                    for file in os.listdir(source_folder):
-                        file_path = os.path.join(source_folder, file)
-                        if os.path.isfile(file_path):
-                            try:
-                                file_stat = os.stat(file_path)
-                                file_info = {
-                                    'name': file,
-                                    'path': file_path,
-                                    'size': file_stat.st_size,
-                                    'modified_time': file_stat.st_mtime,
-                                    'hash': calculate_md5(file_path)
-                                }
-                                all_files.append(file_info)
-                            except:
-                                continue
-                
-                progress_bar.progress(50)
-                
-                status_text.text("Procurando arquivos duplicados...")
-                duplicates = comparator.find_duplicates_in_folder(all_files)
-                progress_bar.progress(75)
-                
-                status_text.text("Salvando resultados...")
-                comparator.save_results(duplicates)
-                progress_bar.progress(100)
-                
-                # Armazenar no session_state para persistir
-                st.session_state.duplicates = duplicates
-                st.session_state.all_files = all_files
-                st.session_state.source_folder_analysis = source_folder
-                
-                status_text.text("Análise concluída!")
-                time.sleep(1)
-                progress_bar.empty()
-                status_text.empty()
-                
-                # Recarregar para mostrar os resultados
-                st.rerun()
+            # A pasta é listada pela própria análise, em streaming, sem guardar a listagem na sessão
+            job = job_manager.submit(
+                [str(source_folder)] + extra_folders if extra_folders else str(source_folder),
+                report_path=report_path(str(source_folder), 'jsonl'),
+                recursive=include_subdirs,
+                filters=scan_filter,
+                workers=hash_workers,
+                use_processes=use_processes,
+                algorithm=hash_algorithm,
+                confirm_algorithm=confirm_algorithm,
+                use_cache=use_hash_cache,
+                incremental=incremental_scan,
+                reference_root=reference_root,
+                image_method=image_method,
+                image_distance=image_distance,
+                chunk_size=chunk_size,
+                verify=verify_bytes
+            )
+            st.session_state.scan_job_id = job.job_id
+            st.query_params['job'] = job.job_id
+            st.rerun()
     
     # Rodapé
     st.markdown("---")
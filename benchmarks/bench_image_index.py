@@ -0,0 +1,75 @@
+"""Benchmark do índice de imagens parecidas: MultiIndexHash x comparação de todos os pares
+
+Uso:
+    python benchmarks/bench_image_index.py [--images 300000] [--distance 8] [--near 0.05] [--sample 2000]
+
+Gera hashes perceptuais aleatórios de 64 bits e planta variações (até
+'distance' bits trocados) de uma fração deles, simulando fotos recodificadas.
+Mede o tempo de MultiIndexHash.pairs e confere, numa amostra de hashes, que
+os pares encontrados são exatamente os da comparação de todos os pares.
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from image_similarity import MultiIndexHash, popcount64
+
+def synthetic_hashes(count: int, near_fraction: float, max_distance: int, seed: int = 42) -> np.ndarray:
+    """Hashes aleatórios, com 'near_fraction' deles sendo variações próximas de outros"""
+    rng = np.random.default_rng(seed)
+    hashes = rng.integers(0, 2 ** 63, size=count, dtype=np.uint64) * np.uint64(2) + rng.integers(0, 2, size=count, dtype=np.uint64)
+    near = int(count * near_fraction)
+    sources = rng.integers(0, count - near, size=near)
+    for offset, source in enumerate(sources):
+        flipped = rng.choice(64, size=rng.integers(0, max_distance + 1), replace=False)
+        mask = np.uint64(sum(1 << int(bit) for bit in flipped))
+        hashes[count - near + offset] = hashes[source] ^ mask
+    return hashes
+
+def brute_force_pairs(hashes: np.ndarray, queries: np.ndarray, max_distance: int) -> set:
+    """Pares (i < j) a até max_distance bits envolvendo os hashes consultados"""
+    found = set()
+    for i in queries:
+        distances = popcount64(hashes ^ hashes[i])
+        for j in np.nonzero(distances <= max_distance)[0]:
+            if j != i:
+                found.add((min(int(i), int(j)), max(int(i), int(j))))
+    return found
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--images", type=int, default=300_000)
+    parser.add_argument("--distance", type=int, default=8, help="Distância máxima de Hamming (bits)")
+    parser.add_argument("--near", type=float, default=0.05, help="Fração de hashes plantados como variações")
+    parser.add_argument("--sample", type=int, default=2000, help="Hashes conferidos contra a comparação de todos os pares")
+    args = parser.parse_args()
+
+    hashes = synthetic_hashes(args.images, args.near, args.distance)
+    index = MultiIndexHash(hashes, args.distance)
+    start = time.perf_counter()
+    first, second, distances = index.pairs()
+    elapsed = time.perf_counter() - start
+    print(f"{args.images} hashes, distância {args.distance}: {index.chunks} pedaços, raio {index.radius}")
+    print(f"pares encontrados: {len(first)}  tempo: {elapsed:.2f}s")
+
+    rng = np.random.default_rng(7)
+    queries = rng.choice(args.images, size=min(args.sample, args.images), replace=False)
+    start = time.perf_counter()
+    expected = brute_force_pairs(hashes, queries, args.distance)
+    brute_elapsed = time.perf_counter() - start
+    sampled = set(queries.tolist())
+    indexed = {(int(i), int(j)) for i, j in zip(first, second) if int(i) in sampled or int(j) in sampled}
+    estimated = brute_elapsed * args.images / len(queries) / 2
+    print(f"todos os pares (estimado para {args.images} hashes): {estimated:.1f}s")
+    print(f"amostra de {len(queries)} hashes: {len(expected)} pares esperados, "
+          f"{len(expected - indexed)} faltando, {len(indexed - expected)} a mais")
+    if expected != indexed:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""Benchmark de memória: dicionário por arquivo (formato anterior) x FileRecord
+
+Uso:
+    python benchmarks/bench_memory.py [--files 200000] [--files-per-dir 50]
+
+Os registros são sintéticos (sem acesso ao disco) e a memória é medida com
+tracemalloc, incluindo as strings de nome e caminho de cada arquivo.
+"""
+import argparse
+import gc
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scanner import FileRecord
+
+def synthetic_entries(count: int, files_per_dir: int):
+    """Gera (diretório, nome, tamanho, mtime, inode) como a varredura faria"""
+    directory = None
+    for i in range(count):
+        if i % files_per_dir == 0:
+            directory = os.path.join("C:\\Usuarios\\fulano\\Imagens", f"album_{i // files_per_dir:06d}")
+        yield directory, f"IMG_{i:08d}.jpg", 1_000_000 + i, 1_700_000_000.0 + i, 10_000_000 + i
+
+def build_dicts(count: int, files_per_dir: int) -> list:
+    """Formato anterior: um dicionário com caminho completo por arquivo"""
+    return [
+        {
+            'name': name,
+            'path': os.path.join(directory, name),
+            'size': size,
+            'modified_time': modified_time,
+            'hash': None
+        }
+        for directory, name, size, modified_time, inode in synthetic_entries(count, files_per_dir)
+    ]
+
+def build_records(count: int, files_per_dir: int) -> list:
+    """Formato atual: FileRecord com o diretório compartilhado por pasta"""
+    return [
+        FileRecord(sys.intern(directory), name, size, modified_time, inode)
+        for directory, name, size, modified_time, inode in synthetic_entries(count, files_per_dir)
+    ]
+
+def measure(builder, count: int, files_per_dir: int) -> int:
+    """Bytes alocados e mantidos pela lista construída"""
+    gc.collect()
+    tracemalloc.start()
+    data = builder(count, files_per_dir)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del data
+    return current
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--files", type=int, default=200_000)
+    parser.add_argument("--files-per-dir", type=int, default=50)
+    args = parser.parse_args()
+
+    dict_bytes = measure(build_dicts, args.files, args.files_per_dir)
+    record_bytes = measure(build_records, args.files, args.files_per_dir)
+
+    print(f"Arquivos: {args.files} ({args.files_per_dir} por pasta)")
+    print(f"{'Formato':<12} {'Total (MB)':>12} {'Bytes/arquivo':>15}")
+    for name, total in (("dict", dict_bytes), ("FileRecord", record_bytes)):
+        print(f"{name:<12} {total / 1024 / 1024:>12.1f} {total / args.files:>15.0f}")
+    print(f"Redução: {dict_bytes / record_bytes:.2f}x")
+
+if __name__ == "__main__":
+    main()
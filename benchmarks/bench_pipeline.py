@@ -0,0 +1,221 @@
+"""Benchmark do pipeline completo (varredura -> hash progressivo -> agrupamento) com linha de base
+
+Uso:
+    python benchmarks/bench_pipeline.py [--files 5000] [--sizes mixed] [--duplicate-ratio 0.2] ...
+        [--workers 4] [--algorithm md5] [--repeat 3] [--tree PASTA]
+        [--name padrao] [--save-baseline] [--max-regression 0.25]
+
+Gera uma árvore sintética (ver synthetic_tree.py) numa pasta temporária, ou
+usa '--tree', e executa o pipeline num processo separado, medindo arquivos/s,
+MB/s do hash, pico de memória (RSS) e bytes lidos em cada etapa. Os grupos
+encontrados são conferidos com os esperados pelo gerador.
+
+O resultado é comparado com o cenário de mesmo nome em baseline.json (mesmos
+parâmetros); '--save-baseline' grava a execução atual como nova linha de base.
+Sai com código 1 se o resultado estiver errado ou, com '--max-regression',
+se a vazão cair ou o pico de memória subir além da fração indicada, ou se
+mais bytes forem lidos.
+
+Os arquivos acabaram de ser gravados e estão no cache de páginas do sistema:
+o benchmark mede CPU e overhead do pipeline, não a velocidade do disco.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from engine import FileComparator
+from hashing import compute_hashes_progressive
+from scanner import list_files
+from synthetic_tree import add_tree_arguments, generate_tree, tree_options
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+HASH_STAGES = ('head', 'tail', 'full')
+
+def peak_rss_bytes() -> Optional[int]:
+    """Pico de memória residente do processo atual (None se indisponível)"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+def run_pipeline(root: str, workers: int, algorithm: str, use_processes: bool) -> Dict:
+    """Executa o pipeline uma vez (num processo próprio) e retorna as medições"""
+    stage_bytes = {}
+    stage_files = {}
+
+    def progress(event: str, info: Dict):
+        # O último evento de cada etapa traz os totais da etapa
+        if event == 'hashing':
+            stage_bytes[info['hash_stage']] = info['bytes']
+            stage_files[info['hash_stage']] = info['files']
+
+    start = time.perf_counter()
+    all_files = list_files(root)
+    scan_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    hash_stats = compute_hashes_progressive(all_files, None, workers, use_processes, algorithm, progress=progress)
+    hash_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    groups = FileComparator().find_duplicate_groups(all_files, hash_stats['algorithm'])
+    group_seconds = time.perf_counter() - start
+
+    return {
+        'files': len(all_files),
+        'scan_seconds': scan_seconds,
+        'hash_seconds': hash_seconds,
+        'group_seconds': group_seconds,
+        'bytes_read': hash_stats['bytes_read'],
+        'total_bytes': hash_stats['total_bytes'],
+        'stage_bytes': {stage: stage_bytes.get(stage, 0) for stage in HASH_STAGES},
+        'stage_files': {stage: stage_files.get(stage, 0) for stage in HASH_STAGES},
+        'peak_rss': peak_rss_bytes(),
+        'groups': sorted(sorted(member.path for member in group.members) for group in groups),
+    }
+
+def run_isolated(root: str, workers: int, algorithm: str, use_processes: bool) -> Dict:
+    """Executa o pipeline num processo novo, para que o pico de memória seja só dele"""
+    context = multiprocessing.get_context('spawn')
+    with context.Pool(1) as pool:
+        return pool.apply(run_pipeline, (root, workers, algorithm, use_processes))
+
+def summarize(runs: List[Dict]) -> Dict:
+    """Métricas da melhor execução (menor tempo total) entre as repetições"""
+    best = min(runs, key=lambda run: run['scan_seconds'] + run['hash_seconds'] + run['group_seconds'])
+    total_seconds = best['scan_seconds'] + best['hash_seconds'] + best['group_seconds']
+    return {
+        'files': best['files'],
+        'total_bytes': best['total_bytes'],
+        'total_seconds': total_seconds,
+        'files_per_sec': best['files'] / total_seconds,
+        'scan_files_per_sec': best['files'] / best['scan_seconds'],
+        'hash_mb_per_sec': best['bytes_read'] / 1024 / 1024 / best['hash_seconds'] if best['hash_seconds'] else 0.0,
+        'bytes_read': best['bytes_read'],
+        'stage_bytes': best['stage_bytes'],
+        'stage_files': best['stage_files'],
+        'peak_rss': max((run['peak_rss'] or 0) for run in runs) or None,
+    }
+
+def load_baseline(path: str) -> Dict:
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {'scenarios': {}}
+
+def compare(current: Dict, baseline: Dict, max_regression: Optional[float]) -> List[str]:
+    """Imprime a comparação com a linha de base e retorna as regressões encontradas"""
+    regressions = []
+    # (métrica, maior é melhor)
+    metrics = [('files_per_sec', True), ('scan_files_per_sec', True), ('hash_mb_per_sec', True),
+               ('peak_rss', False), ('bytes_read', False)]
+    print(f"\n{'Métrica':<22} {'Base':>14} {'Atual':>14} {'Variação':>10}")
+    for name, higher_is_better in metrics:
+        old, new = baseline.get(name), current.get(name)
+        if not old or new is None:
+            continue
+        change = (new - old) / old
+        print(f"{name:<22} {old:>14.1f} {new:>14.1f} {change:>+9.1%}")
+        if name == 'bytes_read':
+            # Determinístico para a mesma árvore: qualquer aumento é regressão
+            if new > old:
+                regressions.append(f"{name}: {old} -> {new}")
+        elif max_regression is not None:
+            worse = -change if higher_is_better else change
+            if worse > max_regression:
+                regressions.append(f"{name}: {change:+.1%}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    add_tree_arguments(parser)
+    parser.add_argument("--tree", help="Usa uma árvore já gerada (sem conferência dos grupos)")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--processes", action="store_true")
+    parser.add_argument("--algorithm", default="md5")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--name", default="padrao", help="Nome do cenário na linha de base")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--max-regression", type=float, help="Fração de piora tolerada (ex.: 0.25)")
+    args = parser.parse_args()
+
+    params = {
+        'tree': tree_options(args) if not args.tree else {'path': os.path.abspath(args.tree)},
+        'workers': args.workers, 'processes': args.processes, 'algorithm': args.algorithm,
+    }
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        expected = None
+        root = args.tree
+        if root is None:
+            root = os.path.join(temp_dir, "arvore")
+            start = time.perf_counter()
+            manifest = generate_tree(root, **tree_options(args))
+            expected = manifest['expected_groups']
+            counts = manifest['counts']
+            print(f"Árvore: {counts['files']} arquivos, {counts['bytes'] / 1024 / 1024:.1f} MB, "
+                  f"{len(expected)} grupos esperados ({time.perf_counter() - start:.1f}s para gerar)")
+
+        runs = [run_isolated(root, args.workers, args.algorithm, args.processes) for _ in range(args.repeat)]
+
+    correct = expected is None or all(run['groups'] == expected for run in runs)
+    current = summarize(runs)
+
+    print(f"\nArquivos/s (total):      {current['files_per_sec']:.0f}")
+    print(f"Arquivos/s (varredura):  {current['scan_files_per_sec']:.0f}")
+    print(f"Hash (MB/s lidos):       {current['hash_mb_per_sec']:.1f}")
+    if current['peak_rss'] is not None:
+        print(f"Pico de memória (RSS):   {current['peak_rss'] / 1024 / 1024:.1f} MB")
+    print(f"Bytes lidos:             {current['bytes_read']} de {current['total_bytes']} "
+          f"({current['bytes_read'] / max(current['total_bytes'], 1):.1%})")
+    for stage in HASH_STAGES:
+        print(f"  {stage:<5} {current['stage_files'][stage]:>8} arquivos {current['stage_bytes'][stage]:>14} bytes")
+    if expected is not None:
+        print(f"Grupos: {len(runs[0]['groups'])} encontrados, {len(expected)} esperados -> "
+              f"{'OK' if correct else 'DIVERGENTE'}")
+
+    baseline = load_baseline(args.baseline)
+    scenario = baseline['scenarios'].get(args.name)
+    regressions = []
+    if scenario is None:
+        print(f"\nSem linha de base para o cenário '{args.name}'")
+    elif scenario['params'] != params:
+        print(f"\nLinha de base '{args.name}' tem outros parâmetros; comparação ignorada")
+    else:
+        print(f"Linha de base: {scenario['machine']}")
+        regressions = compare(current, scenario['metrics'], args.max_regression)
+
+    if args.save_baseline:
+        baseline['scenarios'][args.name] = {
+            'params': params,
+            'machine': f"{platform.platform()} | Python {platform.python_version()} | {os.cpu_count()} CPUs",
+            'metrics': current,
+        }
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(baseline, f, ensure_ascii=False, indent=2)
+            f.write("\n")
+        print(f"\nLinha de base '{args.name}' gravada em {args.baseline}")
+
+    for regression in regressions:
+        print(f"REGRESSÃO: {regression}")
+    if not correct or regressions:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+"""Gerador de árvores sintéticas para os benchmarks do pipeline (varredura -> hash -> grupos)
+
+Uso:
+    python benchmarks/synthetic_tree.py DESTINO [--files 5000] [--depth 3] [--dirs-per-level 4]
+        [--sizes mixed] [--duplicate-ratio 0.2] [--trap-ratio 0.1] [--seed 0] [--manifest arquivo.json]
+
+A árvore é reproduzível (mesma semente = mesmos arquivos) e inclui, além de
+duplicados exatos, "armadilhas": arquivos do mesmo tamanho de outro que só
+diferem no meio (passam pelas etapas de bloco inicial e final e exigem o hash
+completo) ou só no último byte (descartados na etapa do bloco final).
+"""
+import argparse
+import json
+import math
+import os
+import random
+import sys
+from typing import Dict, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from hashing import HEAD_BLOCK_SIZE, TAIL_BLOCK_SIZE
+
+# Tamanho mínimo: conteúdos aleatórios menores poderiam coincidir por acaso
+MIN_FILE_SIZE = 16
+MAX_FILE_SIZE = 128 * 1024 * 1024
+WRITE_CHUNK = 1024 * 1024
+
+def size_sampler(profile: str, rng: random.Random):
+    """Distribuição de tamanhos: 'small' (~8 KB), 'mixed' (maioria pequena, poucos com MB) ou 'large' (~8 MB)"""
+    def lognormal(median: int, sigma: float) -> int:
+        return int(rng.lognormvariate(math.log(median), sigma))
+
+    def sample() -> int:
+        if profile == 'small':
+            size = lognormal(8 * 1024, 1.0)
+        elif profile == 'large':
+            size = lognormal(8 * 1024 * 1024, 0.7)
+        else:
+            roll = rng.random()
+            if roll < 0.95:
+                size = lognormal(8 * 1024, 1.2)
+            elif roll < 0.995:
+                size = lognormal(512 * 1024, 0.8)
+            else:
+                size = lognormal(8 * 1024 * 1024, 0.5)
+        return min(max(size, MIN_FILE_SIZE), MAX_FILE_SIZE)
+    return sample
+
+def write_content(path: str, content_seed: int, size: int, flip_offset: Optional[int] = None):
+    """Grava 'size' bytes pseudoaleatórios da semente, invertendo opcionalmente um byte"""
+    rng = random.Random(content_seed)
+    written = 0
+    with open(path, 'wb') as f:
+        while written < size:
+            chunk = rng.randbytes(min(WRITE_CHUNK, size - written))
+            if flip_offset is not None and written <= flip_offset < written + len(chunk):
+                chunk = bytearray(chunk)
+                chunk[flip_offset - written] ^= 0xFF
+            f.write(chunk)
+            written += len(chunk)
+
+def build_directories(root: str, depth: int, dirs_per_level: int) -> List[str]:
+    """Cria a hierarquia de pastas (dirs_per_level por nível) e retorna todas, incluindo a raiz"""
+    directories = [root]
+    level = [root]
+    for current_depth in range(depth):
+        next_level = []
+        for parent in level:
+            for i in range(dirs_per_level):
+                path = os.path.join(parent, f"pasta_{current_depth}_{i}")
+                os.makedirs(path, exist_ok=True)
+                next_level.append(path)
+        directories.extend(next_level)
+        level = next_level
+    return directories
+
+def generate_tree(root: str, files: int = 5000, depth: int = 3, dirs_per_level: int = 4,
+                  sizes: str = 'mixed', duplicate_ratio: float = 0.2, trap_ratio: float = 0.1,
+                  seed: int = 0) -> Dict:
+    """Gera a árvore e retorna o manifesto: contagens e os grupos de duplicados esperados"""
+    rng = random.Random(seed)
+    sample_size = size_sampler(sizes, rng)
+    os.makedirs(root, exist_ok=True)
+    directories = build_directories(root, depth, dirs_per_level)
+
+    originals = []  # (semente do conteúdo, tamanho) de cada conteúdo novo
+    contents = {}   # (semente, byte invertido) -> caminhos com esse conteúdo
+    counts = {'files': 0, 'bytes': 0, 'duplicates': 0, 'traps_middle': 0, 'traps_tail': 0}
+    trap_candidates = []  # conteúdos grandes o bastante para uma armadilha no meio
+
+    for i in range(files):
+        path = os.path.join(rng.choice(directories), f"arquivo_{i:07d}.bin")
+        roll = rng.random()
+        flip_offset = None
+        if originals and roll < duplicate_ratio:
+            content_seed, size = rng.choice(originals)
+            counts['duplicates'] += 1
+        elif originals and roll < duplicate_ratio + trap_ratio:
+            if trap_candidates and rng.random() < 0.5:
+                content_seed, size = rng.choice(trap_candidates)
+                # Mesmo início e fim do original: só o hash completo os separa
+                flip_offset = HEAD_BLOCK_SIZE + (size - HEAD_BLOCK_SIZE - TAIL_BLOCK_SIZE) // 2
+                counts['traps_middle'] += 1
+            else:
+                content_seed, size = rng.choice(originals)
+                flip_offset = size - 1
+                counts['traps_tail'] += 1
+        else:
+            content_seed, size = rng.getrandbits(63), sample_size()
+            originals.append((content_seed, size))
+            if size > HEAD_BLOCK_SIZE + TAIL_BLOCK_SIZE:
+                trap_candidates.append((content_seed, size))
+
+        write_content(path, content_seed, size, flip_offset)
+        contents.setdefault((content_seed, flip_offset), []).append(path)
+        counts['files'] += 1
+        counts['bytes'] += size
+
+    groups = sorted(sorted(paths) for paths in contents.values() if len(paths) > 1)
+    return {
+        'root': root,
+        'params': {
+            'files': files, 'depth': depth, 'dirs_per_level': dirs_per_level, 'sizes': sizes,
+            'duplicate_ratio': duplicate_ratio, 'trap_ratio': trap_ratio, 'seed': seed,
+        },
+        'counts': counts,
+        'expected_groups': groups,
+    }
+
+def add_tree_arguments(parser: argparse.ArgumentParser):
+    """Argumentos de geração compartilhados com os benchmarks"""
+    parser.add_argument("--files", type=int, default=5000)
+    parser.add_argument("--depth", type=int, default=3)
+    parser.add_argument("--dirs-per-level", type=int, default=4)
+    parser.add_argument("--sizes", choices=['small', 'mixed', 'large'], default='mixed')
+    parser.add_argument("--duplicate-ratio", type=float, default=0.2)
+    parser.add_argument("--trap-ratio", type=float, default=0.1)
+    parser.add_argument("--seed", type=int, default=0)
+
+def tree_options(args: argparse.Namespace) -> Dict:
+    return {
+        'files': args.files, 'depth': args.depth, 'dirs_per_level': args.dirs_per_level,
+        'sizes': args.sizes, 'duplicate_ratio': args.duplicate_ratio,
+        'trap_ratio': args.trap_ratio, 'seed': args.seed,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("destination", help="Pasta onde a árvore será criada")
+    add_tree_arguments(parser)
+    parser.add_argument("--manifest", help="Grava o manifesto (grupos esperados) neste arquivo JSON")
+    args = parser.parse_args()
+
+    manifest = generate_tree(args.destination, **tree_options(args))
+    counts = manifest['counts']
+    print(f"{counts['files']} arquivos, {counts['bytes'] / 1024 / 1024:.1f} MB, "
+          f"{counts['duplicates']} duplicados, {counts['traps_middle'] + counts['traps_tail']} armadilhas, "
+          f"{len(manifest['expected_groups'])} grupos esperados")
+    if args.manifest:
+        with open(args.manifest, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+
+if __name__ == "__main__":
+    main()
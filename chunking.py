@@ -0,0 +1,264 @@
+import hashlib
+import heapq
+import time
+from array import array
+from itertools import combinations
+from typing import Callable, Dict, List, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from hashing import PROGRESS_INTERVAL, ProgressCallback, map_ordered
+from metrics import ScanMetrics
+from scanner import FileRecord
+
+# Tamanho médio desejado dos blocos; o mínimo é 1/4 e o máximo 8x esse valor
+DEFAULT_CHUNK_SIZE = 8 * 1024
+MIN_CHUNK_SIZE = 256
+# Leitura em pedaços fixos: a memória usada por arquivo não depende do tamanho dele
+READ_BLOCK_SIZE = 1024 * 1024
+# Janela do hash rolante (de 32 bits): cada ponto de corte depende só dos últimos WINDOW bytes
+WINDOW = 32
+# Hash de cada bloco (BLAKE2b de 128 bits)
+DIGEST_SIZE = 16
+# Blocos presentes em mais arquivos que isto (ex.: blocos zerados) entram na
+# economia estimada, mas não na contagem por par, que cresceria com o quadrado
+# do número de arquivos
+MAX_FANOUT = 32
+# Pares com mais bytes em comum retornados
+DEFAULT_MAX_PAIRS = 1000
+MASK32 = (1 << 32) - 1
+
+# Tabela do Gear hash: um valor fixo de 32 bits por byte
+GEAR = [int.from_bytes(hashlib.blake2b(bytes([value]), digest_size=4).digest(), 'little') for value in range(256)]
+GEAR_ARRAY = np.array(GEAR, dtype=np.uint32) if np is not None else None
+
+def chunk_limits(chunk_size: int) -> Tuple[int, int, int]:
+    """(tamanho mínimo, tamanho máximo, limiar de corte) para um tamanho médio de bloco"""
+    if chunk_size < MIN_CHUNK_SIZE:
+        raise ValueError(f"tamanho de bloco deve ser de pelo menos {MIN_CHUNK_SIZE} bytes")
+    min_size = chunk_size // 4
+    # Após o mínimo, um corte a cada (chunk_size - min_size) bytes em média. O
+    # limiar testa os bits altos do hash, que dependem de toda a janela
+    return min_size, chunk_size * 8, (1 << WINDOW) // (chunk_size - min_size)
+
+class Chunker:
+    """Divide um fluxo de bytes em blocos definidos pelo conteúdo (Gear hash, como no FastCDC).
+
+    Um bloco termina onde o hash rolante dos últimos WINDOW bytes fica
+    abaixo de um limiar, respeitando os tamanhos mínimo e máximo. Como o corte
+    depende só do conteúdo ao redor, inserir ou remover bytes no meio de um
+    arquivo muda apenas os blocos próximos: os seguintes voltam a coincidir.
+    Os dados são recebidos em pedaços (feed), e só o hash de cada bloco é
+    guardado. Com numpy, o hash rolante de um pedaço inteiro é calculado de
+    uma vez; sem ele, byte a byte (mesmos cortes, bem mais lento).
+    """
+
+    def __init__(self, chunk_size: int = DEFAULT_CHUNK_SIZE):
+        self.min_size, self.max_size, self.threshold = chunk_limits(chunk_size)
+        self.offset = 0
+        self.chunk_start = 0
+        self.hasher = hashlib.blake2b(digest_size=DIGEST_SIZE)
+        self.tail = b""  # últimos WINDOW - 1 bytes recebidos (numpy)
+        self.rolling = 0  # hash rolante até o último byte recebido (sem numpy)
+        self.digests = bytearray()
+        self.sizes = array('L')
+
+    def _candidates(self, data: bytes) -> List[int]:
+        """Posições de 'data' após as quais o hash rolante permite um corte"""
+        if GEAR_ARRAY is not None:
+            values = np.take(GEAR_ARRAY, np.frombuffer(self.tail + data, dtype=np.uint8))
+            # h(i) = soma de gear[byte(i - k)] << k para k < WINDOW: a janela
+            # dobra a cada passo, h_2w(i) = h_w(i) + h_w(i - w) << w
+            span = 1
+            while span < WINDOW:
+                values[span:] += values[:-span] << np.uint32(span)
+                span *= 2
+            hits = np.flatnonzero(values[len(self.tail):] < self.threshold)
+            self.tail = (self.tail + data[-(WINDOW - 1):])[-(WINDOW - 1):]
+            return hits.tolist()
+        hits = []
+        rolling = self.rolling
+        threshold = self.threshold
+        for position, value in enumerate(data):
+            rolling = ((rolling << 1) + GEAR[value]) & MASK32
+            if rolling < threshold:
+                hits.append(position)
+        self.rolling = rolling
+        return hits
+
+    def _cut(self, view: memoryview, base: int, start: int, end: int) -> int:
+        """Fecha o bloco atual em 'end' (posição no fluxo); retorna a nova posição inicial em 'view'"""
+        local_end = end - base
+        self.hasher.update(view[start:local_end])
+        self.digests += self.hasher.digest()
+        self.sizes.append(end - self.chunk_start)
+        self.hasher = hashlib.blake2b(digest_size=DIGEST_SIZE)
+        self.chunk_start = end
+        return local_end
+
+    def feed(self, data: bytes):
+        base = self.offset
+        view = memoryview(data)
+        start = 0
+        for position in self._candidates(data):
+            end = base + position + 1
+            while end - self.chunk_start > self.max_size:
+                start = self._cut(view, base, start, self.chunk_start + self.max_size)
+            if end - self.chunk_start >= self.min_size:
+                start = self._cut(view, base, start, end)
+        self.offset = base + len(data)
+        while self.offset - self.chunk_start >= self.max_size:
+            start = self._cut(view, base, start, self.chunk_start + self.max_size)
+        self.hasher.update(view[start:])
+
+    def finish(self) -> Tuple[bytes, array]:
+        """Fecha o último bloco; retorna os hashes concatenados e os tamanhos dos blocos"""
+        if self.offset > self.chunk_start:
+            self.digests += self.hasher.digest()
+            self.sizes.append(self.offset - self.chunk_start)
+            self.chunk_start = self.offset
+        return bytes(self.digests), self.sizes
+
+def chunk_file(task: Tuple[str, int]) -> Tuple[bytes, array, float, Optional[Tuple[str, str]]]:
+    """Divide um arquivo em blocos. Retorna (hashes, tamanhos, segundos, erro)"""
+    file_path, chunk_size = task
+    start = time.perf_counter()
+    chunker = Chunker(chunk_size)
+    try:
+        with open(file_path, 'rb') as f:
+            for data in iter(lambda: f.read(READ_BLOCK_SIZE), b""):
+                chunker.feed(data)
+    except OSError as e:
+        return b"", array('L'), time.perf_counter() - start, (type(e).__name__, str(e))
+    digests, sizes = chunker.finish()
+    return digests, sizes, time.perf_counter() - start, None
+
+class ChunkIndex:
+    """Índice hash do bloco -> arquivos que o contêm.
+
+    Para cada bloco guarda só o primeiro arquivo; a lista de arquivos é
+    criada apenas para blocos que aparecem em mais de um. Os arquivos devem
+    ser adicionados um de cada vez, com identificadores crescentes.
+    """
+
+    def __init__(self, max_fanout: int = MAX_FANOUT):
+        self.max_fanout = max_fanout
+        self.first_owner = {}
+        self.owners = {}
+        self.shared_sizes = {}
+        self.chunks = 0
+        self.total_bytes = 0
+        self.unique_bytes = 0
+
+    def add_file(self, file_id: int, digests: bytes, sizes: array):
+        first_owner = self.first_owner
+        owners = self.owners
+        for index, size in enumerate(sizes):
+            digest = digests[index * DIGEST_SIZE:(index + 1) * DIGEST_SIZE]
+            owner = first_owner.get(digest)
+            if owner is None:
+                first_owner[digest] = file_id
+                self.unique_bytes += size
+            elif owner != file_id:
+                files = owners.get(digest)
+                if files is None:
+                    owners[digest] = [owner, file_id]
+                    self.shared_sizes[digest] = size
+                elif files[-1] != file_id and len(files) <= self.max_fanout:
+                    files.append(file_id)
+        self.chunks += len(sizes)
+        self.total_bytes += sum(sizes)
+
+    def shared_bytes(self) -> Tuple[Dict[Tuple[int, int], int], int]:
+        """Bytes em comum por par de arquivos (blocos distintos) e quantos blocos comuns demais foram ignorados"""
+        pair_bytes = {}
+        skipped = 0
+        for digest, files in self.owners.items():
+            if len(files) > self.max_fanout:
+                skipped += 1
+                continue
+            size = self.shared_sizes[digest]
+            for pair in combinations(files, 2):
+                pair_bytes[pair] = pair_bytes.get(pair, 0) + size
+        return pair_bytes, skipped
+
+def analyze_shared_chunks(files: List[FileRecord], chunk_size: int = DEFAULT_CHUNK_SIZE, workers: int = 1,
+                          use_processes: bool = False, progress: Optional[ProgressCallback] = None,
+                          metrics: Optional[ScanMetrics] = None, max_pairs: int = DEFAULT_MAX_PAIRS,
+                          min_shared: int = 0,
+                          skip_pair: Optional[Callable[[FileRecord, FileRecord], bool]] = None) -> Dict:
+    """Procura arquivos que compartilham parte do conteúdo, por blocos definidos pelo conteúdo.
+
+    Cada arquivo é lido em pedaços de READ_BLOCK_SIZE (em paralelo, com
+    'workers') e dividido em blocos; só os hashes dos blocos são guardados.
+    Arquivos menores que o bloco mínimo só podem coincidir por inteiro e
+    ficam de fora. 'skip_pair' descarta pares já conhecidos (ex.: cópias
+    idênticas). Emite eventos 'hashing' com hash_stage='chunks'.
+
+    Retorna 'pairs' (até 'max_pairs' pares com pelo menos 'min_shared' bytes
+    em comum, do maior para o menor) e 'stats', com a economia estimada de
+    uma deduplicação por blocos (bytes analisados - bytes de blocos distintos).
+    """
+    min_size = chunk_limits(chunk_size)[0]
+    candidates = [file_info for file_info in files if file_info.size >= min_size]
+    index = ChunkIndex()
+    stats = {'files': 0, 'read_errors': 0, 'chunk_size': chunk_size}
+    bytes_total = sum(file_info.size for file_info in candidates)
+    bytes_read = 0
+    last_report = time.monotonic()
+    start = time.perf_counter()
+
+    tasks = ((file_info.path, chunk_size) for file_info in candidates)
+    results = map_ordered(chunk_file, tasks, workers, use_processes=use_processes)
+    for file_id, (file_info, (digests, sizes, seconds, error)) in enumerate(zip(candidates, results)):
+        bytes_read += file_info.size
+        if error is not None:
+            stats['read_errors'] += 1
+            if metrics is not None:
+                metrics.record_error(file_info.path, *error)
+        else:
+            stats['files'] += 1
+            index.add_file(file_id, digests, sizes)
+            if metrics is not None:
+                metrics.record_file(file_info.path, 'chunks', file_info.size, seconds)
+        if progress is not None:
+            now = time.monotonic()
+            if now - last_report >= PROGRESS_INTERVAL or file_id + 1 == len(candidates):
+                last_report = now
+                progress('hashing', {'hash_stage': 'chunks', 'files': file_id + 1, 'files_total': len(candidates),
+                                     'bytes': bytes_read, 'bytes_total': bytes_total})
+
+    pair_bytes, skipped = index.shared_bytes()
+    selected = (
+        (shared, a, b) for (a, b), shared in pair_bytes.items()
+        if shared >= min_shared and not (skip_pair is not None and skip_pair(candidates[a], candidates[b]))
+    )
+    pairs = []
+    for shared, a, b in heapq.nlargest(max_pairs, selected):
+        first, second = candidates[a], candidates[b]
+        pairs.append({
+            'path_a': first.path,
+            'path_b': second.path,
+            'size_a': first.size,
+            'size_b': second.size,
+            'shared_bytes': shared,
+            'shared_percent': round(100.0 * shared / min(first.size, second.size), 1),
+        })
+
+    stats.update({
+        'bytes': index.total_bytes,
+        'chunks': index.chunks,
+        'unique_chunks': len(index.first_owner),
+        'unique_bytes': index.unique_bytes,
+        'dedup_savings': index.total_bytes - index.unique_bytes,
+        'shared_pairs': len(pair_bytes),
+        'common_chunks_skipped': skipped,
+    })
+    if metrics is not None:
+        metrics.count('files_chunked', stats['files'])
+        metrics.count('bytes_chunked', index.total_bytes)
+        metrics.add_time('hash_chunks', time.perf_counter() - start)
+    return {'pairs': pairs, 'stats': stats}
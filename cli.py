@@ -0,0 +1,409 @@
+"""Detector de Arquivos Duplicados - linha de comando (sem Streamlit)
+
+Exemplos:
+    python cli.py D:\\Fotos --include "*.jpg" --include "*.png" --output duplicados.json
+    python cli.py /srv/arquivos --algorithm blake2b --workers 8 --format csv --progress
+    python cli.py /srv/arquivos --keep shortest_path --dedup hardlink
+    python cli.py /srv/arquivos --format parquet --output auto
+    python cli.py D:\\Entrada E:\\Pendrive --reference F:\\Acervo --format text
+    python cli.py /srv/arquivos --metrics metricas.json
+    python cli.py /srv/arquivos --profile sistema --min-size 4K --ext jpg --ext png --save-profile fotos
+    python cli.py ~/Pictures --images phash --image-distance 8 --format text
+    python cli.py /srv/backups --chunks 8K --chunk-report compartilhado.json
+    python cli.py ~/Downloads --profile sistema --watch --format text
+    python cli.py /srv/arquivos --verify --dedup hardlink
+
+Códigos de saída:
+    0  análise concluída, nenhum duplicado
+    1  análise concluída, duplicados encontrados
+    2  erro (argumentos inválidos, pasta inexistente, falha ao gravar ou ao deduplicar)
+
+Com --reference, "duplicados" são os arquivos das pastas que já existem no acervo.
+Com --images, "duplicados" são imagens parecidas (não necessariamente idênticas).
+Com --chunks, pares de arquivos com parte do conteúdo em comum também contam.
+Com --watch, o código reflete os grupos existentes ao encerrar (Ctrl+C).
+"""
+import argparse
+import json
+import os
+import re
+import sqlite3
+import sys
+import time
+from contextlib import nullcontext
+from typing import Dict, List
+
+from dedup import DEDUP_MODES, dedup_groups
+from engine import FileComparator, DuplicateGroup, KEEPER_POLICIES, run_scan
+from filters import BUILTIN_PROFILES, ScanFilter, load_profile, parse_size, save_profile
+from hashing import available_algorithms, DEFAULT_WORKERS
+from reference_index import DEFAULT_REFERENCE_INDEX_PATH
+from verify import VERIFICATION_STATES
+
+EXIT_OK = 0
+EXIT_DUPLICATES = 1
+EXIT_ERROR = 2
+
+# Relatórios gravados em fluxo durante a análise (ver report.REPORT_FORMATS).
+# chunking, image_similarity, report e watcher só são importados pelas opções
+# que os usam: numpy, Pillow, pyarrow e watchdog pesam no início de toda execução
+STREAM_FORMATS = ('jsonl', 'csv', 'parquet')
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="Encontra arquivos duplicados em uma ou mais pastas",
+        epilog="Códigos de saída:" + __doc__.split("Códigos de saída:")[1],
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("folders", nargs="+", metavar="folder",
+                        help="Pasta(s) a analisar; duplicados entre pastas diferentes formam um mesmo grupo")
+    parser.add_argument("--no-subdirs", action="store_true", help="Não analisar subpastas")
+    parser.add_argument("--include", action="append", metavar="GLOB",
+                        help="Analisar só arquivos cujo nome casa com o padrão (pode repetir)")
+    parser.add_argument("--exclude", action="append", metavar="GLOB",
+                        help="Ignorar arquivos e pastas cujo nome casa com o padrão; pastas ignoradas não são percorridas (pode repetir)")
+    parser.add_argument("--include-regex", action="append", metavar="REGEX",
+                        help="Analisar só arquivos cujo caminho relativo casa com a expressão regular (pode repetir)")
+    parser.add_argument("--exclude-regex", action="append", metavar="REGEX",
+                        help="Ignorar arquivos e pastas cujo caminho relativo casa com a expressão regular (pode repetir)")
+    parser.add_argument("--ext", action="append", metavar="EXTENSÃO",
+                        help="Analisar só arquivos com esta extensão, ex.: jpg (pode repetir)")
+    parser.add_argument("--min-size", type=parse_size, metavar="TAMANHO",
+                        help="Ignorar arquivos menores que este tamanho (ex.: 1, 4K, 1.5M)")
+    parser.add_argument("--max-size", type=parse_size, metavar="TAMANHO",
+                        help="Ignorar arquivos maiores que este tamanho (ex.: 2G)")
+    parser.add_argument("--profile", metavar="NOME",
+                        help=f"Parte das regras de um perfil de filtro salvo (predefinidos: {', '.join(BUILTIN_PROFILES)})")
+    parser.add_argument("--save-profile", metavar="NOME",
+                        help="Grava as regras de filtro efetivas como um perfil, para reutilizar com --profile")
+    parser.add_argument("--algorithm", default="md5", choices=available_algorithms(),
+                        help="Algoritmo de hash (padrão: md5)")
+    parser.add_argument("--confirm", metavar="ALGORITMO", choices=available_algorithms(),
+                        help="Confirma os grupos com um segundo algoritmo (ex.: sha256)")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS,
+                        help=f"Leituras simultâneas (padrão: {DEFAULT_WORKERS})")
+    parser.add_argument("--processes", action="store_true", help="Usar processos em vez de threads")
+    parser.add_argument("--no-cache", action="store_true", help="Não usar o cache persistente de hashes")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Lista só as pastas alteradas desde a última análise incremental desta pasta")
+    parser.add_argument("--reference", metavar="ACERVO",
+                        help="Procura os arquivos das pastas neste acervo, indexado e consultado por tamanho e hash")
+    parser.add_argument("--reference-index", default=DEFAULT_REFERENCE_INDEX_PATH,
+                        help=f"Banco do índice de acervos (padrão: {DEFAULT_REFERENCE_INDEX_PATH})")
+    parser.add_argument("--images", nargs="?", const="", metavar="MÉTODO",
+                        help="Procura imagens parecidas (recodificadas, redimensionadas) pelo hash perceptual: "
+                             "phash, dhash ou ahash (padrão: phash; requer numpy e Pillow)")
+    parser.add_argument("--image-distance", type=int, metavar="BITS",
+                        help="Distância de Hamming máxima (de 64 bits) entre imagens parecidas (padrão: 8)")
+    parser.add_argument("--chunks", nargs="?", const=-1, type=parse_size, metavar="TAMANHO",
+                        help="Também procura arquivos com parte do conteúdo em comum, divididos em blocos "
+                             "definidos pelo conteúdo deste tamanho médio (padrão: 8K); lê todos os arquivos por completo")
+    parser.add_argument("--chunk-report", metavar="ARQUIVO",
+                        help="Grava em JSON os pares com blocos em comum e a economia estimada (com --chunks)")
+    parser.add_argument("--verify", action="store_true",
+                        help="Confere byte a byte os arquivos de cada grupo e separa os que diferem "
+                             "(recomendado antes de --dedup)")
+    parser.add_argument("--watch", action="store_true",
+                        help="Depois da análise, continua monitorando as pastas e mostra cada duplicado novo "
+                             "(uma linha JSON por evento em stdout, ou texto com --format text) até Ctrl+C")
+    parser.add_argument("--debounce", type=float, metavar="SEGUNDOS",
+                        help="Com --watch, tempo sem alterações antes de ler um arquivo novo (padrão: 2)")
+    parser.add_argument("--polling", action="store_true",
+                        help="Com --watch, consulta as pastas periodicamente em vez de usar eventos do sistema (watchdog)")
+    parser.add_argument("--poll-interval", type=float, metavar="SEGUNDOS",
+                        help="Intervalo entre as consultas com --polling ou sem o pacote watchdog (padrão: 5)")
+    parser.add_argument("--keep", choices=list(KEEPER_POLICIES),
+                        help="Arquivo mantido em cada grupo (padrão: oldest; com --reference, o do acervo; com --images, o maior)")
+    parser.add_argument("--preferred-folder", help="Pasta cujos arquivos são mantidos com --keep preferred_folder")
+    parser.add_argument("--dedup", choices=list(DEDUP_MODES),
+                        help="Substitui as cópias por links (hardlink ou reflink) para o arquivo mantido")
+    parser.add_argument("--format", choices=["json", "text"] + list(STREAM_FORMATS), default="json",
+                        help="Formato da saída (padrão: json); jsonl, csv e parquet são gravados em fluxo")
+    parser.add_argument("--output", default="-",
+                        help="Arquivo de saída ('-' = saída padrão, 'auto' = novo arquivo na pasta de relatórios)")
+    parser.add_argument("--progress", action="store_true",
+                        help="Emite o progresso em JSON Lines na saída de erro (e, ao final, um evento 'metrics')")
+    parser.add_argument("--metrics", metavar="ARQUIVO",
+                        help="Grava em JSON as métricas da análise (tempo por etapa, contadores, erros, arquivos mais lentos)")
+    return parser
+
+def emit_progress(stage: str, info: Dict):
+    """Escreve um evento de progresso legível por máquina (JSON Lines) em stderr"""
+    event = {'event': 'progress', 'stage': stage, 'time': round(time.time(), 3)}
+    event.update(info)
+    sys.stderr.write(json.dumps(event, ensure_ascii=False) + "\n")
+    sys.stderr.flush()
+
+def build_filter(args: argparse.Namespace) -> ScanFilter:
+    """Regras de filtro do perfil (se houver) acrescidas das opções da linha de comando"""
+    rules = load_profile(args.profile).to_dict() if args.profile else ScanFilter().to_dict()
+    rules['include'] += args.include or []
+    rules['exclude'] += args.exclude or []
+    rules['include_regex'] += args.include_regex or []
+    rules['exclude_regex'] += args.exclude_regex or []
+    rules['extensions'] += args.ext or []
+    if args.min_size is not None:
+        rules['min_size'] = args.min_size
+    if args.max_size is not None:
+        rules['max_size'] = args.max_size
+    return ScanFilter.from_dict(rules)
+
+def write_metrics(metrics: Dict, output: str):
+    """Grava as métricas da análise em JSON"""
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(metrics, f, indent=2, ensure_ascii=False)
+        f.write("\n")
+
+def write_chunk_report(analysis: Dict, output: str):
+    """Grava em JSON o resultado da análise por blocos"""
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(analysis, f, indent=2, ensure_ascii=False)
+        f.write("\n")
+
+def print_watch_event(event: Dict, output_format: str):
+    """Escreve um evento do monitoramento em stdout"""
+    if output_format != "text":
+        sys.stdout.write(json.dumps(event, ensure_ascii=False) + "\n")
+    elif event['event'] == 'duplicate':
+        sys.stdout.write(f"+ {event['path']}\t= {event['original']}\t({event['size']} bytes)\n")
+    elif event['event'] == 'resolved':
+        sys.stdout.write(f"- {event['path']}\t(resta {event['remaining']})\n")
+    elif event['event'] == 'error':
+        sys.stderr.write(f"Erro ao ler {event['path']}: {event['message']}\n")
+    elif event['event'] == 'fallback':
+        sys.stderr.write(f"Aviso: eventos do sistema indisponíveis ({event['message']}); usando consulta periódica\n")
+    sys.stdout.flush()
+
+def watch_folders(args: argparse.Namespace, scan_filter: ScanFilter, result: Dict) -> int:
+    """Monitora as pastas a partir do resultado da análise, até Ctrl+C"""
+    from watcher import WATCH_MODES, DuplicateWatcher
+    watcher = DuplicateWatcher(
+        args.folders,
+        recursive=not args.no_subdirs,
+        filters=scan_filter,
+        algorithm=args.algorithm,
+        confirm_algorithm=args.confirm,
+        workers=args.workers,
+        use_cache=not args.no_cache,
+        **{option: getattr(args, option) for option in ('debounce', 'poll_interval')
+           if getattr(args, option) is not None},
+        polling=args.polling,
+        on_event=lambda event: print_watch_event(event, args.format),
+        result=result
+    ).start()
+    sys.stderr.write(f"Monitorando {', '.join(watcher.roots)} ({WATCH_MODES[watcher.mode]}); Ctrl+C para encerrar\n")
+    try:
+        while watcher.active:
+            time.sleep(0.5)
+    except KeyboardInterrupt:
+        pass
+    watcher.stop()
+    if watcher.error:
+        sys.stderr.write(f"Erro no monitoramento: {watcher.error}\n")
+        return EXIT_ERROR
+    return EXIT_DUPLICATES if watcher.groups() else EXIT_OK
+
+def write_output(groups: List[DuplicateGroup], output_format: str, output: str):
+    """Grava os grupos de duplicados em JSON ou texto (os relatórios JSONL/CSV/Parquet são
+    gravados durante a análise, ver main)"""
+    if output_format == "json" and output != "-":
+        FileComparator().save_results([group.to_dict() for group in groups], output)
+        return
+
+    stream = sys.stdout if output == "-" else open(output, 'w', encoding='utf-8', newline='')
+    try:
+        if output_format == "json":
+            json.dump([group.to_dict() for group in groups], stream, indent=2, ensure_ascii=False)
+            stream.write("\n")
+        else:
+            for group in groups:
+                # Com --verify, a situação da conferência do grupo
+                status = f", {VERIFICATION_STATES[group.verification].lower()}" if group.verification != 'unverified' else ""
+                stream.write(f"{group.keeper.path}\t({group.size} bytes, {len(group.members)} arquivos{status})\n")
+                distances = getattr(group, 'distances', None)
+                for i, member in enumerate(group.members):
+                    if i == group.keeper_index:
+                        continue
+                    # Imagens parecidas: distância até a maior imagem do grupo
+                    suffix = f"\t(distância {distances[i]})" if distances is not None else ""
+                    stream.write(f"  = {member.path}{suffix}\n")
+    finally:
+        if stream is not sys.stdout:
+            stream.close()
+
+def main(argv: List[str] = None) -> int:
+    args = build_parser().parse_args(argv)
+
+    for folder in args.folders + ([args.reference] if args.reference else []):
+        if not os.path.isdir(folder):
+            sys.stderr.write(f"Erro: pasta não existe: {folder}\n")
+            return EXIT_ERROR
+    if args.workers < 1:
+        sys.stderr.write("Erro: --workers deve ser >= 1\n")
+        return EXIT_ERROR
+    if args.images is not None:
+        from image_similarity import DEFAULT_METHOD, PERCEPTUAL_METHODS, images_available
+        args.images = args.images or DEFAULT_METHOD
+        if args.images not in PERCEPTUAL_METHODS:
+            sys.stderr.write(f"Erro: --images deve ser um de: {', '.join(PERCEPTUAL_METHODS)}\n")
+            return EXIT_ERROR
+        if not images_available():
+            sys.stderr.write("Erro: --images requer os pacotes numpy e Pillow\n")
+            return EXIT_ERROR
+        if args.reference or args.dedup or args.verify:
+            sys.stderr.write("Erro: --images não pode ser combinado com --reference, --dedup nem --verify\n")
+            return EXIT_ERROR
+        if args.image_distance is not None and not 0 <= args.image_distance < 64:
+            sys.stderr.write("Erro: --image-distance deve estar entre 0 e 63\n")
+            return EXIT_ERROR
+    if args.chunks is not None:
+        from chunking import DEFAULT_CHUNK_SIZE, MIN_CHUNK_SIZE
+        if args.chunks == -1:
+            args.chunks = DEFAULT_CHUNK_SIZE
+        if args.reference or args.images:
+            sys.stderr.write("Erro: --chunks não pode ser combinado com --reference nem com --images\n")
+            return EXIT_ERROR
+        if args.chunks < MIN_CHUNK_SIZE:
+            sys.stderr.write(f"Erro: --chunks deve ser de pelo menos {MIN_CHUNK_SIZE} bytes\n")
+            return EXIT_ERROR
+    elif args.chunk_report:
+        sys.stderr.write("Erro: --chunk-report requer --chunks\n")
+        return EXIT_ERROR
+    if args.watch:
+        if args.reference or args.images or args.chunks is not None or args.dedup:
+            sys.stderr.write("Erro: --watch não pode ser combinado com --reference, --images, --chunks nem --dedup\n")
+            return EXIT_ERROR
+        if (args.debounce or 0) < 0 or (args.poll_interval is not None and args.poll_interval <= 0):
+            sys.stderr.write("Erro: --debounce deve ser >= 0 e --poll-interval > 0\n")
+            return EXIT_ERROR
+    streaming = args.format in STREAM_FORMATS
+    if streaming:
+        from report import ReportWriter, available_formats, report_path
+        if args.format not in available_formats():
+            sys.stderr.write(f"Erro: --format {args.format} requer o pacote pyarrow\n")
+            return EXIT_ERROR
+    if args.output == "auto":
+        if not streaming:
+            sys.stderr.write("Erro: --output auto requer --format jsonl, csv ou parquet\n")
+            return EXIT_ERROR
+        args.output = report_path(args.folders[0], args.format)
+    if args.format == "parquet" and args.output == "-":
+        sys.stderr.write("Erro: --format parquet requer --output com um arquivo\n")
+        return EXIT_ERROR
+    try:
+        scan_filter = build_filter(args)
+    except KeyError:
+        sys.stderr.write(f"Erro: perfil de filtro não existe: {args.profile}\n")
+        return EXIT_ERROR
+    except re.error as e:
+        sys.stderr.write(f"Erro: expressão regular inválida: {str(e)}\n")
+        return EXIT_ERROR
+    if args.save_profile:
+        try:
+            save_profile(args.save_profile, scan_filter)
+        except (OSError, ValueError) as e:
+            sys.stderr.write(f"Erro ao gravar o perfil: {str(e)}\n")
+            return EXIT_ERROR
+
+    apply_keep = args.keep or not (args.reference or args.images)
+    report_writer = None
+
+    def finish_group(group: DuplicateGroup):
+        """Aplica a política do arquivo mantido e, nos relatórios JSONL/CSV/Parquet,
+        grava o grupo assim que ele fica pronto"""
+        if apply_keep:
+            group.choose_keeper(args.keep or "oldest", args.preferred_folder)
+        if report_writer is not None:
+            report_writer.write_group(group)
+
+    try:
+        with (ReportWriter(args.output, args.format) if streaming else nullcontext()) as report_writer:
+            result = run_scan(
+                args.folders,
+                recursive=not args.no_subdirs,
+                filters=scan_filter,
+                algorithm=args.algorithm,
+                confirm_algorithm=args.confirm,
+                workers=args.workers,
+                use_processes=args.processes,
+                use_cache=not args.no_cache,
+                incremental=args.incremental,
+                progress=emit_progress if args.progress else None,
+                reference_root=args.reference,
+                reference_index_path=args.reference_index,
+                image_method=args.images,
+                image_distance=args.image_distance,
+                chunk_size=args.chunks,
+                verify=args.verify,
+                group_sink=finish_group
+            )
+        if streaming:
+            if args.output != "-":
+                sys.stderr.write(f"Relatório gravado em {args.output}\n")
+        else:
+            write_output(result['groups'], args.format, args.output)
+        if args.metrics:
+            write_metrics(result['metrics'], args.metrics)
+        if args.chunk_report:
+            write_chunk_report(result['chunk_analysis'], args.chunk_report)
+    except (OSError, sqlite3.Error) as e:
+        sys.stderr.write(f"Erro: {str(e)}\n")
+        return EXIT_ERROR
+
+    if args.progress:
+        event = {'event': 'metrics', 'time': round(time.time(), 3)}
+        event.update(result['metrics'])
+        sys.stderr.write(json.dumps(event, ensure_ascii=False) + "\n")
+        sys.stderr.flush()
+
+    if args.dedup:
+        dedup_result = dedup_groups(result['groups'], args.dedup)
+        sys.stderr.write(
+            f"Deduplicação ({args.dedup}): {dedup_result['linked']} cópia(s) substituída(s), "
+            f"{dedup_result['bytes_reclaimed']} bytes liberados\n"
+        )
+        if dedup_result['cross_device']:
+            sys.stderr.write(f"Aviso: {dedup_result['cross_device']} cópia(s) mantida(s) por estar(em) em outro "
+                             f"sistema de arquivos que o arquivo mantido\n")
+        for path, message in dedup_result['errors']:
+            sys.stderr.write(f"Erro ao deduplicar {path}: {message}\n")
+        if dedup_result['errors']:
+            return EXIT_ERROR
+
+    if result['hash_stats'].get('cache_error'):
+        sys.stderr.write(f"Aviso: cache de hashes indisponível ({result['hash_stats']['cache_error']})\n")
+    errors = sum(result['metrics']['errors'].values())
+    if errors:
+        sys.stderr.write(f"Aviso: {errors} arquivo(s) ou pasta(s) não puderam ser lidos e foram ignorados\n")
+
+    verify_stats = result['verify_stats']
+    if verify_stats is not None:
+        sys.stderr.write(
+            f"Conferência byte a byte: {verify_stats['groups_verified']} de {verify_stats['groups_checked']} grupo(s) "
+            f"idênticos, {verify_stats['groups_split']} separado(s), {verify_stats['files_dropped']} arquivo(s) "
+            f"sem cópia idêntica, {verify_stats['read_errors']} erro(s) de leitura "
+            f"({verify_stats['groups_unreadable']} grupo(s) com arquivos ilegíveis)\n"
+        )
+
+    chunk_analysis = result['chunk_analysis']
+    if chunk_analysis is not None:
+        stats = chunk_analysis['stats']
+        sys.stderr.write(
+            f"Blocos: {stats['files']} arquivo(s), {stats['unique_chunks']} de {stats['chunks']} blocos distintos; "
+            f"{len(chunk_analysis['pairs'])} par(es) com conteúdo em comum; "
+            f"economia estimada por blocos: {stats['dedup_savings']} bytes\n"
+        )
+        if not args.chunk_report:
+            # Sem relatório, mostra os pares com mais conteúdo em comum
+            for pair in chunk_analysis['pairs'][:10]:
+                sys.stderr.write(f"  {pair['shared_bytes']} bytes ({pair['shared_percent']}%): "
+                                 f"{pair['path_a']} <-> {pair['path_b']}\n")
+
+    if args.watch:
+        return watch_folders(args, scan_filter, result)
+
+    found = result['groups'] or (chunk_analysis is not None and chunk_analysis['pairs'])
+    return EXIT_DUPLICATES if found else EXIT_OK
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,131 @@
+import os
+import shutil
+import uuid
+from typing import Callable, Dict, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+from engine import DuplicateGroup
+from hashing import LARGE_BLOCK_SIZE
+from scanner import FileRecord
+
+# Clonagem copy-on-write de um arquivo inteiro (Linux: btrfs, XFS), ver ioctl_ficlone(2)
+FICLONE = 0x40049409
+
+DEDUP_MODES = {
+    'hardlink': "Link físico (hardlink)",
+    'reflink': "Cópia sob demanda (reflink)",
+}
+
+# Callback de progresso: (grupos processados, total)
+DedupProgressCallback = Callable[[int, int], None]
+
+def files_identical(path_a: str, path_b: str, block_size: int = LARGE_BLOCK_SIZE) -> bool:
+    """Compara dois arquivos byte a byte, parando na primeira diferença"""
+    if os.path.getsize(path_a) != os.path.getsize(path_b):
+        return False
+    with open(path_a, 'rb') as fa, open(path_b, 'rb') as fb:
+        while True:
+            block_a = fa.read(block_size)
+            if block_a != fb.read(block_size):
+                return False
+            if not block_a:
+                return True
+
+def reflink(source: str, destination: str):
+    """Cria 'destination' como clone copy-on-write de 'source' (ioctl FICLONE)"""
+    if fcntl is None:
+        raise OSError("Reflink não é suportado neste sistema")
+    with open(source, 'rb') as src, open(destination, 'wb') as dst:
+        fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+
+def replace_with_link(keeper: str, copy: str, mode: str = 'hardlink') -> bool:
+    """Substitui 'copy' por um link para 'keeper', após conferir o conteúdo.
+
+    O link é criado num arquivo temporário na pasta da cópia e só então
+    renomeado sobre ela (os.replace, atômico), de modo que o caminho nunca
+    fica ausente nem com conteúdo parcial. Retorna False se a cópia já é um
+    link físico do arquivo mantido; lança ValueError se o conteúdo diverge.
+    """
+    if mode not in DEDUP_MODES:
+        raise ValueError(f"Modo de deduplicação desconhecido: {mode}")
+    if os.path.samefile(keeper, copy):
+        return False
+    if not files_identical(keeper, copy):
+        raise ValueError("O conteúdo difere do arquivo mantido")
+
+    temp_path = os.path.join(os.path.dirname(copy), f".{os.path.basename(copy)}.{uuid.uuid4().hex[:8]}.dedup")
+    try:
+        if mode == 'hardlink':
+            os.link(keeper, temp_path)
+        else:
+            reflink(keeper, temp_path)
+            # O clone é um arquivo próprio: mantém as datas e permissões da cópia
+            shutil.copystat(copy, temp_path)
+        os.replace(temp_path, copy)
+    except BaseException:
+        if os.path.lexists(temp_path):
+            os.remove(temp_path)
+        raise
+    return True
+
+def _device(path: str) -> int:
+    return os.stat(path).st_dev
+
+def changed_since_scan(member: FileRecord) -> bool:
+    """Tamanho ou data de modificação diferentes dos da análise (datas comparadas em segundos,
+    a resolução dos relatórios)"""
+    file_stat = os.stat(member.path)
+    return file_stat.st_size != member.size or int(file_stat.st_mtime) != int(member.modified_time)
+
+def dedup_groups(groups: List[DuplicateGroup], mode: str = 'hardlink',
+                 progress: Optional[DedupProgressCallback] = None) -> Dict:
+    """Substitui as cópias de cada grupo por links para o arquivo mantido.
+
+    Arquivos alterados desde a análise (ver changed_since_scan) não são
+    tocados. Links não atravessam sistemas de arquivos: numa cópia em outro
+    dispositivo que o arquivo mantido, a primeira cópia desse dispositivo
+    permanece (contada em 'cross_device') e as seguintes viram links para ela.
+    Grupos que não são de conteúdo idêntico (imagens parecidas, ou tipo
+    desconhecido num relatório antigo) são recusados.
+    """
+    result = {'linked': 0, 'already_linked': 0, 'cross_device': 0, 'bytes_reclaimed': 0, 'errors': []}
+    for i, group in enumerate(groups):
+        keeper = group.keeper
+        try:
+            if group.kind is None:
+                keeper_error = "Tipo de grupo desconhecido (relatório antigo): refaça a análise antes de deduplicar"
+            elif group.kind == 'similar_image':
+                keeper_error = "Imagens parecidas têm conteúdos diferentes"
+            else:
+                keeper_error = "O arquivo mantido foi alterado depois da análise" if changed_since_scan(keeper) else None
+            targets = {_device(keeper.path): keeper.path}
+        except OSError as e:
+            keeper_error = f"Arquivo mantido inacessível: {str(e)}"
+        for member in group.copies:
+            try:
+                if keeper_error is not None:
+                    raise ValueError(keeper_error)
+                device = _device(member.path)
+                target = targets.get(device)
+                if target is not None and os.path.samefile(target, member.path):
+                    result['already_linked'] += 1
+                    continue
+                if changed_since_scan(member):
+                    raise ValueError("A cópia foi alterada depois da análise")
+                if target is None:
+                    # Primeira cópia neste dispositivo: fica como original dele
+                    targets[device] = member.path
+                    result['cross_device'] += 1
+                    continue
+                replace_with_link(target, member.path, mode)
+                result['linked'] += 1
+                result['bytes_reclaimed'] += group.size
+            except (OSError, ValueError) as e:
+                result['errors'].append((member.path, str(e)))
+        if progress is not None:
+            progress(i + 1, len(groups))
+    return result
@@ -0,0 +1,566 @@
+import json
+import os
+import sqlite3
+import time
+from datetime import datetime
+from contextlib import nullcontext
+from itertools import chain
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Set, Union
+
+from filters import ScanFilter
+from hash_cache import HashCache, DEFAULT_CACHE_PATH
+from hashing import compute_hashes_progressive, hash_stage, DEFAULT_WORKERS, PROGRESS_INTERVAL, ProgressCallback
+from metrics import ScanMetrics
+from reference_index import ReferenceIndex, DEFAULT_REFERENCE_INDEX_PATH
+from scanner import FileRecord, scan_files
+from snapshot import DEFAULT_SNAPSHOT_DIR, SnapshotStore, build_snapshot, scan_incremental
+from verify import verify_groups
+
+# Políticas para escolher, em cada grupo, o arquivo que permanece
+KEEPER_POLICIES = {
+    'oldest': "Mais antigo",
+    'newest': "Mais recente",
+    'shortest_path': "Caminho mais curto",
+    'largest': "Maior arquivo (imagens parecidas: maior resolução)",
+    'preferred_folder': "Pasta preferida",
+}
+
+# Tipos de grupo (DuplicateGroup.kind); só os de conteúdo idêntico admitem deduplicação por links
+GROUP_KINDS = {
+    'duplicate': "Arquivos idênticos",
+    'reference': "Encontrado no acervo de referência",
+    'similar_image': "Imagens parecidas",
+}
+
+def format_timestamp(timestamp: float) -> str:
+    return datetime.fromtimestamp(timestamp).strftime('%Y-%m-%d %H:%M:%S')
+
+class DuplicateGroup:
+    """Grupo de N arquivos com o mesmo conteúdo: um hash, um tamanho, N membros.
+
+    Os membros ficam ordenados do mais antigo para o mais recente; 'keeper_index'
+    indica o que permanece e os demais são as cópias removíveis. 'verification'
+    diz se o conteúdo foi conferido byte a byte (ver verify.VERIFICATION_STATES).
+    Na comparação com o acervo, 'reference' traz os caminhos dos membros que
+    estão no acervo (None nos demais grupos). 'kind' é o tipo do grupo (ver
+    GROUP_KINDS), ou None num grupo reaberto de um relatório que não o gravou.
+    """
+    __slots__ = ('digest', 'size', 'algorithm', 'members', 'keeper_index', 'verification', 'reference', 'kind')
+
+    def __init__(self, digest: str, size: int, algorithm: str, members: List[FileRecord]):
+        self.digest = digest
+        self.size = size
+        self.algorithm = algorithm
+        self.members = sorted(members, key=lambda x: (x.modified_time, x.path))
+        self.keeper_index = 0
+        self.verification = 'unverified'
+        self.reference = None
+        self.kind = 'duplicate'
+
+    @property
+    def keeper(self) -> FileRecord:
+        return self.members[self.keeper_index]
+
+    @property
+    def copies(self) -> List[FileRecord]:
+        return [member for i, member in enumerate(self.members) if i != self.keeper_index]
+
+    @property
+    def reclaimable_bytes(self) -> int:
+        """Espaço liberado ao manter só um dos N arquivos: tamanho × (N−1)"""
+        return self.size * (len(self.members) - 1)
+
+    def choose_keeper(self, policy: str = 'oldest', preferred_folder: Optional[str] = None):
+        """Define o arquivo que permanece conforme a política"""
+        indexes = range(len(self.members))
+        if policy == 'newest':
+            self.keeper_index = len(self.members) - 1
+        elif policy == 'shortest_path':
+            self.keeper_index = min(indexes, key=lambda i: (len(self.members[i].path), i))
+        elif policy == 'largest':
+            self.keeper_index = max(indexes, key=lambda i: (self.members[i].size, -i))
+        elif policy == 'preferred_folder' and preferred_folder:
+            prefix = os.path.join(os.path.normcase(os.path.abspath(preferred_folder)), "")
+            preferred = [i for i in indexes
+                         if os.path.normcase(os.path.abspath(self.members[i].path)).startswith(prefix)]
+            self.keeper_index = preferred[0] if preferred else 0
+        else:
+            self.keeper_index = 0
+
+    def to_dict(self) -> Dict:
+        data = {
+            'file_name': self.keeper.name,
+            'file_size': self.size,
+            'hash': self.digest,
+            'algorithm': self.algorithm,
+            'file_count': len(self.members),
+            'reclaimable_bytes': self.reclaimable_bytes,
+            'keeper': self.keeper.path,
+            'verification': self.verification,
+            'members': [
+                {'path': member.path, 'modified_date': format_timestamp(member.modified_time)}
+                for member in self.members
+            ],
+            'kind': self.kind,
+        }
+        if self.reference is not None:
+            data['reference'] = sorted(self.reference)
+        return data
+
+class SimilarImageGroup(DuplicateGroup):
+    """Grupo de imagens parecidas (hash perceptual próximo), não necessariamente idênticas.
+
+    'distances' traz a distância de Hamming de cada membro até a imagem de
+    referência do grupo, a de melhor qualidade (o primeiro dos membros
+    informados); os membros podem ter tamanhos diferentes. A política
+    'largest' mantém a imagem de referência.
+    """
+    __slots__ = ('distances', 'reference_index')
+
+    def __init__(self, method: str, members: List[FileRecord], distances: List[int]):
+        reference = members[0]
+        super().__init__(reference.hash, reference.size, method, members)
+        distance_by_path = {member.path: distance for member, distance in zip(members, distances)}
+        self.distances = [distance_by_path[member.path] for member in self.members]
+        self.reference_index = self.members.index(reference)
+        self.kind = 'similar_image'
+        self.choose_keeper('largest')
+
+    def choose_keeper(self, policy: str = 'largest', preferred_folder: Optional[str] = None):
+        if policy == 'largest':
+            self.keeper_index = self.reference_index
+        else:
+            super().choose_keeper(policy, preferred_folder)
+
+    @property
+    def reclaimable_bytes(self) -> int:
+        return sum(member.size for member in self.copies)
+
+    def to_dict(self) -> Dict:
+        data = super().to_dict()
+        data['file_size'] = self.keeper.size
+        data['max_distance'] = max(self.distances)
+        for member_data, member, distance in zip(data['members'], self.members, self.distances):
+            member_data['file_size'] = member.size
+            member_data['distance'] = distance
+        return data
+
+def apply_keeper_policy(groups: List[DuplicateGroup], policy: str = 'oldest',
+                        preferred_folder: Optional[str] = None):
+    """Aplica a política de escolha do arquivo mantido a todos os grupos"""
+    for group in groups:
+        group.choose_keeper(policy, preferred_folder)
+
+class FileComparator:
+    def find_duplicate_groups(self, all_files: List[FileRecord], algorithm: str = "md5") -> List[DuplicateGroup]:
+        """Agrupa os arquivos com o mesmo hash em grupos de N membros"""
+        hash_groups = {}
+        for file_info in all_files:
+            if file_info.hash:
+                hash_groups.setdefault(file_info.hash, []).append(file_info)
+
+        return [
+            DuplicateGroup(file_hash, files[0].size, algorithm, files)
+            for file_hash, files in hash_groups.items()
+            if len(files) > 1
+        ]
+
+    def save_results(self, results: List[Dict], filename: str = "duplicados_encontrados.json"):
+        """Salva resultados em arquivo JSON (erros de gravação são propagados)"""
+        with open(filename, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+
+def normalize_roots(root: Union[str, Iterable[str]]) -> List[str]:
+    """Lista de pastas a analisar, sem repetições nem pastas contidas em outra da lista"""
+    roots = [root] if isinstance(root, str) else list(root)
+    keys = [os.path.normcase(os.path.abspath(path)) for path in roots]
+    unique = []
+    for i, key in enumerate(keys):
+        repeated = key in keys[:i]
+        nested = any(j != i and other != key and key.startswith(os.path.join(other, ""))
+                     for j, other in enumerate(keys))
+        if not repeated and not nested:
+            unique.append(roots[i])
+    return unique
+
+def report_scan_progress(entries: Iterable[FileRecord], progress: Optional[ProgressCallback]) -> Iterator[FileRecord]:
+    """Repassa os registros da varredura emitindo eventos 'scanning' com a contagem parcial"""
+    if progress is None:
+        yield from entries
+        return
+    last_report = time.monotonic()
+    for count, entry in enumerate(entries, 1):
+        now = time.monotonic()
+        if now - last_report >= PROGRESS_INTERVAL:
+            last_report = now
+            progress('scanning', {'files': count})
+        yield entry
+
+def hash_files(all_files: List[FileRecord], root: Union[str, List[str]], use_cache: bool = True,
+               cache_path: str = DEFAULT_CACHE_PATH, seen_paths: Optional[Iterable[str]] = None,
+               **hash_options) -> Dict:
+    """Calcula os hashes (progressivos) usando o cache persistente quando possível.
+
+    Se o cache não puder ser aberto, os hashes são calculados sem ele e o erro
+    fica em stats['cache_error']. 'seen_paths' são os arquivos existentes em
+    'root' (uma pasta ou uma lista delas; padrão: os próprios 'all_files'),
+    usados para limpar o cache.
+    """
+    if seen_paths is None:
+        seen_paths = (file_info.path for file_info in all_files)
+    if use_cache:
+        try:
+            with HashCache(cache_path) as cache:
+                hash_stats = compute_hashes_progressive(all_files, cache, **hash_options)
+                seen_paths = set(seen_paths)
+                for path in ([root] if isinstance(root, str) else root):
+                    cache.prune_missing(path, seen_paths)
+                return hash_stats
+        except (sqlite3.Error, OSError) as e:
+            for file_info in all_files:
+                file_info.hash = None
+            hash_stats = compute_hashes_progressive(all_files, **hash_options)
+            hash_stats['cache_error'] = f"{cache_path}: {str(e)}"
+            return hash_stats
+    return compute_hashes_progressive(all_files, **hash_options)
+
+def merge_changed_files(all_files: List[FileRecord], changed_paths: Set[str], root: Union[str, List[str]], use_cache: bool = True,
+                        cache_path: str = DEFAULT_CACHE_PATH, **hash_options) -> Dict:
+    """Atualiza os hashes de uma análise anterior com os arquivos novos ou alterados.
+
+    Só os grupos de tamanho que receberam algum arquivo alterado passam de novo
+    pelo hash progressivo; os demais mantêm os hashes do snapshot.
+    """
+    affected_sizes = {file_info.size for file_info in all_files if file_info.path in changed_paths}
+    affected = [file_info for file_info in all_files if file_info.size in affected_sizes]
+    for file_info in affected:
+        file_info.hash = None
+    return hash_files(
+        affected, root, use_cache, cache_path,
+        seen_paths=(file_info.path for file_info in all_files), **hash_options
+    )
+
+def find_in_reference(all_files: List[FileRecord], reference_root: str, recursive: bool = True,
+                      index_path: str = DEFAULT_REFERENCE_INDEX_PATH, use_cache: bool = True,
+                      cache_path: str = DEFAULT_CACHE_PATH, workers: int = DEFAULT_WORKERS,
+                      use_processes: bool = False, algorithm: str = "md5",
+                      progress: Optional[ProgressCallback] = None,
+                      metrics: Optional[ScanMetrics] = None) -> Dict:
+    """Procura os arquivos informados no acervo de referência (já arquivados).
+
+    O índice do acervo é atualizado só com a listagem da pasta; depois, apenas
+    arquivos com tamanho presente no acervo têm o hash completo calculado, e do
+    lado do acervo só os arquivos desses tamanhos ainda sem hash no índice.
+
+    Retorna {'groups', 'hash_stats'}: cada grupo reúne os arquivos do acervo e
+    os arquivos informados com o mesmo conteúdo, com um arquivo do acervo como
+    mantido.
+    """
+    reference_root = os.path.abspath(reference_root)
+    stats = {
+        'total_files': len(all_files),
+        'total_bytes': sum(file_info.size for file_info in all_files),
+        'full_hashed': 0,
+        'bytes_read': 0,
+        'cache_hits': 0,
+        'read_errors': 0,
+        'algorithm': algorithm,
+    }
+    cache = None
+    if use_cache:
+        try:
+            cache = HashCache(cache_path)
+        except (sqlite3.Error, OSError) as e:
+            stats['cache_error'] = f"{cache_path}: {str(e)}"
+
+    try:
+        with ReferenceIndex(index_path) as index:
+            stats['reference'] = index.update(reference_root, recursive, metrics)
+            if progress is not None:
+                progress('reference_indexed', stats['reference'])
+            sizes = index.matching_sizes(reference_root, {file_info.size for file_info in all_files})
+            candidates = [file_info for file_info in all_files if file_info.size in sizes]
+            digests = hash_stage(candidates, 'full', cache, stats, workers, use_processes, algorithm, progress, metrics)
+            for file_info in candidates:
+                file_info.hash = digests[id(file_info)] or None
+
+            hashed_sizes = {file_info.size for file_info in candidates if file_info.hash}
+            stats['reference']['hashed'] = index.hash_missing(
+                reference_root, hashed_sizes, algorithm, workers, use_processes, cache, progress, metrics
+            )
+
+            incoming = {}
+            for file_info in candidates:
+                if file_info.hash:
+                    incoming.setdefault((file_info.size, file_info.hash), []).append(file_info)
+            groups = []
+            for (size, digest), files in incoming.items():
+                archived = index.lookup(reference_root, size, digest, algorithm)
+                archived_paths = {member.path for member in archived}
+                # Arquivos informados que estão dentro do próprio acervo não contam como novos
+                files = [file_info for file_info in files if file_info.path not in archived_paths]
+                if not archived or not files:
+                    continue
+                group = DuplicateGroup(digest, size, algorithm, archived + files)
+                group.reference = archived_paths
+                group.kind = 'reference'
+                group.keeper_index = next(i for i, member in enumerate(group.members)
+                                          if member.path in archived_paths)
+                groups.append(group)
+    finally:
+        if cache is not None:
+            cache.close()
+
+    stats['bytes_avoided'] = max(stats['total_bytes'] - stats['bytes_read'], 0)
+    return {'groups': groups, 'hash_stats': stats}
+
+def find_similar_images(all_files: List[FileRecord], method: str, max_distance: Optional[int] = None,
+                        use_cache: bool = True, cache_path: str = DEFAULT_CACHE_PATH,
+                        workers: int = DEFAULT_WORKERS, use_processes: bool = False,
+                        progress: Optional[ProgressCallback] = None,
+                        metrics: Optional[ScanMetrics] = None) -> Dict:
+    """Procura imagens parecidas (recodificadas, redimensionadas) pelo hash perceptual.
+
+    Só os arquivos com extensão de imagem são decodificados; os hashes ficam no
+    cache persistente. 'max_distance' None usa DEFAULT_MAX_DISTANCE.
+    Retorna {'groups' (SimilarImageGroup), 'hash_stats'}.
+    """
+    # Importado só aqui: numpy e Pillow pesam no início de toda análise
+    from image_similarity import (DEFAULT_MAX_DISTANCE, cluster_similar, compute_perceptual_hashes,
+                                  images_available, is_image)
+    if max_distance is None:
+        max_distance = DEFAULT_MAX_DISTANCE
+    if not images_available():
+        raise ValueError("A busca por imagens parecidas requer os pacotes numpy e Pillow")
+    images = [file_info for file_info in all_files if is_image(file_info.name)]
+    cache = None
+    cache_error = None
+    if use_cache:
+        try:
+            cache = HashCache(cache_path)
+        except (sqlite3.Error, OSError) as e:
+            cache_error = f"{cache_path}: {str(e)}"
+    try:
+        image_stats = compute_perceptual_hashes(images, method, cache, workers, use_processes, progress, metrics)
+    finally:
+        if cache is not None:
+            cache.close()
+
+    with (metrics.timer('group') if metrics is not None else nullcontext()):
+        groups = [SimilarImageGroup(method, members, distances)
+                  for members, distances in cluster_similar(images, max_distance, image_stats['resolutions'])]
+    stats = {
+        'total_files': len(all_files),
+        'total_bytes': sum(file_info.size for file_info in all_files),
+        'images': len(images),
+        'full_hashed': image_stats['hashed'],
+        'bytes_read': image_stats['bytes_read'],
+        'cache_hits': image_stats['cache_hits'],
+        'read_errors': image_stats['read_errors'],
+        'algorithm': method,
+        'max_distance': max_distance,
+    }
+    stats['bytes_avoided'] = max(stats['total_bytes'] - stats['bytes_read'], 0)
+    if cache_error:
+        stats['cache_error'] = cache_error
+    return {'groups': groups, 'hash_stats': stats}
+
+def run_scan(root: Union[str, List[str]], recursive: bool = True, include: Optional[List[str]] = None,
+             exclude: Optional[List[str]] = None, filters: Optional[ScanFilter] = None, algorithm: str = "md5",
+             confirm_algorithm: Optional[str] = None, workers: int = DEFAULT_WORKERS,
+             use_processes: bool = False, use_cache: bool = True, cache_path: str = DEFAULT_CACHE_PATH,
+             incremental: bool = False, snapshot_dir: str = DEFAULT_SNAPSHOT_DIR,
+             progress: Optional[ProgressCallback] = None, listing: Optional[Iterable[FileRecord]] = None,
+             reference_root: Optional[str] = None,
+             reference_index_path: str = DEFAULT_REFERENCE_INDEX_PATH,
+             image_method: Optional[str] = None, image_distance: Optional[int] = None,
+             chunk_size: Optional[int] = None, verify: bool = False,
+             group_sink: Optional[Callable[['DuplicateGroup'], None]] = None) -> Dict:
+    """Executa a análise completa: varredura -> hash -> agrupamento.
+
+    'root' pode ser uma pasta ou uma lista de pastas, analisadas em conjunto
+    (duplicados entre pastas diferentes formam um mesmo grupo).
+
+    'filters' (ScanFilter) é aplicado durante a varredura: pastas excluídas
+    não são listadas e arquivos recusados não recebem stat. 'include' e
+    'exclude' são padrões glob somados ao filtro.
+
+    Com 'incremental', usa o snapshot da análise anterior da mesma pasta: só
+    diretórios com mtime alterado são listados e só os grupos de tamanho com
+    arquivos novos ou alterados têm os hashes recalculados. 'listing' reaproveita
+    uma varredura já feita da pasta, com o mesmo filtro (ignorado no modo
+    incremental).
+
+    'progress' recebe os eventos scan, scanning, scanned, hashing, hashed,
+    verified, grouped e chunked; uma exceção lançada por ele interrompe a análise.
+
+    Com 'reference_root', em vez de procurar duplicados entre as pastas, os
+    arquivos são procurados no acervo de referência (ver find_in_reference);
+    o modo incremental não se aplica.
+
+    Com 'image_method' (phash, dhash ou ahash), procura imagens parecidas, a
+    até 'image_distance' bits de distância (None = DEFAULT_MAX_DISTANCE), em vez
+    de arquivos idênticos (ver find_similar_images); não combina com 'reference_root' e o modo
+    incremental não se aplica.
+
+    Com 'chunk_size', depois do agrupamento os arquivos são divididos em
+    blocos definidos pelo conteúdo, desse tamanho médio, para achar arquivos
+    que compartilham parte do conteúdo (ver analyze_shared_chunks); pares de
+    cópias idênticas, já agrupadas, ficam de fora. Só na busca normal.
+
+    Com 'verify', antes do agrupamento final os membros de cada grupo são
+    comparados byte a byte (ver verify_groups): grupos com conteúdos
+    diferentes, apesar do mesmo hash, são divididos. Não combina com
+    'image_method', cujos grupos não são de arquivos idênticos.
+
+    'group_sink' recebe cada grupo assim que ele fica pronto: logo após o
+    agrupamento ou, com 'verify', ao fim da conferência de cada um; sempre
+    antes da análise por blocos (ex.: ReportWriter.write_group, para gravar o
+    relatório durante a análise).
+
+    Retorna um dicionário com 'all_files', 'groups' (DuplicateGroup, com o
+    arquivo mais antigo, ou o do acervo, como mantido), 'hash_stats',
+    'scan_stats', 'chunk_analysis' ('pairs' e 'stats', ou None), 'verify_stats'
+    (estatísticas da conferência, ou None) e 'metrics'
+    (ScanMetrics.to_dict: tempo por etapa, contadores, erros por tipo e
+    arquivos mais lentos).
+    """
+    if image_method is not None and reference_root is not None:
+        raise ValueError("A busca por imagens parecidas não pode ser combinada com o acervo de referência")
+    if chunk_size is not None and (image_method is not None or reference_root is not None):
+        raise ValueError("A análise por blocos não pode ser combinada com imagens parecidas nem com o acervo de referência")
+    if verify and image_method is not None:
+        raise ValueError("A conferência byte a byte não se aplica à busca por imagens parecidas")
+    metrics = ScanMetrics()
+
+    def report(stage: str, **info):
+        if progress is not None:
+            progress(stage, info)
+
+    hash_options = {
+        'workers': workers,
+        'use_processes': use_processes,
+        'algorithm': algorithm,
+        'confirm_algorithm': confirm_algorithm,
+        'progress': progress,
+        'metrics': metrics,
+    }
+    scan_filter = (filters or ScanFilter()).merged(include, exclude)
+    if not scan_filter.active:
+        scan_filter = None
+    filter_signature = scan_filter.to_dict() if scan_filter is not None else None
+    # Hashes do snapshot só valem para o mesmo algoritmo e os mesmos filtros
+    hash_signature = {'algorithm': confirm_algorithm or algorithm, 'filters': filter_signature}
+
+    roots = normalize_roots(root)
+    incremental = incremental and reference_root is None and image_method is None
+    if incremental:
+        roots = [os.path.abspath(path) for path in roots]
+    report('scan', root=roots[0] if len(roots) == 1 else roots)
+    snapshots = {}
+    scan_stats = {}
+    if incremental:
+        # Um snapshot por pasta; os hashes só são reaproveitados se todas tiverem um válido
+        scanned = []
+        dir_mtimes = {}
+        changed_paths = set()
+        listed_dirs = set()
+        with SnapshotStore(snapshot_dir) as snapshot_store:
+            for path in roots:
+                with metrics.timer('snapshot'):
+                    snapshots[path] = snapshot_store.load(path, recursive)
+                    if snapshots[path] is not None and \
+                            (snapshots[path]['hash_signature'] or {}).get('filters') != filter_signature:
+                        # A listagem guardada foi filtrada com outras regras
+                        snapshots[path] = None
+                with metrics.timer('scan'):
+                    root_files, dir_mtimes[path], root_changed, root_stats, root_listed = scan_incremental(
+                        path, recursive, snapshots[path], metrics, scan_filter
+                    )
+                scanned.extend(root_files)
+                changed_paths |= root_changed
+                listed_dirs |= root_listed
+                for key, value in root_stats.items():
+                    scan_stats[key] = scan_stats.get(key, 0) + value
+        all_files = scanned
+    else:
+        if listing is None:
+            entries = chain.from_iterable(scan_files(path, recursive, metrics, scan_filter) for path in roots)
+        else:
+            entries = listing
+        with metrics.timer('scan'):
+            all_files = list(report_scan_progress(entries, progress))
+    report('scanned', files=len(all_files), **scan_stats)
+
+    if reference_root is not None:
+        with metrics.timer('reference'):
+            reference = find_in_reference(
+                all_files, reference_root, recursive, reference_index_path, use_cache, cache_path,
+                workers, use_processes, confirm_algorithm or algorithm, progress, metrics
+            )
+        hash_stats = reference['hash_stats']
+        groups = reference['groups']
+        report('hashed', **hash_stats)
+    elif image_method is not None:
+        similar = find_similar_images(all_files, image_method, image_distance, use_cache, cache_path,
+                                      workers, use_processes, progress, metrics)
+        hash_stats = similar['hash_stats']
+        groups = similar['groups']
+        report('hashed', **hash_stats)
+    else:
+        dirty_dirs = None
+        if snapshots and all(snapshot is not None and snapshot['hash_signature'] == hash_signature
+                             for snapshot in snapshots.values()):
+            previous_hashes = [file_info.hash for file_info in all_files]
+            with metrics.timer('hash'):
+                hash_stats = merge_changed_files(all_files, changed_paths, roots, use_cache, cache_path, **hash_options)
+            # Regrava só os diretórios listados de novo e os com algum hash alterado
+            dirty_dirs = listed_dirs | {file_info.directory for file_info, file_hash in zip(all_files, previous_hashes)
+                                        if file_info.hash != file_hash}
+        else:
+            if incremental:
+                for file_info in scanned:
+                    file_info.hash = None
+            with metrics.timer('hash'):
+                hash_stats = hash_files(all_files, roots, use_cache, cache_path, **hash_options)
+        report('hashed', **hash_stats)
+
+        if incremental:
+            with metrics.timer('snapshot'), SnapshotStore(snapshot_dir) as snapshot_store:
+                for path in roots:
+                    new_snapshot = build_snapshot(path, recursive, dir_mtimes[path], scanned)
+                    new_snapshot['hash_signature'] = hash_signature
+                    snapshot_store.save(new_snapshot, dirty_dirs)
+
+        with metrics.timer('group'):
+            groups = FileComparator().find_duplicate_groups(all_files, hash_stats['algorithm'])
+
+    verify_stats = None
+    if verify:
+        with metrics.timer('verify'):
+            groups, verify_stats = verify_groups(groups, workers, use_processes, progress, metrics, group_sink)
+        report('verified', **verify_stats)
+    elif group_sink is not None:
+        for group in groups:
+            group_sink(group)
+    report('grouped', groups=len(groups), reclaimable_bytes=sum(group.reclaimable_bytes for group in groups))
+
+    chunk_analysis = None
+    if chunk_size is not None:
+        from chunking import analyze_shared_chunks
+        group_of = {member.path: number for number, group in enumerate(groups) for member in group.members}
+        chunk_analysis = analyze_shared_chunks(
+            all_files, chunk_size, workers, use_processes, progress, metrics,
+            skip_pair=lambda first, second: group_of.get(first.path, -1) == group_of.get(second.path, -2)
+        )
+        report('chunked', pairs=len(chunk_analysis['pairs']), dedup_savings=chunk_analysis['stats']['dedup_savings'])
+
+    return {
+        'all_files': all_files,
+        'groups': groups,
+        'hash_stats': hash_stats,
+        'scan_stats': scan_stats,
+        'chunk_analysis': chunk_analysis,
+        'verify_stats': verify_stats,
+        'metrics': metrics.to_dict(),
+    }
@@ -0,0 +1,290 @@
+import glob
+import json
+import os
+import shutil
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+JOURNAL_PREFIX = ".movimentacao_"
+DEFAULT_COPY_WORKERS = 4
+
+# Callback de progresso: (arquivos processados, total)
+MoveProgressCallback = Callable[[int, int], None]
+
+class DestinationIndex:
+    """Índice dos nomes já usados na pasta de destino, montado uma única vez.
+
+    Resolve colisões (arquivo.txt -> arquivo_1.txt, arquivo_2.txt, ...) em
+    memória, lembrando o próximo sufixo de cada nome, sem consultar o disco
+    a cada tentativa.
+    """
+
+    def __init__(self, folder: str):
+        self.folder = folder
+        try:
+            self.taken = {os.path.normcase(name) for name in os.listdir(folder)}
+        except OSError:
+            self.taken = set()
+        self.next_suffix = {}
+
+    def reserve(self, file_name: str) -> str:
+        """Retorna um caminho livre no destino para o nome informado e o reserva"""
+        candidate = file_name
+        if os.path.normcase(candidate) in self.taken:
+            name, ext = os.path.splitext(file_name)
+            key = os.path.normcase(file_name)
+            counter = self.next_suffix.get(key, 1)
+            candidate = f"{name}_{counter}{ext}"
+            while os.path.normcase(candidate) in self.taken:
+                counter += 1
+                candidate = f"{name}_{counter}{ext}"
+            self.next_suffix[key] = counter + 1
+        self.taken.add(os.path.normcase(candidate))
+        return os.path.join(self.folder, candidate)
+
+def same_filesystem(path_a: str, path_b: str) -> bool:
+    """Indica se os dois caminhos estão no mesmo volume (rename possível)"""
+    try:
+        return os.stat(path_a).st_dev == os.stat(path_b).st_dev
+    except OSError:
+        return False
+
+def partial_path(destination: str) -> str:
+    """Nome temporário da cópia em andamento, na mesma pasta do destino"""
+    folder, name = os.path.split(destination)
+    return os.path.join(folder, f".{name}.movendo")
+
+def move_one(source: str, destination: str):
+    """Move um arquivo: rename no mesmo volume, cópia + remoção entre volumes.
+
+    Entre volumes, copia para um nome temporário na pasta de destino, grava
+    em disco (fsync) e só então dá os.replace para o nome final e remove a
+    origem: uma interrupção nunca deixa um arquivo incompleto no destino.
+    """
+    try:
+        os.rename(source, destination)
+        return
+    except OSError:
+        pass
+    partial = partial_path(destination)
+    try:
+        shutil.copyfile(source, partial)
+        shutil.copystat(source, partial)
+        with open(partial, 'rb+') as f:
+            os.fsync(f.fileno())
+        os.replace(partial, destination)
+    except BaseException:
+        try:
+            os.remove(partial)
+        except OSError:
+            pass
+        raise
+    os.unlink(source)
+
+def same_content(path_a: str, path_b: str, length: int) -> bool:
+    """Compara os primeiros 'length' bytes de dois arquivos"""
+    with open(path_a, 'rb') as fa, open(path_b, 'rb') as fb:
+        while length > 0:
+            size = min(length, 1024 * 1024)
+            block = fa.read(size)
+            if not block or block != fb.read(size):
+                return False
+            length -= len(block)
+    return True
+
+def resume_in_flight(source: str, destination: str) -> Optional[str]:
+    """Trata um destino planejado pelo diário que já existe ao retomar.
+
+    Se é uma cópia completa da origem (interrupção entre a cópia e a remoção
+    da origem), conclui removendo a origem; se é só o começo da origem
+    (cópia interrompida de uma versão anterior), refaz a movimentação.
+    Qualquer outro arquivo é preservado e vira erro.
+    """
+    if os.path.islink(destination):
+        return f"Já existe um arquivo em {destination}"
+    try:
+        source_size = os.path.getsize(source)
+        destination_size = os.path.getsize(destination)
+        if destination_size <= source_size and same_content(source, destination, destination_size):
+            if destination_size == source_size:
+                os.unlink(source)
+            else:
+                os.remove(destination)
+                move_one(source, destination)
+            return None
+    except OSError as e:
+        return str(e)
+    return f"Já existe um arquivo em {destination}"
+
+class MoveJournal:
+    """Diário (JSON Lines) de uma movimentação em lote, para retomar ou desfazer.
+
+    A primeira linha lista o plano completo; cada movimento concluído gera uma
+    linha 'done' e movimentos desfeitos, uma linha 'undone'.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._line_checked = False
+
+    @classmethod
+    def create(cls, folder: str, moves: List[Tuple[str, str]]) -> 'MoveJournal':
+        path = os.path.join(folder, f"{JOURNAL_PREFIX}{time.strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}.jsonl")
+        journal = cls(path)
+        journal._append({'op': 'plan', 'moves': moves})
+        return journal
+
+    def _append(self, record: Dict):
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        if not self._line_checked:
+            # Diário cortado no meio de uma linha: o registro começa numa linha nova
+            self._line_checked = True
+            try:
+                with open(self.path, 'rb') as f:
+                    f.seek(-1, os.SEEK_END)
+                    if f.read(1) != b"\n":
+                        line = "\n" + line
+            except OSError:
+                pass  # Diário novo ou vazio
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(line)
+            f.flush()
+
+    def mark(self, op: str, sources: Iterable[str]):
+        sources = list(sources)
+        if sources:
+            self._append({'op': op, 'sources': sources})
+
+    def read(self) -> Tuple[List[Tuple[str, str]], Set[str], Set[str]]:
+        """Retorna o plano, as origens movidas (e não desfeitas) e as desfeitas"""
+        moves = []
+        done = set()
+        undone = set()
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue  # Linha incompleta (interrupção durante a gravação)
+                if record['op'] == 'plan':
+                    moves = [tuple(move) for move in record['moves']]
+                elif record['op'] == 'done':
+                    done.update(record['sources'])
+                    undone.difference_update(record['sources'])
+                elif record['op'] == 'undone':
+                    done.difference_update(record['sources'])
+                    undone.update(record['sources'])
+        return moves, done, undone
+
+    def pending(self) -> List[Tuple[str, str]]:
+        """Movimentos do plano que ainda não foram concluídos (nem desfeitos)"""
+        moves, done, undone = self.read()
+        return [move for move in moves if move[0] not in done and move[0] not in undone]
+
+def find_incomplete_journals(folder: str) -> List[str]:
+    """Diários da pasta com movimentos pendentes (lote interrompido)"""
+    incomplete = []
+    for path in sorted(glob.glob(os.path.join(folder, f"{JOURNAL_PREFIX}*.jsonl"))):
+        try:
+            if any(os.path.exists(source) for source, _ in MoveJournal(path).pending()):
+                incomplete.append(path)
+        except (OSError, KeyError):
+            continue
+    return incomplete
+
+class BatchMover:
+    """Move arquivos em lote para uma pasta, com diário para retomar ou desfazer"""
+
+    def __init__(self, destination_folder: str, workers: int = DEFAULT_COPY_WORKERS):
+        self.destination_folder = destination_folder
+        self.workers = workers
+
+    def plan(self, sources: Iterable[str]) -> List[Tuple[str, str]]:
+        """Define o destino de cada arquivo, resolvendo colisões de nome em memória"""
+        index = DestinationIndex(self.destination_folder)
+        return [(source, index.reserve(os.path.basename(source))) for source in sources]
+
+    def move(self, sources: Iterable[str], progress: Optional[MoveProgressCallback] = None) -> Dict:
+        """Planeja, registra no diário e executa a movimentação"""
+        moves = self.plan(sources)
+        journal = MoveJournal.create(self.destination_folder, moves)
+        return self.execute(journal, moves, progress)
+
+    def resume(self, journal_path: str, progress: Optional[MoveProgressCallback] = None) -> Dict:
+        """Conclui um lote interrompido a partir do seu diário"""
+        journal = MoveJournal(journal_path)
+        return self.execute(journal, journal.pending(), progress)
+
+    def execute(self, journal: MoveJournal, moves: List[Tuple[str, str]],
+                progress: Optional[MoveProgressCallback] = None) -> Dict:
+        """Executa os movimentos: renames no mesmo volume em sequência, cópias entre volumes em paralelo"""
+        result = {'moved': 0, 'errors': [], 'journal': journal.path}
+        total = len(moves)
+        processed = 0
+
+        def finished(source: str, error: Optional[str]):
+            nonlocal processed
+            processed += 1
+            if error is None:
+                result['moved'] += 1
+                journal.mark('done', [source])
+            else:
+                result['errors'].append((source, error))
+            if progress is not None:
+                progress(processed, total)
+
+        cross_device = []
+        for source, destination in moves:
+            # Cópia temporária deixada por uma interrupção: nunca é um arquivo completo
+            if os.path.lexists(partial_path(destination)):
+                try:
+                    os.remove(partial_path(destination))
+                except OSError:
+                    pass
+            if not os.path.exists(source):
+                # Já movido antes de uma interrupção, sem registro no diário
+                finished(source, None if os.path.exists(destination) else "Arquivo não encontrado")
+            elif os.path.lexists(destination):
+                # Destino planejado já existe ao retomar: movimentação em andamento ou outro arquivo
+                finished(source, resume_in_flight(source, destination))
+            elif same_filesystem(source, self.destination_folder):
+                try:
+                    os.rename(source, destination)
+                    finished(source, None)
+                except OSError as e:
+                    finished(source, str(e))
+            else:
+                cross_device.append((source, destination))
+
+        if cross_device:
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                futures = {executor.submit(move_one, source, destination): source
+                           for source, destination in cross_device}
+                for future in as_completed(futures):
+                    error = future.exception()
+                    finished(futures[future], None if error is None else str(error))
+
+        return result
+
+    def undo(self, journal_path: str, progress: Optional[MoveProgressCallback] = None) -> Dict:
+        """Devolve os arquivos de um lote às pastas de origem"""
+        journal = MoveJournal(journal_path)
+        moves, done, _ = journal.read()
+        to_restore = [(source, destination) for source, destination in moves
+                      if source in done or (os.path.exists(destination) and not os.path.exists(source))]
+        result = {'restored': 0, 'errors': [], 'journal': journal_path}
+        for i, (source, destination) in enumerate(to_restore):
+            try:
+                if os.path.exists(source):
+                    raise FileExistsError(f"Já existe um arquivo em {source}")
+                os.makedirs(os.path.dirname(source), exist_ok=True)
+                move_one(destination, source)
+                journal.mark('undone', [source])
+                result['restored'] += 1
+            except OSError as e:
+                result['errors'].append((source, str(e)))
+            if progress is not None:
+                progress(i + 1, len(to_restore))
+        return result
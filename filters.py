@@ -0,0 +1,153 @@
+import json
+import os
+import re
+from fnmatch import fnmatch
+from typing import Dict, List, Optional
+
+DEFAULT_PROFILES_PATH = os.path.join(os.path.expanduser("~"), ".comparador_arquivos", "filtros.json")
+
+# Perfis prontos, sempre disponíveis (não podem ser sobrescritos nem removidos)
+BUILTIN_PROFILES = {
+    'sistema': {
+        'exclude': ['.git', '.svn', '.hg', 'node_modules', '__pycache__', 'ArquivosDuplicados',
+                    '$RECYCLE.BIN', 'System Volume Information', 'desktop.ini', 'Thumbs.db', '.DS_Store'],
+        'min_size': 1,
+    },
+}
+
+FILTER_FIELDS = ('include', 'exclude', 'include_regex', 'exclude_regex', 'extensions', 'min_size', 'max_size')
+
+SIZE_UNITS = {'': 1, 'B': 1, 'K': 1024, 'KB': 1024, 'M': 1024 ** 2, 'MB': 1024 ** 2,
+              'G': 1024 ** 3, 'GB': 1024 ** 3, 'T': 1024 ** 4, 'TB': 1024 ** 4}
+
+def parse_size(text: str) -> int:
+    """Converte um tamanho como '4096', '10K', '1.5MB' ou '2G' em bytes"""
+    match = re.fullmatch(r"\s*(\d+(?:[.,]\d+)?)\s*([A-Za-z]*)\s*", str(text))
+    if not match or match.group(2).upper() not in SIZE_UNITS:
+        raise ValueError(f"tamanho inválido: {text}")
+    return int(float(match.group(1).replace(',', '.')) * SIZE_UNITS[match.group(2).upper()])
+
+def normalize_extension(extension: str) -> str:
+    extension = extension.strip().lower()
+    return extension if extension.startswith('.') else f".{extension}"
+
+class ScanFilter:
+    """Regras de inclusão/exclusão aplicadas durante a varredura.
+
+    - include/exclude: padrões glob comparados com o nome (ou com o caminho
+      relativo à pasta analisada, se o padrão tiver '/'). 'exclude' vale para
+      arquivos e pastas: uma pasta excluída não é listada.
+    - include_regex/exclude_regex: expressões regulares buscadas no caminho
+      relativo (separador '/'); 'exclude_regex' também poda pastas.
+    - extensions: só arquivos com estas extensões.
+    - min_size/max_size: limites de tamanho em bytes (o único teste que exige
+      o stat do arquivo; os demais são feitos antes dele).
+    """
+
+    def __init__(self, include: Optional[List[str]] = None, exclude: Optional[List[str]] = None,
+                 include_regex: Optional[List[str]] = None, exclude_regex: Optional[List[str]] = None,
+                 extensions: Optional[List[str]] = None, min_size: int = 0, max_size: Optional[int] = None):
+        self.include = list(include or [])
+        self.exclude = list(exclude or [])
+        self.include_regex = list(include_regex or [])
+        self.exclude_regex = list(exclude_regex or [])
+        self.extensions = sorted({normalize_extension(extension) for extension in extensions or [] if extension.strip()})
+        self.min_size = min_size or 0
+        self.max_size = max_size
+        # Compila uma vez; re.error (padrão inválido) é propagado para quem montou o filtro
+        self._include_re = [re.compile(pattern) for pattern in self.include_regex]
+        self._exclude_re = [re.compile(pattern) for pattern in self.exclude_regex]
+        self._extensions = tuple(self.extensions)
+
+    @property
+    def active(self) -> bool:
+        return bool(self.include or self.exclude or self.include_regex or self.exclude_regex
+                    or self.extensions or self.min_size or self.max_size is not None)
+
+    def _excluded(self, name: str, rel_path: str) -> bool:
+        if any(fnmatch(rel_path if '/' in pattern else name, pattern) for pattern in self.exclude):
+            return True
+        return any(regex.search(rel_path) for regex in self._exclude_re)
+
+    def accepts_dir(self, name: str, rel_path: str) -> bool:
+        """Se a pasta deve ser percorrida (False poda a subárvore inteira)"""
+        return not self._excluded(name, rel_path)
+
+    def accepts_name(self, name: str, rel_path: str) -> bool:
+        """Testes que dispensam o stat: padrões e extensão"""
+        if self._extensions and not name.lower().endswith(self._extensions):
+            return False
+        if self.include and not any(fnmatch(rel_path if '/' in pattern else name, pattern)
+                                    for pattern in self.include):
+            return False
+        if self._include_re and not any(regex.search(rel_path) for regex in self._include_re):
+            return False
+        return not self._excluded(name, rel_path)
+
+    def accepts_size(self, size: int) -> bool:
+        return size >= self.min_size and (self.max_size is None or size <= self.max_size)
+
+    def merged(self, include: Optional[List[str]] = None, exclude: Optional[List[str]] = None) -> 'ScanFilter':
+        """Cópia do filtro com padrões glob adicionais"""
+        data = self.to_dict()
+        data['include'] = data['include'] + list(include or [])
+        data['exclude'] = data['exclude'] + list(exclude or [])
+        return ScanFilter.from_dict(data)
+
+    def to_dict(self) -> Dict:
+        return {
+            'include': self.include,
+            'exclude': self.exclude,
+            'include_regex': self.include_regex,
+            'exclude_regex': self.exclude_regex,
+            'extensions': self.extensions,
+            'min_size': self.min_size,
+            'max_size': self.max_size,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'ScanFilter':
+        return cls(**{key: data[key] for key in FILTER_FIELDS if key in data})
+
+    def __repr__(self) -> str:
+        rules = ", ".join(f"{key}={value!r}" for key, value in self.to_dict().items() if value)
+        return f"ScanFilter({rules})"
+
+def load_profiles(path: str = DEFAULT_PROFILES_PATH) -> Dict[str, Dict]:
+    """Perfis de filtro salvos (nome -> regras), junto com os perfis prontos"""
+    profiles = dict(BUILTIN_PROFILES)
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            saved = json.load(f)
+    except (OSError, ValueError):
+        saved = {}
+    for name, data in saved.items():
+        if name not in BUILTIN_PROFILES and isinstance(data, dict):
+            profiles[name] = data
+    return profiles
+
+def _write_profiles(profiles: Dict[str, Dict], path: str):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    temp_path = path + ".tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(profiles, f, indent=2, ensure_ascii=False)
+    os.replace(temp_path, path)
+
+def save_profile(name: str, scan_filter: ScanFilter, path: str = DEFAULT_PROFILES_PATH):
+    """Grava (ou substitui) um perfil de filtro"""
+    if name in BUILTIN_PROFILES:
+        raise ValueError(f"o perfil '{name}' é predefinido e não pode ser alterado")
+    profiles = {key: value for key, value in load_profiles(path).items() if key not in BUILTIN_PROFILES}
+    profiles[name] = scan_filter.to_dict()
+    _write_profiles(profiles, path)
+
+def delete_profile(name: str, path: str = DEFAULT_PROFILES_PATH):
+    profiles = {key: value for key, value in load_profiles(path).items() if key not in BUILTIN_PROFILES}
+    if profiles.pop(name, None) is not None:
+        _write_profiles(profiles, path)
+
+def load_profile(name: str, path: str = DEFAULT_PROFILES_PATH) -> ScanFilter:
+    """Filtro de um perfil salvo ou pronto (KeyError se não existir)"""
+    return ScanFilter.from_dict(load_profiles(path)[name])
@@ -0,0 +1,134 @@
+import os
+import sqlite3
+import time
+from typing import Iterable, Optional
+
+from scanner import inode_matches
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".comparador_arquivos", "hash_cache.db")
+DEFAULT_MAX_ENTRIES = 2_000_000
+
+class HashCache:
+    """Cache persistente (SQLite) de hashes, válido enquanto caminho, tamanho,
+    data de modificação e inode do arquivo não mudarem (sem inode no Windows,
+    ver scanner.inode_matches)"""
+
+    def __init__(self, db_path: str = DEFAULT_CACHE_PATH, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._pending_writes = []
+        self._pending_touches = []
+
+        if db_path != ":memory:":
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self.conn = sqlite3.connect(db_path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS hashes (
+                path TEXT NOT NULL,
+                algorithm TEXT NOT NULL,
+                stage TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                mtime REAL NOT NULL,
+                inode INTEGER NOT NULL,
+                digest TEXT NOT NULL,
+                last_used REAL NOT NULL,
+                PRIMARY KEY (path, algorithm, stage)
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_hashes_last_used ON hashes(last_used)")
+        self.conn.commit()
+
+    def get(self, file_info, stage: str, algorithm: str = "md5") -> Optional[str]:
+        """Retorna o hash armazenado se o arquivo não mudou desde que foi calculado"""
+        row = self.conn.execute(
+            "SELECT size, mtime, inode, digest FROM hashes WHERE path = ? AND algorithm = ? AND stage = ?",
+            (file_info.path, algorithm, stage)
+        ).fetchone()
+        if row and row[0] == file_info.size and row[1] == file_info.modified_time \
+                and inode_matches(row[2], file_info.inode):
+            self.hits += 1
+            self._pending_touches.append((time.time(), file_info.path, algorithm, stage))
+            return row[3]
+        self.misses += 1
+        return None
+
+    def put(self, file_info, stage: str, digest: str, algorithm: str = "md5"):
+        """Armazena o hash de um arquivo (gravado em lote)"""
+        self._pending_writes.append((
+            file_info.path, algorithm, stage, file_info.size,
+            file_info.modified_time, file_info.inode, digest, time.time()
+        ))
+        if len(self._pending_writes) >= 1000:
+            self.flush()
+
+    def flush(self):
+        """Grava no banco as alterações pendentes"""
+        if self._pending_writes:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO hashes VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                self._pending_writes
+            )
+            self._pending_writes = []
+        if self._pending_touches:
+            self.conn.executemany(
+                "UPDATE hashes SET last_used = ? WHERE path = ? AND algorithm = ? AND stage = ?",
+                self._pending_touches
+            )
+            self._pending_touches = []
+        self.conn.commit()
+
+    def prune_missing(self, root: str, seen_paths: Iterable[str]) -> int:
+        """Remove entradas de arquivos dentro de 'root' que não existem mais.
+        Só verifica no disco os caminhos que não apareceram na varredura."""
+        self.flush()
+        seen = set(seen_paths)
+        prefix = os.path.join(root, "")
+        pattern = prefix.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+        missing = []
+        for (path,) in self.conn.execute(
+                "SELECT DISTINCT path FROM hashes WHERE path LIKE ? ESCAPE '\\'", (pattern,)):
+            if path not in seen and not os.path.exists(path):
+                missing.append((path,))
+        self.conn.executemany("DELETE FROM hashes WHERE path = ?", missing)
+        self.conn.commit()
+        return len(missing)
+
+    def enforce_limit(self) -> int:
+        """Remove as entradas usadas há mais tempo quando o cache passa do limite"""
+        self.flush()
+        total = self.conn.execute("SELECT COUNT(*) FROM hashes").fetchone()[0]
+        excess = total - self.max_entries
+        if excess <= 0:
+            return 0
+        self.conn.execute(
+            "DELETE FROM hashes WHERE rowid IN (SELECT rowid FROM hashes ORDER BY last_used LIMIT ?)",
+            (excess,)
+        )
+        self.conn.commit()
+        return excess
+
+    def clear(self):
+        """Apaga todas as entradas do cache"""
+        self._pending_writes = []
+        self._pending_touches = []
+        self.conn.execute("DELETE FROM hashes")
+        self.conn.commit()
+
+    def __len__(self) -> int:
+        self.flush()
+        return self.conn.execute("SELECT COUNT(*) FROM hashes").fetchone()[0]
+
+    def close(self):
+        self.flush()
+        self.enforce_limit()
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
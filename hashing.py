@@ -0,0 +1,315 @@
+import hashlib
+import mmap
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from hash_cache import HashCache
+from metrics import ScanMetrics
+from scanner import FileRecord
+
+try:
+    import blake3
+except ImportError:
+    blake3 = None
+
+try:
+    import xxhash
+except ImportError:
+    xxhash = None
+
+# Tamanho dos blocos lidos nas etapas parciais (início e fim do arquivo)
+HEAD_BLOCK_SIZE = 4096
+TAIL_BLOCK_SIZE = 4096
+
+# Blocos de leitura do hash completo, escolhidos pelo tamanho do arquivo
+SMALL_BLOCK_SIZE = 64 * 1024
+MEDIUM_BLOCK_SIZE = 256 * 1024
+LARGE_BLOCK_SIZE = 1024 * 1024
+# A partir deste tamanho o arquivo é mapeado em memória (mmap) em vez de lido
+MMAP_THRESHOLD = 64 * 1024 * 1024
+
+# Leitores simultâneos padrão (hashlib libera o GIL durante o cálculo)
+DEFAULT_WORKERS = 4
+
+# Intervalo mínimo (segundos) entre dois eventos de progresso durante o hash
+PROGRESS_INTERVAL = 0.2
+
+# Callback de progresso: recebe o nome do evento e um dicionário com os contadores
+ProgressCallback = Callable[[str, Dict], None]
+
+def new_hasher(algorithm: str):
+    """Cria o objeto de hash do algoritmo informado"""
+    if algorithm in ('md5', 'sha1', 'sha256', 'blake2b', 'blake2s'):
+        return hashlib.new(algorithm)
+    if algorithm == 'blake3' and blake3 is not None:
+        return blake3.blake3()
+    if algorithm in ('xxh64', 'xxh3_64', 'xxh3_128') and xxhash is not None:
+        return getattr(xxhash, algorithm)()
+    raise ValueError(f"Algoritmo de hash indisponível: {algorithm}")
+
+def available_algorithms() -> List[str]:
+    """Lista os algoritmos de hash utilizáveis nesta instalação"""
+    algorithms = ['md5', 'sha1', 'sha256', 'blake2b', 'blake2s']
+    if blake3 is not None:
+        algorithms.append('blake3')
+    if xxhash is not None:
+        algorithms.extend(['xxh64', 'xxh3_64', 'xxh3_128'])
+    return algorithms
+
+def is_cryptographic(algorithm: str) -> bool:
+    """Indica se o algoritmo é criptográfico (resistente a colisões intencionais)"""
+    return not algorithm.startswith('xxh')
+
+# Algoritmo rápido para filtrar candidatos e algoritmo da confirmação criptográfica
+FAST_ALGORITHM = 'xxh3_128' if xxhash is not None else 'blake2b'
+CONFIRM_ALGORITHM = 'sha256'
+
+def choose_block_size(file_size: int) -> int:
+    """Escolhe o tamanho do bloco de leitura conforme o tamanho do arquivo"""
+    if file_size < 1024 * 1024:
+        return SMALL_BLOCK_SIZE
+    if file_size < MMAP_THRESHOLD:
+        return MEDIUM_BLOCK_SIZE
+    return LARGE_BLOCK_SIZE
+
+def calculate_hash(file_path: str, algorithm: str = 'md5', block_size: Optional[int] = None,
+                   use_mmap: bool = True) -> str:
+    """Calcula o hash de um arquivo com o algoritmo informado.
+
+    Lê com um único buffer reutilizado (readinto + memoryview), sem criar um
+    objeto bytes por bloco; arquivos grandes são mapeados em memória (mmap).
+    Erros de leitura (OSError) são propagados.
+    """
+    hasher = new_hasher(algorithm)
+    with open(file_path, "rb", buffering=0) as f:
+        file_size = os.fstat(f.fileno()).st_size
+        if use_mmap and file_size >= MMAP_THRESHOLD:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                hasher.update(mapped)
+        else:
+            buffer = bytearray(block_size or choose_block_size(file_size))
+            view = memoryview(buffer)
+            while True:
+                read = f.readinto(buffer)
+                if not read:
+                    break
+                hasher.update(view[:read])
+    return hasher.hexdigest()
+
+def calculate_partial_hash(file_path: str, offset: int, length: int, algorithm: str = 'md5') -> str:
+    """Calcula o hash de um trecho do arquivo (offset negativo = a partir do fim)"""
+    hasher = new_hasher(algorithm)
+    with open(file_path, "rb") as f:
+        if offset < 0:
+            f.seek(offset, os.SEEK_END)
+        else:
+            f.seek(offset)
+        hasher.update(f.read(length))
+    return hasher.hexdigest()
+
+def group_by_size(all_files: List[FileRecord]) -> Dict[int, List[FileRecord]]:
+    """Agrupa arquivos pelo tamanho (st_size)"""
+    size_groups = {}
+    for file_info in all_files:
+        size_groups.setdefault(file_info.size, []).append(file_info)
+    return size_groups
+
+def refine_groups(groups: List[List[FileRecord]], key_func: Callable[[FileRecord], str]) -> List[List[FileRecord]]:
+    """Subdivide cada grupo pela chave informada, descartando arquivos que ficaram sozinhos"""
+    refined = []
+    for files in groups:
+        buckets = {}
+        for file_info in files:
+            key = key_func(file_info)
+            if key:
+                buckets.setdefault(key, []).append(file_info)
+        refined.extend(bucket for bucket in buckets.values() if len(bucket) > 1)
+    return refined
+
+def map_ordered(func: Callable, items: Iterable, workers: int = 1,
+                max_in_flight: Optional[int] = None, use_processes: bool = False) -> Iterator:
+    """Aplica 'func' aos itens em paralelo, devolvendo os resultados na ordem de entrada.
+    No máximo 'max_in_flight' tarefas ficam pendentes ao mesmo tempo."""
+    if workers <= 1:
+        yield from map(func, items)
+        return
+    max_in_flight = max_in_flight or workers * 4
+    executor_class = ProcessPoolExecutor if use_processes else ThreadPoolExecutor
+    with executor_class(max_workers=workers) as executor:
+        pending = deque()
+        for item in items:
+            pending.append(executor.submit(func, item))
+            if len(pending) >= max_in_flight:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+def hash_for_stage(task: Tuple[str, str, str]) -> Tuple[str, float, Optional[Tuple[str, str]]]:
+    """Calcula o hash de uma etapa ('head', 'tail' ou 'full') para um caminho.
+
+    Retorna (hash, segundos, erro): em caso de erro de leitura o hash é "" e
+    'erro' traz o tipo e a mensagem da exceção.
+    """
+    stage, file_path, algorithm = task
+    start = time.perf_counter()
+    try:
+        if stage == 'head':
+            digest = calculate_partial_hash(file_path, 0, HEAD_BLOCK_SIZE, algorithm)
+        elif stage == 'tail':
+            digest = calculate_partial_hash(file_path, -TAIL_BLOCK_SIZE, TAIL_BLOCK_SIZE, algorithm)
+        else:
+            digest = calculate_hash(file_path, algorithm)
+    except OSError as e:
+        return "", time.perf_counter() - start, (type(e).__name__, str(e))
+    return digest, time.perf_counter() - start, None
+
+def stage_read_size(stage: str, size: int) -> int:
+    """Bytes lidos do disco por uma etapa de hash"""
+    if stage == 'head':
+        return min(size, HEAD_BLOCK_SIZE)
+    if stage == 'tail':
+        return min(size, TAIL_BLOCK_SIZE)
+    return size
+
+def hash_stage(files: List[FileRecord], stage: str, cache: Optional[HashCache], stats: Dict[str, int],
+               workers: int = 1, use_processes: bool = False, algorithm: str = 'md5',
+               progress: Optional[ProgressCallback] = None,
+               metrics: Optional[ScanMetrics] = None) -> Dict[int, str]:
+    """Calcula os hashes de uma etapa, consultando o cache antes de ler o disco.
+    Retorna um dicionário id(file_info) -> hash ("" para arquivos que não
+    puderam ser lidos; eles são contados em stats['read_errors']).
+
+    Com 'progress', emite eventos 'hashing' (no máximo um a cada
+    PROGRESS_INTERVAL segundos, e sempre ao fim da etapa) com os arquivos e
+    bytes já lidos e o total da etapa.
+
+    Com 'metrics', registra o tempo da etapa (hash_<etapa>), os contadores,
+    os erros de leitura por tipo e a duração de cada leitura.
+    """
+    stage_start = time.perf_counter()
+    digests = {}
+    to_compute = []
+    for file_info in files:
+        if cache is not None:
+            digest = cache.get(file_info, stage, algorithm)
+            if digest:
+                stats['cache_hits'] += 1
+                digests[id(file_info)] = digest
+                continue
+        to_compute.append(file_info)
+    if metrics is not None and cache is not None:
+        metrics.count('cache_hits', len(files) - len(to_compute))
+        metrics.count('cache_misses', len(to_compute))
+
+    bytes_total = sum(stage_read_size(stage, file_info.size) for file_info in to_compute)
+    bytes_done = 0
+    last_report = time.monotonic()
+    tasks = ((stage, file_info.path, algorithm) for file_info in to_compute)
+    results = map_ordered(hash_for_stage, tasks, workers, use_processes=use_processes)
+    for done, (file_info, (digest, seconds, error)) in enumerate(zip(to_compute, results), 1):
+        digests[id(file_info)] = digest
+        read_size = stage_read_size(stage, file_info.size)
+        bytes_done += read_size
+        stats['bytes_read'] += read_size
+        if error is not None:
+            stats['read_errors'] += 1
+            if metrics is not None:
+                metrics.record_error(file_info.path, *error)
+        elif cache is not None:
+            cache.put(file_info, stage, digest, algorithm)
+        if metrics is not None:
+            metrics.record_file(file_info.path, stage, file_info.size, seconds)
+        if progress is not None:
+            now = time.monotonic()
+            if now - last_report >= PROGRESS_INTERVAL or done == len(to_compute):
+                last_report = now
+                progress('hashing', {'hash_stage': stage, 'files': done, 'files_total': len(to_compute),
+                                     'bytes': bytes_done, 'bytes_total': bytes_total})
+
+    stats[f'{stage}_hashed'] += len(files)
+    if metrics is not None:
+        metrics.count('files_hashed', len(to_compute))
+        metrics.count('bytes_hashed', bytes_done)
+        metrics.add_time(f'hash_{stage}', time.perf_counter() - stage_start)
+    return digests
+
+def compute_hashes_progressive(all_files: List[FileRecord], cache: Optional[HashCache] = None,
+                               workers: int = 1, use_processes: bool = False,
+                               algorithm: str = 'md5', confirm_algorithm: Optional[str] = None,
+                               progress: Optional[ProgressCallback] = None,
+                               metrics: Optional[ScanMetrics] = None) -> Dict:
+    """Calcula o hash completo apenas dos arquivos que continuam colidindo após
+    as etapas de tamanho, bloco inicial e bloco final.
+
+    Arquivos descartados em alguma etapa ficam com hash = None; como seu
+    conteúdo é comprovadamente único, o agrupamento final é idêntico ao obtido
+    calculando o MD5 completo de todos os arquivos.
+
+    Com 'cache', hashes de arquivos inalterados são reaproveitados sem leitura.
+    Com 'workers' > 1, a leitura é feita em paralelo (threads, ou processos se
+    'use_processes'); a ordem dos resultados não depende do paralelismo.
+
+    Com 'confirm_algorithm', os arquivos que colidem no hash completo de
+    'algorithm' (por exemplo, um hash rápido não criptográfico) são recalculados
+    com o algoritmo de confirmação, que passa a ser o hash do resultado.
+    O nome do algoritmo efetivo fica em stats['algorithm'].
+
+    'progress' recebe os eventos de cada etapa e 'metrics' a instrumentação
+    (ver hash_stage). Arquivos que não puderam ser lidos ficam sem hash e são
+    contados em stats['read_errors'].
+    """
+    stats = {
+        'total_files': len(all_files),
+        'total_bytes': sum(file_info.size for file_info in all_files),
+        'head_hashed': 0,
+        'tail_hashed': 0,
+        'full_hashed': 0,
+        'bytes_read': 0,
+        'cache_hits': 0,
+        'read_errors': 0,
+        'algorithm': confirm_algorithm or algorithm,
+    }
+
+    # Etapa 1: tamanho
+    groups = [files for files in group_by_size(all_files).values() if len(files) > 1]
+
+    # Etapa 2: bloco inicial. Se o arquivo cabe no bloco, este já é o hash completo
+    files = [file_info for group in groups for file_info in group]
+    digests = hash_stage(files, 'head', cache, stats, workers, use_processes, algorithm, progress, metrics)
+    for file_info in files:
+        if file_info.size <= HEAD_BLOCK_SIZE:
+            file_info.hash = digests[id(file_info)]
+    groups = refine_groups(groups, lambda file_info: digests[id(file_info)])
+
+    # Etapa 3: bloco final
+    groups = [group for group in groups if group[0].size > HEAD_BLOCK_SIZE]
+    files = [file_info for group in groups for file_info in group]
+    digests = hash_stage(files, 'tail', cache, stats, workers, use_processes, algorithm, progress, metrics)
+    groups = refine_groups(groups, lambda file_info: digests[id(file_info)])
+
+    # Etapa 4: conteúdo completo
+    files = [file_info for group in groups for file_info in group]
+    digests = hash_stage(files, 'full', cache, stats, workers, use_processes, algorithm, progress, metrics)
+    for file_info in files:
+        file_info.hash = digests[id(file_info)]
+
+    # Etapa 5 (opcional): confirmação criptográfica dos grupos restantes
+    if confirm_algorithm and confirm_algorithm != algorithm:
+        groups = refine_groups(groups, lambda file_info: digests[id(file_info)])
+        # Arquivos pequenos (já com hash do bloco inicial) também são confirmados
+        small_groups = refine_groups(
+            [files for files in group_by_size(all_files).values()
+             if len(files) > 1 and files[0].size <= HEAD_BLOCK_SIZE],
+            lambda file_info: file_info.hash
+        )
+        groups += small_groups
+        files = [file_info for group in groups for file_info in group]
+        confirmed = hash_stage(files, 'full', cache, stats, workers, use_processes, confirm_algorithm, progress, metrics)
+        for file_info in all_files:
+            file_info.hash = confirmed.get(id(file_info))
+
+    stats['bytes_avoided'] = max(stats['total_bytes'] - stats['bytes_read'], 0)
+    return stats
@@ -0,0 +1,304 @@
+import time
+from itertools import combinations
+from math import comb
+from typing import Dict, Iterator, List, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+from hash_cache import HashCache
+from hashing import PROGRESS_INTERVAL, ProgressCallback, map_ordered
+from metrics import ScanMetrics
+from scanner import FileRecord
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.gif', '.tif', '.tiff', '.webp')
+# Formatos sem perda: preferidos como referência entre imagens de mesma resolução
+LOSSLESS_EXTENSIONS = ('.png', '.bmp', '.tif', '.tiff')
+
+# Métodos de hash perceptual (64 bits)
+PERCEPTUAL_METHODS = {
+    'phash': "DCT (pHash) - mais robusto a recompressão e ajustes",
+    'dhash': "Gradiente (dHash) - rápido e robusto a redimensionamento",
+    'ahash': "Média (aHash) - o mais rápido, mais falsos positivos",
+}
+DEFAULT_METHOD = 'phash'
+# Distância de Hamming máxima (em 64 bits) para considerar duas imagens parecidas
+DEFAULT_MAX_DISTANCE = 8
+HASH_BITS = 64
+
+# Tamanho (largura, altura) da miniatura em tons de cinza usada por cada método
+THUMBNAIL_SHAPES = {'ahash': (8, 8), 'dhash': (9, 8), 'phash': (32, 32)}
+# Miniaturas processadas juntas pelas operações vetorizadas
+BATCH_SIZE = 512
+
+# Multi-index hashing: tamanho máximo de cada pedaço do hash (tabela densa de
+# 2^bits posições), custo relativo de conferir um candidato e consultas por lote
+MAX_CHUNK_BITS = 22
+CANDIDATE_COST = 4
+QUERY_BLOCK = 65536
+
+def images_available() -> bool:
+    """Se o modo de imagens pode ser usado (requer numpy e Pillow)"""
+    return np is not None and Image is not None
+
+def is_image(name: str) -> bool:
+    return name.lower().endswith(IMAGE_EXTENSIONS)
+
+def load_thumbnail(task: Tuple[str, str]) -> Tuple[Optional['np.ndarray'], int, Optional[Tuple[str, str]]]:
+    """Decodifica a imagem já reduzida ao tamanho do método. Retorna (miniatura, resolução em pixels, erro)"""
+    path, method = task
+    width, height = THUMBNAIL_SHAPES[method]
+    try:
+        with Image.open(path) as image:
+            resolution = image.width * image.height
+            # JPEG: decodifica direto numa escala reduzida (1/2 a 1/8), bem mais rápido
+            image.draft('L', (width * 4, height * 4))
+            thumbnail = image.convert('L').resize((width, height), Image.Resampling.BOX)
+            return np.asarray(thumbnail, dtype=np.uint8), resolution, None
+    except (OSError, ValueError, Image.DecompressionBombError) as e:
+        return None, 0, (type(e).__name__, str(e))
+
+def dct_matrix(size: int) -> 'np.ndarray':
+    """Matriz da DCT-II ortonormal (size x size)"""
+    k = np.arange(size)[:, None]
+    i = np.arange(size)[None, :]
+    matrix = np.sqrt(2.0 / size) * np.cos(np.pi * (2 * i + 1) * k / (2 * size))
+    matrix[0] /= np.sqrt(2.0)
+    return matrix.astype(np.float32)
+
+def pack_bits(bits: 'np.ndarray') -> 'np.ndarray':
+    """(N, 64) booleanos -> N inteiros de 64 bits (primeiro bit = mais significativo)"""
+    return np.packbits(bits, axis=1).view('>u8').ravel().astype(np.uint64)
+
+def perceptual_hashes(pixels: 'np.ndarray', method: str) -> 'np.ndarray':
+    """Hashes de um lote de miniaturas (N, altura, largura), calculados de uma vez"""
+    pixels = pixels.astype(np.float32)
+    count = len(pixels)
+    if method == 'ahash':
+        bits = pixels > pixels.mean(axis=(1, 2), keepdims=True)
+    elif method == 'dhash':
+        bits = pixels[:, :, 1:] > pixels[:, :, :-1]
+    else:
+        dct = dct_matrix(pixels.shape[1])
+        low = (dct @ pixels @ dct.T)[:, :8, :8].reshape(count, 64)
+        # Mediana sem o coeficiente DC, que só reflete o brilho médio
+        bits = low > np.median(low[:, 1:], axis=1, keepdims=True)
+    return pack_bits(bits.reshape(count, HASH_BITS))
+
+def popcount64(values: 'np.ndarray') -> 'np.ndarray':
+    """Quantidade de bits 1 em cada inteiro de 64 bits"""
+    if hasattr(np, 'bitwise_count'):  # numpy >= 2.0
+        return np.bitwise_count(values)
+    table = np.array([bin(byte).count('1') for byte in range(256)], dtype=np.uint8)
+    return table[values.view(np.uint8).reshape(-1, 8)].sum(axis=1, dtype=np.uint8)
+
+def probe_masks(bits: int, radius: int) -> 'np.ndarray':
+    """Todas as máscaras de 'bits' bits com até 'radius' bits ligados"""
+    masks = [0]
+    for flipped in range(1, radius + 1):
+        masks.extend(sum(1 << bit for bit in combination) for combination in combinations(range(bits), flipped))
+    return np.array(masks, dtype=np.uint64)
+
+def choose_chunks(count: int, max_distance: int) -> int:
+    """Quantidade de pedaços do índice com o menor custo estimado para 'count' hashes.
+
+    Mais pedaços = menos variações a consultar por pedaço, porém pedaços
+    menores e mais candidatos a conferir. Pedaços têm no máximo MAX_CHUNK_BITS
+    bits (tabelas densas de 2^bits posições).
+    """
+    best = None
+    for chunks in range(HASH_BITS // MAX_CHUNK_BITS + 1, HASH_BITS + 1):
+        bits = HASH_BITS // chunks
+        probes = sum(comb(bits, flipped) for flipped in range(max_distance // chunks + 1))
+        cost = count * chunks * probes * (1 + CANDIDATE_COST * count / 2 ** bits)
+        if best is None or cost < best[0]:
+            best = (cost, chunks)
+        if max_distance // chunks == 0:
+            break
+    return best[1]
+
+class MultiIndexHash:
+    """Índice de hashes de 64 bits para busca por distância de Hamming (multi-index hashing).
+
+    O hash é dividido em pedaços; se dois hashes diferem em até 'max_distance'
+    bits, algum pedaço difere em no máximo max_distance // pedaços bits (casa
+    dos pombos). Para cada pedaço, os hashes são agrupados pelo valor do
+    pedaço numa tabela densa, e cada hash consulta só os grupos das variações
+    do seu pedaço com até esse número de bits trocados; a distância real é
+    conferida apenas nesses candidatos. Tudo é feito em lote com numpy, sem
+    comparar todos os pares.
+    """
+
+    def __init__(self, hashes: 'np.ndarray', max_distance: int = DEFAULT_MAX_DISTANCE):
+        self.hashes = np.asarray(hashes, dtype=np.uint64)
+        self.max_distance = max_distance
+        self.chunks = choose_chunks(len(self.hashes), max_distance)
+        self.radius = max_distance // self.chunks
+
+    def _layout(self) -> Iterator[Tuple[int, int]]:
+        """(deslocamento, bits) de cada pedaço; os primeiros recebem o bit que sobrar"""
+        shift = 0
+        for i in range(self.chunks):
+            bits = HASH_BITS // self.chunks + (1 if i < HASH_BITS % self.chunks else 0)
+            yield shift, bits
+            shift += bits
+
+    def pairs(self, block_size: int = QUERY_BLOCK) -> Tuple['np.ndarray', 'np.ndarray', 'np.ndarray']:
+        """Todos os pares (i < j) a até max_distance bits: arrays (i, j, distância)"""
+        count = len(self.hashes)
+        found = []
+        for shift, bits in self._layout():
+            keys = ((self.hashes >> np.uint64(shift)) & np.uint64((1 << bits) - 1)).astype(np.int64)
+            order = np.argsort(keys, kind='stable')
+            bucket_sizes = np.bincount(keys, minlength=1 << bits)
+            bucket_starts = np.cumsum(bucket_sizes) - bucket_sizes
+            for mask in probe_masks(bits, self.radius).astype(np.int64):
+                for block_start in range(0, count, block_size):
+                    queries = np.arange(block_start, min(block_start + block_size, count))
+                    probed = keys[queries] ^ mask
+                    sizes = bucket_sizes[probed]
+                    total = int(sizes.sum())
+                    if not total:
+                        continue
+                    # Expande cada consulta nos membros do grupo consultado
+                    first = np.repeat(queries, sizes)
+                    offsets = np.arange(total) - np.repeat(np.cumsum(sizes) - sizes, sizes)
+                    second = order[np.repeat(bucket_starts[probed], sizes) + offsets]
+                    keep = first < second
+                    first, second = first[keep], second[keep]
+                    distances = popcount64(self.hashes[first] ^ self.hashes[second])
+                    close = distances <= self.max_distance
+                    found.append((first[close], second[close], distances[close]))
+        if not found:
+            empty = np.array([], dtype=np.int64)
+            return empty, empty, empty
+        first, second, distances = (np.concatenate(column) for column in zip(*found))
+        # O mesmo par pode ser encontrado por mais de um pedaço
+        _, unique = np.unique(first * count + second, return_index=True)
+        return first[unique], second[unique], distances[unique].astype(np.int64)
+
+def compute_perceptual_hashes(images: List[FileRecord], method: str = DEFAULT_METHOD,
+                              cache: Optional[HashCache] = None, workers: int = 1,
+                              use_processes: bool = False, progress: Optional[ProgressCallback] = None,
+                              metrics: Optional[ScanMetrics] = None) -> Dict:
+    """Calcula (ou busca no cache) o hash perceptual de cada imagem em file_info.hash (hexadecimal).
+
+    As imagens são decodificadas em paralelo e os hashes calculados em lotes
+    de BATCH_SIZE miniaturas. Imagens que não puderam ser abertas ficam sem
+    hash. Emite eventos 'hashing' com hash_stage='image'.
+
+    Retorna as estatísticas e, em 'resolutions', a resolução (largura ×
+    altura) de cada imagem por caminho, guardada no cache junto com o hash.
+    """
+    stats = {'hashed': 0, 'cache_hits': 0, 'read_errors': 0, 'bytes_read': 0, 'resolutions': {}}
+    resolutions = stats['resolutions']
+    to_compute = []
+    for file_info in images:
+        cached = cache.get(file_info, 'perceptual', method) if cache is not None else None
+        if cached and ':' in cached:
+            file_info.hash, resolution = cached.split(':')
+            resolutions[file_info.path] = int(resolution)
+            stats['cache_hits'] += 1
+        else:
+            file_info.hash = None
+            to_compute.append(file_info)
+    if metrics is not None and cache is not None:
+        metrics.count('cache_hits', stats['cache_hits'])
+        metrics.count('cache_misses', len(to_compute))
+
+    start = time.perf_counter()
+    bytes_total = sum(file_info.size for file_info in to_compute)
+    last_report = time.monotonic()
+    batch_files = []
+    batch_pixels = []
+
+    def flush_batch():
+        for file_info, value in zip(batch_files, perceptual_hashes(np.stack(batch_pixels), method)):
+            file_info.hash = f"{int(value):016x}"
+            if cache is not None:
+                cache.put(file_info, 'perceptual', f"{file_info.hash}:{resolutions[file_info.path]}", method)
+        batch_files.clear()
+        batch_pixels.clear()
+
+    tasks = ((file_info.path, method) for file_info in to_compute)
+    results = map_ordered(load_thumbnail, tasks, workers, use_processes=use_processes)
+    for done, (file_info, (pixels, resolution, error)) in enumerate(zip(to_compute, results), 1):
+        stats['bytes_read'] += file_info.size
+        if error is not None:
+            stats['read_errors'] += 1
+            if metrics is not None:
+                metrics.record_error(file_info.path, *error)
+        else:
+            stats['hashed'] += 1
+            resolutions[file_info.path] = resolution
+            batch_files.append(file_info)
+            batch_pixels.append(pixels)
+            if len(batch_files) >= BATCH_SIZE:
+                flush_batch()
+        if progress is not None:
+            now = time.monotonic()
+            if now - last_report >= PROGRESS_INTERVAL or done == len(to_compute):
+                last_report = now
+                progress('hashing', {'hash_stage': 'image', 'files': done, 'files_total': len(to_compute),
+                                     'bytes': stats['bytes_read'], 'bytes_total': bytes_total})
+    if batch_files:
+        flush_batch()
+
+    if metrics is not None:
+        metrics.count('files_hashed', len(to_compute))
+        metrics.count('bytes_hashed', stats['bytes_read'])
+        metrics.add_time('hash_image', time.perf_counter() - start)
+    return stats
+
+def cluster_similar(images: List[FileRecord], max_distance: int = DEFAULT_MAX_DISTANCE,
+                    resolutions: Optional[Dict[str, int]] = None) -> List[Tuple[List[FileRecord], List[int]]]:
+    """Agrupa as imagens com hash perceptual a até 'max_distance' bits.
+
+    Agrupamento em estrela, sem encadeamento: as imagens são visitadas da
+    melhor para a pior (maior resolução, formato sem perda, maior arquivo) e cada uma
+    ainda livre reúne as vizinhas ainda livres. Retorna (membros, distâncias
+    até o primeiro membro) para cada grupo com duas ou mais imagens; o
+    primeiro membro é o de melhor qualidade.
+    """
+    resolutions = resolutions or {}
+    ordered = sorted((file_info for file_info in images if file_info.hash),
+                     key=lambda file_info: (-resolutions.get(file_info.path, 0),
+                                            not file_info.name.lower().endswith(LOSSLESS_EXTENSIONS),
+                                            -file_info.size, file_info.path))
+    if len(ordered) < 2:
+        return []
+    hashes = np.array([int(file_info.hash, 16) for file_info in ordered], dtype=np.uint64)
+    first, second, distances = MultiIndexHash(hashes, max_distance).pairs()
+
+    # Vizinhos de cada imagem (nos dois sentidos), do mais próximo ao mais distante
+    nodes = np.concatenate([first, second])
+    others = np.concatenate([second, first])
+    distances = np.concatenate([distances, distances])
+    order = np.lexsort((others, distances, nodes))
+    nodes, others, distances = nodes[order], others[order], distances[order]
+    bounds = np.searchsorted(nodes, np.arange(len(ordered) + 1))
+
+    assigned = np.zeros(len(ordered), dtype=bool)
+    clusters = []
+    for item_id in np.unique(nodes):
+        if assigned[item_id]:
+            continue
+        start, end = bounds[item_id], bounds[item_id + 1]
+        free = ~assigned[others[start:end]]
+        if not free.any():
+            continue
+        neighbor_ids = others[start:end][free]
+        assigned[item_id] = True
+        assigned[neighbor_ids] = True
+        clusters.append((
+            [ordered[item_id]] + [ordered[other_id] for other_id in neighbor_ids],
+            [0] + distances[start:end][free].tolist()
+        ))
+    return clusters
@@ -0,0 +1,240 @@
+import threading
+import time
+import uuid
+from typing import Dict, List, Optional
+
+from engine import DuplicateGroup, run_scan
+from report import ReportWriter
+
+# Estados de uma análise em segundo plano
+JOB_STATES = {
+    'running': "Em andamento",
+    'paused': "Pausada",
+    'cancelling': "Cancelando",
+    'cancelled': "Cancelada",
+    'done': "Concluída",
+    'error': "Erro",
+}
+ACTIVE_STATES = ('running', 'paused', 'cancelling')
+
+# Análises finalizadas mantidas no gerenciador (as mais antigas são descartadas)
+MAX_FINISHED_JOBS = 5
+
+class ScanCancelled(Exception):
+    """Lançada no callback de progresso para interromper uma análise cancelada"""
+
+class ScanJob:
+    """Análise executada numa thread, com pausa, cancelamento e taxas ao vivo.
+
+    Pausa e cancelamento são cooperativos: são verificados a cada evento de
+    progresso da análise (varredura e hash), ou seja, no máximo a cada
+    PROGRESS_INTERVAL segundos enquanto há arquivos sendo processados.
+
+    Com 'report_path', os grupos são gravados num relatório JSON Lines assim
+    que ficam prontos; uma falha na gravação fica em 'report_error' e não
+    interrompe a análise.
+    """
+
+    def __init__(self, root: str, report_path: Optional[str] = None, **scan_options):
+        self.job_id = uuid.uuid4().hex[:12]
+        self.root = root
+        self.scan_options = scan_options
+        self.report_path = report_path
+        self.report_error = None
+        self._report_writer = None
+        self.state = 'running'
+        self.result = None
+        self.error = None
+        self.started_at = time.time()
+        self.finished_at = None
+
+        self.stage = 'scan'
+        self.files_scanned = 0
+        self.stage_files = 0
+        self.stage_files_total = 0
+        self.stage_bytes = 0
+        self.stage_bytes_total = 0
+        self.files_hashed = 0
+        self.bytes_read = 0
+        # Tempo ativo (sem pausas) e contadores no início da etapa, para as taxas
+        self._paused_seconds = 0.0
+        self._paused_since = None
+        self._stage_started = 0.0
+        self._finished_stage_files = 0
+        self._finished_stage_bytes = 0
+
+        self._resume_event = threading.Event()
+        self._resume_event.set()
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name=f"scan-{self.job_id}", daemon=True)
+
+    def start(self) -> 'ScanJob':
+        self._thread.start()
+        return self
+
+    def _active_seconds(self) -> float:
+        end = self.finished_at or time.time()
+        paused = self._paused_seconds
+        if self._paused_since is not None:
+            paused += end - self._paused_since
+        return max(end - self.started_at - paused, 0.0)
+
+    def _progress(self, stage: str, info: Dict):
+        with self._lock:
+            if stage == 'scanning' or stage == 'scanned':
+                self.files_scanned = info.get('files', self.files_scanned)
+            elif stage == 'hashing':
+                if info['hash_stage'] != self.stage or info['files'] < self.stage_files:
+                    # Nova etapa: acumula a anterior e reinicia a medição
+                    self._finished_stage_files += self.stage_files
+                    self._finished_stage_bytes += self.stage_bytes
+                    self._stage_started = self._active_seconds()
+                self.stage = info['hash_stage']
+                self.stage_files = info['files']
+                self.stage_files_total = info['files_total']
+                self.stage_bytes = info['bytes']
+                self.stage_bytes_total = info['bytes_total']
+                self.files_hashed = self._finished_stage_files + self.stage_files
+                self.bytes_read = self._finished_stage_bytes + self.stage_bytes
+            if stage != 'hashing':
+                self.stage = stage
+
+        if not self._resume_event.is_set():
+            self._resume_event.wait()
+        if self.state == 'cancelling':
+            raise ScanCancelled()
+
+    def _write_group(self, group: DuplicateGroup):
+        if self._report_writer is None:
+            return
+        try:
+            self._report_writer.write_group(group)
+        except OSError as e:
+            self.report_error = str(e)
+            self._close_report(completed=False)
+
+    def _close_report(self, completed: bool):
+        writer, self._report_writer = self._report_writer, None
+        if writer is not None:
+            try:
+                writer.close(completed=completed)
+            except OSError as e:
+                self.report_error = str(e)
+
+    def _run(self):
+        if self.report_path is not None:
+            try:
+                self._report_writer = ReportWriter(self.report_path, 'jsonl')
+            except OSError as e:
+                self.report_error = str(e)
+        try:
+            self.result = run_scan(self.root, progress=self._progress, group_sink=self._write_group,
+                                   **self.scan_options)
+            final_state = 'done'
+        except ScanCancelled:
+            final_state = 'cancelled'
+        except Exception as e:
+            self.error = f"{type(e).__name__}: {str(e)}"
+            final_state = 'error'
+        self._close_report(completed=final_state == 'done')
+        self.finished_at = time.time()
+        if self._paused_since is not None:
+            self._paused_seconds += self.finished_at - self._paused_since
+            self._paused_since = None
+        # O estado final é publicado por último: quem o vê já encontra o resultado
+        self.state = final_state
+
+    def pause(self):
+        if self.state == 'running':
+            self._paused_since = time.time()
+            self.state = 'paused'
+            self._resume_event.clear()
+
+    def resume(self):
+        if self.state == 'paused':
+            self._paused_seconds += time.time() - self._paused_since
+            self._paused_since = None
+            self.state = 'running'
+            self._resume_event.set()
+
+    def cancel(self):
+        if self.state in ('running', 'paused'):
+            if self._paused_since is not None:
+                self._paused_seconds += time.time() - self._paused_since
+                self._paused_since = None
+            self.state = 'cancelling'
+            self._resume_event.set()
+
+    @property
+    def active(self) -> bool:
+        return self.state in ACTIVE_STATES
+
+    def status(self) -> Dict:
+        """Fotografia do andamento: contadores, taxas (arquivos/s, bytes/s) e ETA da etapa atual"""
+        with self._lock:
+            elapsed = self._active_seconds()
+            stage_elapsed = max(elapsed - self._stage_started, 1e-6)
+            status = {
+                'job_id': self.job_id,
+                'root': self.root,
+                'state': self.state,
+                'stage': self.stage,
+                'elapsed': elapsed,
+                'files_scanned': self.files_scanned,
+                'files_hashed': self.files_hashed,
+                'bytes_read': self.bytes_read,
+                'stage_files': self.stage_files,
+                'stage_files_total': self.stage_files_total,
+                'stage_bytes': self.stage_bytes,
+                'stage_bytes_total': self.stage_bytes_total,
+                'error': self.error,
+            }
+        if status['stage'] in ('head', 'tail', 'full', 'image', 'chunks', 'verify'):
+            files_per_sec = status['stage_files'] / stage_elapsed
+            bytes_per_sec = status['stage_bytes'] / stage_elapsed
+            remaining = status['stage_bytes_total'] - status['stage_bytes']
+            status['eta'] = remaining / bytes_per_sec if bytes_per_sec > 0 else None
+        else:
+            files_per_sec = status['files_scanned'] / max(elapsed, 1e-6)
+            bytes_per_sec = 0.0
+            status['eta'] = None
+        status['files_per_sec'] = files_per_sec
+        status['bytes_per_sec'] = bytes_per_sec
+        return status
+
+class JobManager:
+    """Registro das análises em segundo plano, compartilhado entre as sessões"""
+
+    def __init__(self, max_finished: int = MAX_FINISHED_JOBS):
+        self.max_finished = max_finished
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def submit(self, root: str, report_path: Optional[str] = None, **scan_options) -> ScanJob:
+        """Inicia uma análise em segundo plano e a registra"""
+        job = ScanJob(root, report_path, **scan_options)
+        with self._lock:
+            self._prune()
+            self._jobs[job.job_id] = job
+        return job.start()
+
+    def get(self, job_id: Optional[str]) -> Optional[ScanJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def active_jobs(self) -> List[ScanJob]:
+        with self._lock:
+            return [job for job in self._jobs.values() if job.active]
+
+    def remove(self, job_id: str):
+        """Descarta uma análise finalizada (libera o resultado da memória)"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None and not job.active:
+                del self._jobs[job_id]
+
+    def _prune(self):
+        finished = sorted((job for job in self._jobs.values() if not job.active),
+                          key=lambda job: job.finished_at)
+        for job in finished[:max(len(finished) - self.max_finished + 1, 0)]:
+            del self._jobs[job.job_id]
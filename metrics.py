@@ -0,0 +1,67 @@
+import heapq
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator
+
+# Quantidade de arquivos mais lentos e de exemplos de erro guardados
+SLOWEST_FILES = 10
+ERROR_SAMPLES = 20
+
+class ScanMetrics:
+    """Instrumentação de uma análise: tempo por etapa, contadores, erros por tipo e arquivos mais lentos.
+
+    Contadores usados pelo pipeline: dirs_visited, files_stated, files_hashed,
+    bytes_hashed, cache_hits e cache_misses. Não é thread-safe: deve ser
+    atualizada pela thread que conduz a análise (os resultados das leituras
+    paralelas são registrados à medida que são consumidos).
+    """
+
+    def __init__(self, slowest_count: int = SLOWEST_FILES, error_samples: int = ERROR_SAMPLES):
+        self.slowest_count = slowest_count
+        self.max_error_samples = error_samples
+        self.stage_seconds = {}
+        self.counters = {}
+        self.errors = {}
+        self.error_samples = []
+        self._slowest = []  # heap de (segundos, caminho, etapa, tamanho)
+
+    @contextmanager
+    def timer(self, stage: str) -> Iterator[None]:
+        """Soma ao tempo da etapa a duração do bloco"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(stage, time.perf_counter() - start)
+
+    def add_time(self, stage: str, seconds: float):
+        self.stage_seconds[stage] = self.stage_seconds.get(stage, 0.0) + seconds
+
+    def count(self, name: str, amount: int = 1):
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def record_error(self, path: str, error_type: str, message: str):
+        """Conta o erro pelo tipo e guarda os primeiros exemplos"""
+        self.errors[error_type] = self.errors.get(error_type, 0) + 1
+        if len(self.error_samples) < self.max_error_samples:
+            self.error_samples.append({'path': path, 'type': error_type, 'message': message})
+
+    def record_file(self, path: str, stage: str, size: int, seconds: float):
+        """Registra a duração da leitura de um arquivo, mantendo só os mais lentos"""
+        item = (seconds, path, stage, size)
+        if len(self._slowest) < self.slowest_count:
+            heapq.heappush(self._slowest, item)
+        elif seconds > self._slowest[0][0]:
+            heapq.heapreplace(self._slowest, item)
+
+    def to_dict(self) -> Dict:
+        return {
+            'stage_seconds': {stage: round(seconds, 6) for stage, seconds in self.stage_seconds.items()},
+            'counters': dict(self.counters),
+            'errors': dict(self.errors),
+            'error_samples': list(self.error_samples),
+            'slowest_files': [
+                {'path': path, 'stage': stage, 'size': size, 'seconds': round(seconds, 6)}
+                for seconds, path, stage, size in sorted(self._slowest, reverse=True)
+            ],
+        }
@@ -0,0 +1,149 @@
+import os
+import sqlite3
+import sys
+from typing import Dict, Iterable, List, Optional
+
+from hash_cache import HashCache
+from hashing import ProgressCallback, hash_stage
+from metrics import ScanMetrics
+from scanner import FileRecord, inode_matches, scan_files
+
+DEFAULT_REFERENCE_INDEX_PATH = os.path.join(os.path.expanduser("~"), ".comparador_arquivos", "reference_index.db")
+
+# Parâmetros por consulta "IN (...)" (abaixo do limite de variáveis do SQLite)
+QUERY_CHUNK = 500
+
+class ReferenceIndex:
+    """Índice persistente (SQLite) de um acervo de referência: tamanho -> hash -> caminhos.
+
+    A atualização do acervo só lista a pasta (stat de cada arquivo); os hashes
+    são calculados sob demanda, apenas para os tamanhos que aparecem nos
+    arquivos consultados, e ficam gravados enquanto o arquivo não mudar.
+    Vários acervos podem coexistir no mesmo banco: a chave é (root, path), então
+    acervos aninhados ou sobrepostos têm cada um as suas linhas, e atualizar
+    um não apaga nem sobrescreve as do outro.
+    """
+
+    def __init__(self, db_path: str = DEFAULT_REFERENCE_INDEX_PATH):
+        self.db_path = db_path
+        if db_path != ":memory:":
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self.conn = sqlite3.connect(db_path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS reference_files (
+                root TEXT NOT NULL,
+                path TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                mtime REAL NOT NULL,
+                inode INTEGER NOT NULL,
+                algorithm TEXT,
+                digest TEXT,
+                PRIMARY KEY (root, path)
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_reference_size ON reference_files(root, size, digest)")
+        self.conn.commit()
+
+    def update(self, root: str, recursive: bool = True, metrics: Optional[ScanMetrics] = None) -> Dict[str, int]:
+        """Sincroniza o índice com a pasta do acervo, sem ler o conteúdo dos arquivos.
+        Arquivos novos ou alterados ficam sem hash; os removidos saem do índice."""
+        root = os.path.abspath(root)
+        existing = {
+            path: (size, mtime, inode)
+            for path, size, mtime, inode in self.conn.execute(
+                "SELECT path, size, mtime, inode FROM reference_files WHERE root = ?", (root,))
+        }
+        stats = {'files': 0, 'added': 0, 'changed': 0, 'removed': 0}
+        upserts = []
+        for file_info in scan_files(root, recursive, metrics):
+            stats['files'] += 1
+            path = file_info.path
+            old = existing.pop(path, None)
+            if old is not None and old[:2] == (file_info.size, file_info.modified_time) \
+                    and inode_matches(old[2], file_info.inode):
+                continue
+            stats['added' if old is None else 'changed'] += 1
+            upserts.append((root, path, file_info.size, file_info.modified_time, file_info.inode))
+            if len(upserts) >= 1000:
+                self._upsert(upserts)
+                upserts = []
+        self._upsert(upserts)
+
+        # O que sobrou em 'existing' não foi encontrado na varredura
+        self.conn.executemany("DELETE FROM reference_files WHERE root = ? AND path = ?",
+                              ((root, path) for path in existing))
+        stats['removed'] = len(existing)
+        self.conn.commit()
+        return stats
+
+    def _upsert(self, rows: List[tuple]):
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO reference_files VALUES (?, ?, ?, ?, ?, NULL, NULL)", rows
+        )
+
+    def _rows_with_sizes(self, root: str, sizes: Iterable[int], columns: str, condition: str = "",
+                         params: tuple = ()) -> Iterable[tuple]:
+        sizes = sorted(set(sizes))
+        for start in range(0, len(sizes), QUERY_CHUNK):
+            chunk = sizes[start:start + QUERY_CHUNK]
+            yield from self.conn.execute(
+                f"SELECT {columns} FROM reference_files WHERE root = ? "
+                f"AND size IN ({','.join('?' * len(chunk))}) {condition}",
+                (root, *chunk, *params)
+            )
+
+    def matching_sizes(self, root: str, sizes: Iterable[int]) -> set:
+        """Tamanhos, dentre os informados, que existem no acervo"""
+        return {size for (size,) in self._rows_with_sizes(os.path.abspath(root), sizes, "DISTINCT size")}
+
+    def hash_missing(self, root: str, sizes: Iterable[int], algorithm: str = 'md5', workers: int = 1,
+                     use_processes: bool = False, cache: Optional[HashCache] = None,
+                     progress: Optional[ProgressCallback] = None, metrics: Optional[ScanMetrics] = None) -> int:
+        """Calcula os hashes que faltam no acervo para os tamanhos informados"""
+        root = os.path.abspath(root)
+        records = [
+            FileRecord(sys.intern(os.path.dirname(path)), os.path.basename(path), size, mtime, inode)
+            for path, size, mtime, inode in self._rows_with_sizes(
+                root, sizes, "path, size, mtime, inode",
+                "AND (digest IS NULL OR algorithm IS NOT ?)", (algorithm,)
+            )
+        ]
+        if not records:
+            return 0
+        stats = {'full_hashed': 0, 'bytes_read': 0, 'cache_hits': 0, 'read_errors': 0}
+        digests = hash_stage(records, 'full', cache, stats, workers, use_processes, algorithm, progress, metrics)
+        self.conn.executemany(
+            "UPDATE reference_files SET algorithm = ?, digest = ? WHERE root = ? AND path = ?",
+            ((algorithm, digests[id(record)], root, record.path) for record in records if digests[id(record)])
+        )
+        self.conn.commit()
+        return len(records)
+
+    def lookup(self, root: str, size: int, digest: str, algorithm: str = 'md5') -> List[FileRecord]:
+        """Arquivos do acervo com o tamanho e o hash informados"""
+        return [
+            FileRecord(sys.intern(os.path.dirname(path)), os.path.basename(path), size, mtime, inode, digest)
+            for path, mtime, inode in self.conn.execute(
+                "SELECT path, mtime, inode FROM reference_files "
+                "WHERE root = ? AND size = ? AND digest = ? AND algorithm = ?",
+                (os.path.abspath(root), size, digest, algorithm)
+            )
+        ]
+
+    def roots(self) -> List[str]:
+        """Acervos presentes no índice"""
+        return [root for (root,) in self.conn.execute("SELECT DISTINCT root FROM reference_files ORDER BY root")]
+
+    def __len__(self) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM reference_files").fetchone()[0]
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
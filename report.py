@@ -0,0 +1,277 @@
+import csv
+import json
+import os
+import sys
+import time
+import uuid
+from datetime import datetime
+from itertools import groupby
+from typing import Dict, Iterable, Iterator, List, Optional
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+from engine import DuplicateGroup, SimilarImageGroup, format_timestamp
+from scanner import FileRecord
+
+DEFAULT_REPORT_DIR = os.path.join(os.path.expanduser("~"), ".comparador_arquivos", "relatorios")
+
+# Formatos de relatório e suas extensões
+REPORT_FORMATS = {
+    'jsonl': ".jsonl",
+    'csv': ".csv",
+    'parquet': ".parquet",
+}
+
+# Uma linha por arquivo; 'keep' marca o arquivo mantido do grupo, 'in_reference'
+# os arquivos do acervo e 'distance' a distância até a imagem de referência
+CSV_FIELDS = ['group', 'hash', 'algorithm', 'file_size', 'path', 'modified_date', 'keep', 'verification',
+              'kind', 'in_reference', 'distance']
+
+# Linhas acumuladas antes de gravar um row group no Parquet
+PARQUET_BATCH_ROWS = 50_000
+
+def available_formats() -> List[str]:
+    """Formatos de relatório disponíveis (Parquet depende do pyarrow)"""
+    return [fmt for fmt in REPORT_FORMATS if fmt != 'parquet' or pa is not None]
+
+def report_path(root: str, report_format: str, report_dir: str = DEFAULT_REPORT_DIR) -> str:
+    """Caminho exclusivo do relatório de uma análise (pasta + data/hora + sufixo aleatório)"""
+    folder_name = os.path.basename(os.path.normpath(os.path.abspath(root))) or "raiz"
+    file_name = f"{folder_name}_{time.strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:6]}{REPORT_FORMATS[report_format]}"
+    return os.path.join(report_dir, file_name)
+
+def list_reports(report_dir: str = DEFAULT_REPORT_DIR) -> List[str]:
+    """Relatórios gravados, do mais recente para o mais antigo"""
+    try:
+        paths = [os.path.join(report_dir, name) for name in os.listdir(report_dir)
+                 if os.path.splitext(name)[1] in REPORT_FORMATS.values()]
+    except OSError:
+        return []
+    return sorted(paths, key=os.path.getmtime, reverse=True)
+
+def parquet_schema() -> 'pa.Schema':
+    """Esquema fixo do Parquet: colunas vazias num lote não mudam o tipo do arquivo"""
+    return pa.schema([
+        ('group', pa.int64()), ('hash', pa.string()), ('algorithm', pa.string()), ('file_size', pa.int64()),
+        ('path', pa.string()), ('modified_date', pa.string()), ('keep', pa.bool_()),
+        ('verification', pa.string()), ('kind', pa.string()), ('in_reference', pa.bool_()),
+        ('distance', pa.int64()),
+    ])
+
+def group_rows(number: int, group: DuplicateGroup) -> Iterator[Dict]:
+    """Linhas (uma por arquivo) de um grupo, no formato CSV/Parquet"""
+    keeper_path = group.keeper.path
+    distances = getattr(group, 'distances', None)
+    for i, member in enumerate(group.members):
+        path = member.path
+        yield {
+            'group': number,
+            'hash': group.digest,
+            'algorithm': group.algorithm,
+            'file_size': member.size,
+            'path': path,
+            'modified_date': format_timestamp(member.modified_time),
+            'keep': path == keeper_path,
+            'verification': group.verification,
+            'kind': group.kind,
+            'in_reference': group.reference is not None and path in group.reference,
+            'distance': distances[i] if distances is not None else None,
+        }
+
+class ReportWriter:
+    """Grava os grupos um a um, sem montar o relatório inteiro em memória.
+
+    Com um caminho de arquivo, grava em '<caminho>.part' e renomeia ao fechar,
+    então um relatório incompleto nunca aparece com o nome final.
+    """
+
+    def __init__(self, output, report_format: str):
+        if report_format not in REPORT_FORMATS:
+            raise ValueError(f"Formato de relatório desconhecido: {report_format}")
+        if report_format == 'parquet' and pa is None:
+            raise ValueError("Formato parquet requer o pacote pyarrow")
+        self.format = report_format
+        self.count = 0
+        self.path = None if output == "-" else output
+        self.temp_path = None
+        self.stream = None
+        self.parquet = None
+        self.rows = []
+
+        if self.path is None:
+            if report_format == 'parquet':
+                raise ValueError("Formato parquet não pode ser gravado na saída padrão")
+            self.stream = sys.stdout
+        else:
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+            self.temp_path = self.path + ".part"
+            if report_format != 'parquet':
+                self.stream = open(self.temp_path, 'w', encoding='utf-8', newline='')
+
+        if report_format == 'csv':
+            self.csv_writer = csv.DictWriter(self.stream, fieldnames=CSV_FIELDS)
+            self.csv_writer.writeheader()
+
+    def write_group(self, group: DuplicateGroup):
+        self.count += 1
+        if self.format == 'jsonl':
+            self.stream.write(json.dumps(group.to_dict(), ensure_ascii=False) + "\n")
+        elif self.format == 'csv':
+            self.csv_writer.writerows(group_rows(self.count, group))
+        else:
+            self.rows.extend(group_rows(self.count, group))
+            if len(self.rows) >= PARQUET_BATCH_ROWS:
+                self._flush_parquet()
+
+    def write_groups(self, groups: Iterable[DuplicateGroup]) -> int:
+        for group in groups:
+            self.write_group(group)
+        return self.count
+
+    def _flush_parquet(self):
+        table = pa.Table.from_pylist(self.rows, schema=parquet_schema())
+        if self.parquet is None:
+            self.parquet = pq.ParquetWriter(self.temp_path, table.schema)
+        self.parquet.write_table(table)
+        self.rows = []
+
+    def close(self, completed: bool = True):
+        if self.format == 'parquet':
+            if completed and (self.rows or self.parquet is None):
+                if self.rows:
+                    self._flush_parquet()
+                else:
+                    # Relatório sem grupos: grava só o esquema
+                    pq.write_table(parquet_schema().empty_table(), self.temp_path)
+            if self.parquet is not None:
+                self.parquet.close()
+        elif self.stream is not sys.stdout:
+            self.stream.close()
+        else:
+            self.stream.flush()
+
+        if self.temp_path is not None:
+            if completed:
+                os.replace(self.temp_path, self.path)
+            elif os.path.exists(self.temp_path):
+                os.remove(self.temp_path)
+
+    def __enter__(self) -> 'ReportWriter':
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close(completed=exc_type is None)
+
+def export_groups(groups: Iterable[DuplicateGroup], output: str, report_format: str) -> int:
+    """Grava os grupos no relatório e retorna quantos foram gravados"""
+    with ReportWriter(output, report_format) as writer:
+        return writer.write_groups(groups)
+
+def _group_from_rows(rows: List[Dict]) -> Dict:
+    """Reconstrói o dicionário de um grupo (formato to_dict) a partir das linhas por arquivo"""
+    first = rows[0]
+    keeper = next((row['path'] for row in rows if row['keep'] in (True, 'True')), first['path'])
+    sizes = {row['path']: int(row['file_size']) for row in rows}
+    # Relatórios anteriores ao tipo do grupo não têm as colunas: tipo desconhecido
+    kind = first.get('kind') or None
+    members = [{'path': row['path'], 'modified_date': row['modified_date'], 'file_size': int(row['file_size'])}
+               for row in rows]
+    if kind == 'similar_image':
+        for member, row in zip(members, rows):
+            member['distance'] = int(row['distance'])
+    data = {
+        'file_name': os.path.basename(keeper),
+        'file_size': sizes[keeper],
+        'hash': first['hash'],
+        'algorithm': first['algorithm'],
+        'file_count': len(rows),
+        'reclaimable_bytes': sum(size for path, size in sizes.items() if path != keeper),
+        'keeper': keeper,
+        # Relatórios anteriores à conferência byte a byte não têm a coluna
+        'verification': first.get('verification') or 'unverified',
+        'members': members,
+        'kind': kind,
+    }
+    if kind == 'reference':
+        data['reference'] = [row['path'] for row in rows if row['in_reference'] in (True, 'True')]
+    return data
+
+def detect_format(path: str) -> str:
+    extension = os.path.splitext(path)[1]
+    for report_format, format_extension in REPORT_FORMATS.items():
+        if extension == format_extension:
+            return report_format
+    raise ValueError(f"Extensão de relatório desconhecida: {path}")
+
+def load_report(path: str, report_format: Optional[str] = None) -> Iterator[Dict]:
+    """Lê um relatório gravado, um grupo por vez (formato de DuplicateGroup.to_dict)"""
+    report_format = report_format or detect_format(path)
+    if report_format == 'jsonl':
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+    elif report_format == 'csv':
+        with open(path, 'r', encoding='utf-8', newline='') as f:
+            for _, rows in groupby(csv.DictReader(f), key=lambda row: row['group']):
+                yield _group_from_rows(list(rows))
+    else:
+        if pq is None:
+            raise ValueError("Formato parquet requer o pacote pyarrow")
+        pending = []
+        for batch in pq.ParquetFile(path).iter_batches():
+            for row in batch.to_pylist():
+                if pending and row['group'] != pending[0]['group']:
+                    yield _group_from_rows(pending)
+                    pending = []
+                pending.append(row)
+        if pending:
+            yield _group_from_rows(pending)
+
+def groups_from_report(path: str, report_format: Optional[str] = None) -> Iterator[DuplicateGroup]:
+    """Reabre um relatório como DuplicateGroup (ou SimilarImageGroup), sem varrer a pasta de novo.
+
+    O tipo do grupo e os arquivos do acervo de referência são restaurados; num
+    relatório que não os gravou, 'kind' fica None e dedup_groups recusa o grupo.
+    """
+    for data in load_report(path, report_format):
+        members = [
+            FileRecord(
+                sys.intern(os.path.dirname(member['path'])), os.path.basename(member['path']),
+                member.get('file_size', data['file_size']),
+                datetime.strptime(member['modified_date'], '%Y-%m-%d %H:%M:%S').timestamp(), 0
+            )
+            for member in data['members']
+        ]
+        for member in members:
+            member.hash = data['hash']
+        kind = data.get('kind')
+        if kind == 'similar_image':
+            distances = [member['distance'] for member in data['members']]
+            # A imagem de referência está a distância 0; de preferência, a mantida
+            paths = [member.path for member in members]
+            keeper = paths.index(data['keeper']) if data['keeper'] in paths else 0
+            reference = keeper if distances[keeper] == 0 else distances.index(0)
+            order = [reference] + [i for i in range(len(members)) if i != reference]
+            group = SimilarImageGroup(data['algorithm'], [members[i] for i in order],
+                                      [distances[i] for i in order])
+            group.distances = distances
+            group.reference_index = reference
+        else:
+            group = DuplicateGroup(data['hash'], data['file_size'], data['algorithm'], members)
+            if data.get('reference') is not None:
+                group.reference = set(data['reference'])
+        group.kind = kind
+        # As datas do relatório têm resolução de segundos: mantém a ordem gravada
+        group.members = members
+        group.keeper_index = next(
+            (i for i, member in enumerate(group.members) if member.path == data['keeper']), 0
+        )
+        group.verification = data.get('verification', 'unverified')
+        yield group
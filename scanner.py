@@ -0,0 +1,105 @@
+import os
+import sys
+import time
+from typing import Iterator, List, Optional
+
+from filters import ScanFilter
+from metrics import ScanMetrics
+
+class FileRecord:
+    """Registro compacto de um arquivo encontrado na varredura.
+
+    Usa __slots__ (sem __dict__ por instância) e guarda o diretório como uma
+    string compartilhada (interned) por todos os arquivos da mesma pasta; o
+    caminho completo é montado só quando pedido.
+    """
+    __slots__ = ('directory', 'name', 'size', 'modified_time', 'inode', 'hash')
+
+    def __init__(self, directory: str, name: str, size: int, modified_time: float, inode: int,
+                 hash: Optional[str] = None):
+        self.directory = directory
+        self.name = name
+        self.size = size
+        self.modified_time = modified_time
+        self.inode = inode
+        self.hash = hash
+
+    @property
+    def path(self) -> str:
+        return os.path.join(self.directory, self.name)
+
+def inode_matches(old: int, new: int) -> bool:
+    """Compara dois inodes, ignorando os desconhecidos (0).
+
+    No Windows, DirEntry.stat() não traz o inode (st_ino = 0) e buscá-lo
+    custaria um os.stat por arquivo: lá os arquivos são validados só por
+    tamanho e data de modificação.
+    """
+    return old == new or not old or not new
+
+    def __repr__(self) -> str:
+        return f"FileRecord({self.path!r}, size={self.size}, hash={self.hash!r})"
+
+def scan_files(root: str, recursive: bool = True, metrics: Optional[ScanMetrics] = None,
+               filters: Optional[ScanFilter] = None) -> Iterator[FileRecord]:
+    """Percorre a pasta com os.scandir, gerando um registro por arquivo.
+
+    Usa os dados de DirEntry (tipo e stat) em vez de os.walk + os.stat, então
+    cada diretório e cada arquivo são consultados uma única vez. Subpastas
+    inacessíveis e arquivos que somem durante a varredura são ignorados (e
+    registrados em 'metrics', junto com pastas visitadas, arquivos
+    consultados e o tempo gasto nos stat).
+
+    Com 'filters', pastas excluídas não são listadas e arquivos recusados pelo
+    nome ou extensão não recebem stat; só o limite de tamanho é testado depois.
+    """
+    pending = [(root, "")]  # (pasta, caminho relativo à raiz com '/' no fim)
+    while pending:
+        directory, rel_dir = pending.pop()
+        directory = sys.intern(directory)
+        subdirs = []
+        if metrics is not None:
+            metrics.count('dirs_visited')
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            if recursive:
+                                if filters is None or filters.accepts_dir(entry.name, rel_dir + entry.name):
+                                    subdirs.append((entry.path, f"{rel_dir}{entry.name}/"))
+                                elif metrics is not None:
+                                    metrics.count('dirs_pruned')
+                            continue
+                        if not entry.is_file():
+                            continue
+                        if filters is not None and not filters.accepts_name(entry.name, rel_dir + entry.name):
+                            if metrics is not None:
+                                metrics.count('files_filtered')
+                            continue
+                        if metrics is None:
+                            file_stat = entry.stat()
+                        else:
+                            start = time.perf_counter()
+                            file_stat = entry.stat()
+                            metrics.add_time('stat', time.perf_counter() - start)
+                            metrics.count('files_stated')
+                    except OSError as e:
+                        if metrics is not None:
+                            metrics.record_error(entry.path, type(e).__name__, str(e))
+                        continue
+                    if filters is not None and not filters.accepts_size(file_stat.st_size):
+                        if metrics is not None:
+                            metrics.count('files_filtered')
+                        continue
+                    yield FileRecord(directory, entry.name, file_stat.st_size, file_stat.st_mtime, file_stat.st_ino)
+        except OSError as e:
+            if metrics is not None:
+                metrics.record_error(directory, type(e).__name__, str(e))
+            continue
+        # Mantém a ordem de visita do os.walk (de cima para baixo, na ordem listada)
+        pending.extend(reversed(subdirs))
+
+def list_files(root: str, recursive: bool = True, filters: Optional[ScanFilter] = None) -> List[FileRecord]:
+    """Retorna a listagem completa da pasta"""
+    return list(scan_files(root, recursive, filters=filters))
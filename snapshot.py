@@ -0,0 +1,228 @@
+import json
+import os
+import sqlite3
+import sys
+from typing import Dict, List, Optional, Set, Tuple
+
+from filters import ScanFilter
+from metrics import ScanMetrics
+from scanner import FileRecord, inode_matches
+
+DEFAULT_SNAPSHOT_DIR = os.path.join(os.path.expanduser("~"), ".comparador_arquivos", "snapshots")
+SNAPSHOT_VERSION = 2
+
+class _StoredDirs:
+    """Diretórios de um snapshot gravado, lidos do banco um a um (só os visitados)"""
+
+    def __init__(self, conn: sqlite3.Connection, root: str, recursive: bool):
+        self.conn = conn
+        self.key = (root, int(recursive))
+
+    def get(self, directory: str) -> Optional[Dict]:
+        row = self.conn.execute(
+            "SELECT mtime, subdirs, files FROM snapshot_dirs WHERE root = ? AND recursive = ? AND directory = ?",
+            self.key + (directory,)
+        ).fetchone()
+        if row is None:
+            return None
+        return {'mtime': row[0], 'subdirs': json.loads(row[1]), 'files': json.loads(row[2])}
+
+class SnapshotStore:
+    """Snapshots (SQLite) das análises incrementais, um registro por diretório.
+
+    Um diretório inalterado custa uma consulta pela chave ao ser visitado e
+    nada ao gravar: só os diretórios listados de novo (ou com hashes
+    alterados) são regravados, em vez do snapshot inteiro.
+    """
+
+    def __init__(self, snapshot_dir: str = DEFAULT_SNAPSHOT_DIR):
+        os.makedirs(snapshot_dir, exist_ok=True)
+        self.conn = sqlite3.connect(os.path.join(snapshot_dir, "snapshots.db"))
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS snapshots (
+                root TEXT NOT NULL,
+                recursive INTEGER NOT NULL,
+                version INTEGER NOT NULL,
+                hash_signature TEXT,
+                PRIMARY KEY (root, recursive)
+            )
+        """)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS snapshot_dirs (
+                root TEXT NOT NULL,
+                recursive INTEGER NOT NULL,
+                directory TEXT NOT NULL,
+                mtime REAL NOT NULL,
+                subdirs TEXT NOT NULL,
+                files TEXT NOT NULL,
+                PRIMARY KEY (root, recursive, directory)
+            )
+        """)
+        self.conn.commit()
+
+    def load(self, root: str, recursive: bool) -> Optional[Dict]:
+        """Snapshot da última análise (None se não houver ou for de outra versão).
+
+        'dirs' é lido sob demanda: use o snapshot só enquanto o banco estiver aberto.
+        """
+        root = os.path.abspath(root)
+        row = self.conn.execute(
+            "SELECT version, hash_signature FROM snapshots WHERE root = ? AND recursive = ?", (root, int(recursive))
+        ).fetchone()
+        if row is None or row[0] != SNAPSHOT_VERSION:
+            return None
+        return {'version': SNAPSHOT_VERSION, 'root': root, 'recursive': recursive,
+                'hash_signature': json.loads(row[1]) if row[1] else None,
+                'dirs': _StoredDirs(self.conn, root, recursive)}
+
+    def save(self, snapshot: Dict, dirty: Optional[Set[str]] = None):
+        """Grava o snapshot em uma transação.
+
+        Só os diretórios em 'dirty' e os que não estavam gravados são escritos
+        (None = todos); os que não existem mais são apagados.
+        """
+        key = (snapshot['root'], int(snapshot['recursive']))
+        dirs = snapshot['dirs']
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO snapshots VALUES (?, ?, ?, ?)",
+                key + (SNAPSHOT_VERSION, json.dumps(snapshot.get('hash_signature')))
+            )
+            stored = {directory for (directory,) in self.conn.execute(
+                "SELECT directory FROM snapshot_dirs WHERE root = ? AND recursive = ?", key)}
+            self.conn.executemany(
+                "DELETE FROM snapshot_dirs WHERE root = ? AND recursive = ? AND directory = ?",
+                (key + (directory,) for directory in stored.difference(dirs))
+            )
+            write = dirs.keys() if dirty is None else (set(dirty) | (dirs.keys() - stored)) & dirs.keys()
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO snapshot_dirs VALUES (?, ?, ?, ?, ?, ?)",
+                (key + (directory, dirs[directory]['mtime'],
+                        json.dumps(dirs[directory]['subdirs'], ensure_ascii=False),
+                        json.dumps(dirs[directory]['files'], ensure_ascii=False, separators=(',', ':')))
+                 for directory in write)
+            )
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self) -> 'SnapshotStore':
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+def build_snapshot(root: str, recursive: bool, dir_mtimes: Dict[str, float], all_files: List[FileRecord]) -> Dict:
+    """Monta o snapshot: mtime de cada diretório, suas subpastas e os registros dos arquivos"""
+    root = os.path.abspath(root)
+    dirs = {path: {'mtime': mtime, 'subdirs': [], 'files': []} for path, mtime in dir_mtimes.items()}
+    for path in dir_mtimes:
+        parent = os.path.dirname(path)
+        if path != root and parent in dirs:
+            dirs[parent]['subdirs'].append(os.path.basename(path))
+    for file_info in all_files:
+        directory = dirs.get(file_info.directory)
+        if directory is not None:
+            directory['files'].append([
+                file_info.name, file_info.size, file_info.modified_time,
+                file_info.inode, file_info.hash
+            ])
+    return {'version': SNAPSHOT_VERSION, 'root': root, 'recursive': recursive, 'dirs': dirs}
+
+def scan_incremental(root: str, recursive: bool, snapshot: Optional[Dict],
+                     metrics: Optional[ScanMetrics] = None,
+                     filters: Optional[ScanFilter] = None
+                     ) -> Tuple[List[FileRecord], Dict[str, float], Set[str], Dict[str, int], Set[str]]:
+    """Varre a pasta listando apenas diretórios cujo mtime mudou desde o snapshot.
+
+    Diretórios inalterados têm seus arquivos (e hashes) copiados do snapshot sem
+    serem listados; só o próprio diretório recebe um stat. Retorna os arquivos,
+    o mtime de cada diretório visitado, os caminhos novos ou alterados,
+    contadores da varredura e os diretórios listados de novo.
+
+    'filters' é aplicado como em scanner.scan_files; o snapshot só pode ser
+    reaproveitado se tiver sido gerado com o mesmo filtro.
+
+    Limitação: alterar o conteúdo de um arquivo sem criar, remover ou renomear
+    nada não muda o mtime do diretório; use uma análise completa periódica.
+    """
+    root = os.path.abspath(root)
+    old_dirs = snapshot['dirs'] if snapshot else {}
+    all_files = []
+    dir_mtimes = {}
+    changed_paths = set()
+    listed_dirs = set()
+    stats = {'dirs_listed': 0, 'dirs_reused': 0}
+
+    pending = [(root, "")]  # (pasta, caminho relativo à raiz com '/' no fim)
+    while pending:
+        directory, rel_dir = pending.pop()
+        directory = sys.intern(directory)
+        try:
+            mtime = os.stat(directory).st_mtime
+        except OSError:
+            continue
+        dir_mtimes[directory] = mtime
+        old = old_dirs.get(directory)
+        if metrics is not None:
+            metrics.count('dirs_visited')
+
+        if old is not None and old['mtime'] == mtime:
+            # Diretório inalterado: reaproveita a listagem anterior
+            stats['dirs_reused'] += 1
+            for name, size, modified_time, inode, file_hash in old['files']:
+                all_files.append(FileRecord(directory, name, size, modified_time, inode, file_hash))
+            subdirs = [(os.path.join(directory, name), f"{rel_dir}{name}/") for name in old['subdirs']]
+        else:
+            stats['dirs_listed'] += 1
+            listed_dirs.add(directory)
+            previous = {record[0]: record for record in old['files']} if old else {}
+            subdirs = []
+            try:
+                with os.scandir(directory) as entries:
+                    for entry in entries:
+                        try:
+                            if entry.is_dir(follow_symlinks=False):
+                                if filters is None or filters.accepts_dir(entry.name, rel_dir + entry.name):
+                                    subdirs.append((entry.path, f"{rel_dir}{entry.name}/"))
+                                elif metrics is not None:
+                                    metrics.count('dirs_pruned')
+                                continue
+                            if not entry.is_file():
+                                continue
+                            if filters is not None and not filters.accepts_name(entry.name, rel_dir + entry.name):
+                                if metrics is not None:
+                                    metrics.count('files_filtered')
+                                continue
+                            file_stat = entry.stat()
+                        except OSError as e:
+                            if metrics is not None:
+                                metrics.record_error(entry.path, type(e).__name__, str(e))
+                            continue
+                        if metrics is not None:
+                            metrics.count('files_stated')
+                        if filters is not None and not filters.accepts_size(file_stat.st_size):
+                            if metrics is not None:
+                                metrics.count('files_filtered')
+                            continue
+                        file_info = FileRecord(
+                            directory, entry.name, file_stat.st_size, file_stat.st_mtime, file_stat.st_ino
+                        )
+                        record = previous.get(entry.name)
+                        if record and record[1:3] == [file_info.size, file_info.modified_time] \
+                                and inode_matches(record[3], file_info.inode):
+                            file_info.hash = record[4]
+                        else:
+                            changed_paths.add(entry.path)
+                        all_files.append(file_info)
+            except OSError as e:
+                if metrics is not None:
+                    metrics.record_error(directory, type(e).__name__, str(e))
+                continue
+
+        if recursive:
+            pending.extend(reversed(subdirs))
+
+    return all_files, dir_mtimes, changed_paths, stats, listed_dirs
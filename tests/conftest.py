@@ -0,0 +1,19 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scanner import FileRecord
+
+@pytest.fixture
+def make_file(tmp_path):
+    """Cria um arquivo com o conteúdo informado e retorna o FileRecord dele"""
+    def make(relative_path: str, content: bytes) -> FileRecord:
+        path = tmp_path / relative_path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(content)
+        file_stat = path.stat()
+        return FileRecord(str(path.parent), path.name, file_stat.st_size, file_stat.st_mtime, 0)
+    return make
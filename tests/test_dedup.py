@@ -0,0 +1,109 @@
+import json
+import os
+
+import pytest
+
+import dedup
+from dedup import dedup_groups, replace_with_link
+from engine import DuplicateGroup
+from report import groups_from_report
+
+CONTENT = b"conteudo repetido " * 1000
+
+def make_group(*members):
+    group = DuplicateGroup("hash", members[0].size, "md5", list(members))
+    group.keeper_index = 0
+    return group
+
+def test_hardlink_replaces_copy(make_file):
+    keeper = make_file("a/original.bin", CONTENT)
+    copy = make_file("b/copia.bin", CONTENT)
+    result = dedup_groups([make_group(keeper, copy)], 'hardlink')
+    assert result['linked'] == 1
+    assert result['bytes_reclaimed'] == len(CONTENT)
+    assert result['errors'] == []
+    assert os.path.samefile(keeper.path, copy.path)
+    assert not [name for name in os.listdir(os.path.dirname(copy.path)) if name.endswith(".dedup")]
+
+def test_second_run_reports_already_linked(make_file):
+    keeper = make_file("original.bin", CONTENT)
+    copy = make_file("copia.bin", CONTENT)
+    group = make_group(keeper, copy)
+    dedup_groups([group], 'hardlink')
+    result = dedup_groups([group], 'hardlink')
+    assert result['linked'] == 0
+    assert result['already_linked'] == 1
+
+def test_refuses_different_content(make_file):
+    keeper = make_file("original.bin", CONTENT)
+    copy = make_file("copia.bin", CONTENT[:-1] + b"X")
+    with pytest.raises(ValueError):
+        replace_with_link(keeper.path, copy.path)
+    assert not os.path.samefile(keeper.path, copy.path)
+    with open(copy.path, 'rb') as f:
+        assert f.read().endswith(b"X")
+
+def test_refuses_copy_changed_after_scan(make_file):
+    keeper = make_file("original.bin", CONTENT)
+    copy = make_file("copia.bin", CONTENT)
+    with open(copy.path, 'ab') as f:
+        f.write(b"mais")
+    result = dedup_groups([make_group(keeper, copy)], 'hardlink')
+    assert result['linked'] == 0
+    assert [path for path, _ in result['errors']] == [copy.path]
+    assert not os.path.samefile(keeper.path, copy.path)
+
+def test_refuses_keeper_changed_after_scan(make_file):
+    keeper = make_file("original.bin", CONTENT)
+    copy = make_file("copia.bin", CONTENT)
+    os.utime(keeper.path, (keeper.modified_time + 60, keeper.modified_time + 60))
+    result = dedup_groups([make_group(keeper, copy)], 'hardlink')
+    assert result['linked'] == 0
+    assert len(result['errors']) == 1
+    assert not os.path.samefile(keeper.path, copy.path)
+
+def test_cross_device_copies_link_to_same_device_copy(make_file, monkeypatch):
+    keeper = make_file("disco1/original.bin", CONTENT)
+    first = make_file("disco2/copia1.bin", CONTENT)
+    second = make_file("disco2/copia2.bin", CONTENT)
+    # Simula a pasta 'disco2' em outro sistema de arquivos
+    monkeypatch.setattr(dedup, '_device', lambda path: 2 if "disco2" in path else 1)
+    result = dedup_groups([make_group(keeper, first, second)], 'hardlink')
+    assert result['cross_device'] == 1
+    assert result['linked'] == 1
+    assert result['errors'] == []
+    assert not os.path.samefile(keeper.path, first.path)
+    assert os.path.samefile(first.path, second.path)
+
+def test_copy_intact_when_linking_fails(make_file, monkeypatch):
+    keeper = make_file("original.bin", CONTENT)
+    copy = make_file("copia.bin", CONTENT)
+    inode = os.stat(copy.path).st_ino
+
+    def failing_replace(source, destination):
+        raise OSError("falha simulada")
+
+    monkeypatch.setattr(dedup.os, 'replace', failing_replace)
+    result = dedup_groups([make_group(keeper, copy)], 'hardlink')
+    monkeypatch.undo()
+    assert result['linked'] == 0
+    assert result['errors'] == [(copy.path, "falha simulada")]
+    assert os.stat(copy.path).st_ino == inode
+    with open(copy.path, 'rb') as f:
+        assert f.read() == CONTENT
+    assert sorted(os.listdir(os.path.dirname(copy.path))) == ["copia.bin", "original.bin"]
+
+def test_refuses_group_reloaded_without_kind(make_file, tmp_path):
+    keeper = make_file("original.bin", CONTENT)
+    copy = make_file("copia.bin", CONTENT)
+    # Relatório gravado antes do tipo do grupo: não se sabe se o conteúdo é idêntico
+    report = tmp_path / "antigo.jsonl"
+    data = make_group(keeper, copy).to_dict()
+    del data['kind']
+    report.write_text(json.dumps(data) + "\n", encoding='utf-8')
+    group, = groups_from_report(str(report))
+    assert group.kind is None
+
+    result = dedup_groups([group], 'hardlink')
+    assert result['linked'] == 0 and len(result['errors']) == 1
+    assert not os.path.samefile(keeper.path, copy.path)
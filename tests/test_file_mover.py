@@ -0,0 +1,163 @@
+import errno
+import json
+import os
+
+import file_mover
+from file_mover import BatchMover, MoveJournal, find_incomplete_journals
+
+def make_sources(tmp_path, names):
+    paths = []
+    for number, name in enumerate(names):
+        path = tmp_path / "origem" / f"pasta{number}" / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(f"arquivo {number}".encode())
+        paths.append(str(path))
+    return paths
+
+def read(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+def test_undo_after_full_batch(tmp_path):
+    destination = tmp_path / "ArquivosDuplicados"
+    destination.mkdir()
+    sources = make_sources(tmp_path, ["a.txt", "b.txt", "c.txt"])
+    contents = [read(source) for source in sources]
+    mover = BatchMover(str(destination))
+
+    result = mover.move(sources)
+    assert result['moved'] == 3 and result['errors'] == []
+    assert not any(os.path.exists(source) for source in sources)
+    assert find_incomplete_journals(str(destination)) == []
+
+    undo = mover.undo(result['journal'])
+    assert undo['restored'] == 3 and undo['errors'] == []
+    assert [read(source) for source in sources] == contents
+    assert sorted(os.listdir(destination)) == [os.path.basename(result['journal'])]
+    _, done, undone = MoveJournal(result['journal']).read()
+    assert done == set() and undone == set(sources)
+
+def test_resume_after_journal_truncated_mid_batch(tmp_path):
+    destination = tmp_path / "ArquivosDuplicados"
+    destination.mkdir()
+    sources = make_sources(tmp_path, ["a.txt", "b.txt", "c.txt", "d.txt"])
+    contents = [read(source) for source in sources]
+    mover = BatchMover(str(destination))
+    moves = mover.plan(sources)
+    journal = MoveJournal.create(str(destination), moves)
+    # Interrupção: o 1º movimento foi registrado, o 2º foi feito sem registro
+    # e a gravação da linha seguinte foi cortada no meio
+    os.rename(*moves[0])
+    journal.mark('done', [moves[0][0]])
+    os.rename(*moves[1])
+    with open(journal.path, 'a', encoding='utf-8') as f:
+        f.write(json.dumps({'op': 'done', 'sources': [moves[1][0]]})[:15])
+
+    assert find_incomplete_journals(str(destination)) == [journal.path]
+    assert [source for source, _ in journal.pending()] == sources[1:]
+
+    result = mover.resume(journal.path)
+    assert result['moved'] == 3 and result['errors'] == []
+    assert [read(target) for _, target in moves] == contents
+    assert journal.pending() == []
+    assert find_incomplete_journals(str(destination)) == []
+
+    # O diário truncado continua servindo para desfazer o lote inteiro
+    undo = mover.undo(journal.path)
+    assert undo['restored'] == 4 and undo['errors'] == []
+    assert [read(source) for source in sources] == contents
+
+def test_name_collision_at_destination(tmp_path):
+    destination = tmp_path / "ArquivosDuplicados"
+    destination.mkdir()
+    (destination / "foto.jpg").write_bytes(b"ja estava aqui")
+    sources = make_sources(tmp_path, ["foto.jpg", "foto.jpg"])
+    contents = [read(source) for source in sources]
+
+    result = BatchMover(str(destination)).move(sources)
+    assert result['moved'] == 2 and result['errors'] == []
+    assert read(destination / "foto.jpg") == b"ja estava aqui"
+    assert read(destination / "foto_1.jpg") == contents[0]
+    assert read(destination / "foto_2.jpg") == contents[1]
+
+def test_resume_does_not_overwrite_file_created_at_destination(tmp_path):
+    destination = tmp_path / "ArquivosDuplicados"
+    destination.mkdir()
+    sources = make_sources(tmp_path, ["a.txt"])
+    mover = BatchMover(str(destination))
+    moves = mover.plan(sources)
+    journal = MoveJournal.create(str(destination), moves)
+    # Antes de retomar, outro arquivo ocupou o destino planejado
+    with open(moves[0][1], 'wb') as f:
+        f.write(b"outro arquivo")
+
+    result = mover.resume(journal.path)
+    assert result['moved'] == 0 and len(result['errors']) == 1
+    assert read(moves[0][1]) == b"outro arquivo"
+    assert read(sources[0]) == b"arquivo 0"
+
+def test_undo_does_not_overwrite_new_file_at_origin(tmp_path):
+    destination = tmp_path / "ArquivosDuplicados"
+    destination.mkdir()
+    sources = make_sources(tmp_path, ["a.txt"])
+    mover = BatchMover(str(destination))
+    result = mover.move(sources)
+    with open(sources[0], 'wb') as f:
+        f.write(b"arquivo novo na origem")
+
+    undo = mover.undo(result['journal'])
+    assert undo['restored'] == 0 and len(undo['errors']) == 1
+    assert read(sources[0]) == b"arquivo novo na origem"
+    assert read(destination / "a.txt") == b"arquivo 0"
+
+def test_resume_after_crash_between_copy_and_unlink(tmp_path, monkeypatch):
+    destination = tmp_path / "ArquivosDuplicados"
+    destination.mkdir()
+    sources = make_sources(tmp_path, ["a.txt", "b.txt"])
+    contents = [read(source) for source in sources]
+    mover = BatchMover(str(destination))
+
+    # Simula outro volume (cópia + remoção) e uma queda logo após a cópia
+    def cross_device_rename(source, target):
+        raise OSError(errno.EXDEV, "Invalid cross-device link")
+
+    def crash(path):
+        raise RuntimeError("queda de energia")
+
+    monkeypatch.setattr(file_mover, 'same_filesystem', lambda path_a, path_b: False)
+    monkeypatch.setattr(file_mover.os, 'rename', cross_device_rename)
+    monkeypatch.setattr(file_mover.os, 'unlink', crash)
+    result = mover.move(sources)
+    assert result['moved'] == 0 and len(result['errors']) == 2
+    journal = MoveJournal(result['journal'])
+    moves = journal.read()[0]
+    # O destino só recebe a cópia completa; a origem continua no lugar
+    assert [read(target) for _, target in moves] == contents
+    assert [read(source) for source in sources] == contents
+    assert not any(name.endswith(".movendo") for name in os.listdir(destination))
+
+    monkeypatch.undo()
+    resumed = mover.resume(journal.path)
+    assert resumed['moved'] == 2 and resumed['errors'] == []
+    assert not any(os.path.exists(source) for source in sources)
+    assert [read(target) for _, target in moves] == contents
+    assert journal.pending() == []
+
+def test_resume_redoes_interrupted_partial_copy(tmp_path):
+    destination = tmp_path / "ArquivosDuplicados"
+    destination.mkdir()
+    sources = make_sources(tmp_path, ["a.txt"])
+    mover = BatchMover(str(destination))
+    moves = mover.plan(sources)
+    journal = MoveJournal.create(str(destination), moves)
+    # Cópia cortada no meio e cópia temporária esquecida no destino
+    with open(moves[0][1], 'wb') as f:
+        f.write(b"arqu")
+    with open(os.path.join(destination, ".a.txt.movendo"), 'wb') as f:
+        f.write(b"arquivo")
+
+    result = mover.resume(journal.path)
+    assert result['moved'] == 1 and result['errors'] == []
+    assert read(moves[0][1]) == b"arquivo 0"
+    assert not os.path.exists(sources[0])
+    assert sorted(os.listdir(destination)) == sorted(["a.txt", os.path.basename(journal.path)])
@@ -0,0 +1,18 @@
+from hash_cache import HashCache
+
+def test_unknown_inode_is_not_compared(tmp_path, make_file):
+    cache = HashCache(str(tmp_path / "cache.db"))
+    file_info = make_file("a.bin", b"conteudo")
+    file_info.inode = 0
+    cache.put(file_info, 'full', "digest")
+    cache.flush()
+
+    # Windows: DirEntry.stat() traz st_ino = 0; vale tamanho + data de modificação
+    assert cache.get(file_info, 'full') == "digest"
+    file_info.inode = 1234
+    assert cache.get(file_info, 'full') == "digest"
+    cache.put(file_info, 'full', "digest")
+    cache.flush()
+    file_info.inode = 5678
+    assert cache.get(file_info, 'full') is None
+    cache.close()
@@ -0,0 +1,63 @@
+import hashlib
+import os
+
+import pytest
+
+from engine import FileComparator
+from hashing import HEAD_BLOCK_SIZE, TAIL_BLOCK_SIZE, compute_hashes_progressive
+
+SIZE = HEAD_BLOCK_SIZE + TAIL_BLOCK_SIZE + 10_000
+BASE = bytes(range(256)) * (SIZE // 256) + b"x" * (SIZE % 256)
+
+def changed(offset, data=BASE):
+    return data[:offset] + bytes([data[offset] ^ 0xFF]) + data[offset + 1:]
+
+# Conteúdos com as colisões que as etapas tamanho -> início -> fim -> completo precisam separar
+CONTENTS = {
+    'igual_1.bin': BASE,
+    'igual_2.bin': BASE,
+    'igual_3.bin': BASE,
+    'meio_a.bin': changed(SIZE // 2),           # mesmo início e fim, meio diferente
+    'meio_b.bin': changed(SIZE // 2),
+    'meio_c.bin': changed(SIZE // 2 + 1),
+    'fim_a.bin': changed(SIZE - 1),             # difere só no último byte
+    'fim_b.bin': changed(SIZE - 2),
+    'tamanho_a.bin': BASE + b"!",               # mesmo início, tamanho diferente
+    'tamanho_b.bin': BASE[:-1],
+    'vazio_1.bin': b"",
+    'vazio_2.bin': b"",
+    'pequeno_1.bin': b"abc",
+    'pequeno_2.bin': b"abc",
+    'pequeno_3.bin': b"abd",
+    'bloco_1.bin': BASE[:HEAD_BLOCK_SIZE],      # cabe exatamente no bloco inicial
+    'bloco_2.bin': BASE[:HEAD_BLOCK_SIZE],
+    'bloco_3.bin': BASE[:HEAD_BLOCK_SIZE + 1],
+}
+
+def brute_force_groups(files):
+    by_digest = {}
+    for file_info in files:
+        with open(file_info.path, 'rb') as f:
+            by_digest.setdefault(hashlib.md5(f.read()).hexdigest(), set()).add(file_info.path)
+    return {frozenset(paths) for paths in by_digest.values() if len(paths) > 1}
+
+@pytest.mark.parametrize('workers', [1, 4])
+def test_progressive_grouping_equals_full_hash(make_file, workers):
+    files = [make_file(f"pasta/{name}", content) for name, content in CONTENTS.items()]
+    expected = brute_force_groups(files)
+
+    stats = compute_hashes_progressive(files, workers=workers)
+    groups = {frozenset(member.path for member in group.members)
+              for group in FileComparator().find_duplicate_groups(files)}
+    assert groups == expected
+    names = {frozenset(os.path.basename(path) for path in group) for group in groups}
+    assert names == {
+        frozenset({'igual_1.bin', 'igual_2.bin', 'igual_3.bin'}),
+        frozenset({'meio_a.bin', 'meio_b.bin'}),
+        frozenset({'vazio_1.bin', 'vazio_2.bin'}),
+        frozenset({'pequeno_1.bin', 'pequeno_2.bin'}),
+        frozenset({'bloco_1.bin', 'bloco_2.bin'}),
+    }
+    # Tamanho único e diferença no fim são resolvidos sem ler o arquivo inteiro
+    assert stats['full_hashed'] == 6
+    assert stats['bytes_read'] < stats['total_bytes']
@@ -0,0 +1,22 @@
+from reference_index import ReferenceIndex
+
+def test_nested_roots_keep_their_own_rows(tmp_path):
+    outer = tmp_path / "acervo"
+    inner = outer / "fotos"
+    inner.mkdir(parents=True)
+    (outer / "a.txt").write_bytes(b"conteudo a")
+    (inner / "b.txt").write_bytes(b"conteudo b")
+
+    with ReferenceIndex(str(tmp_path / "indice.db")) as index:
+        assert index.update(str(outer))['added'] == 2
+        assert index.update(str(inner))['added'] == 1
+        index.hash_missing(str(inner), [len(b"conteudo b")])
+        index.hash_missing(str(outer), [len(b"conteudo b")])
+        assert len(index) == 3
+
+        # Atualizar um acervo não apaga nem sobrescreve as linhas do outro
+        (inner / "b.txt").unlink()
+        assert index.update(str(outer))['removed'] == 1
+        assert index.update(str(inner))['removed'] == 1
+        assert len(index) == 1
+        assert index.roots() == [str(outer)]
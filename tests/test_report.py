@@ -0,0 +1,47 @@
+import pytest
+
+from engine import DuplicateGroup, SimilarImageGroup
+from report import ReportWriter, groups_from_report
+
+FORMATS = ['jsonl', 'csv', 'parquet']
+
+def write_and_reload(tmp_path, report_format, groups):
+    if report_format == 'parquet':
+        pytest.importorskip("pyarrow")
+    path = str(tmp_path / f"relatorio.{report_format}")
+    with ReportWriter(path, report_format) as writer:
+        writer.write_groups(groups)
+    return list(groups_from_report(path))
+
+@pytest.mark.parametrize('report_format', FORMATS)
+def test_reference_group_keeps_kind_and_anchor(tmp_path, make_file, report_format):
+    archived = make_file("acervo/foto.jpg", b"mesmo conteudo")
+    incoming = make_file("novos/foto.jpg", b"mesmo conteudo")
+    group = DuplicateGroup("hash", archived.size, "md5", [incoming, archived])
+    group.reference = {archived.path}
+    group.kind = 'reference'
+    group.keeper_index = group.members.index(archived)
+
+    loaded, = write_and_reload(tmp_path, report_format, [group])
+    assert type(loaded) is DuplicateGroup
+    assert loaded.kind == 'reference'
+    assert loaded.reference == {archived.path}
+    assert loaded.keeper.path == archived.path
+
+@pytest.mark.parametrize('report_format', FORMATS)
+def test_similar_image_group_keeps_type_and_distances(tmp_path, make_file, report_format):
+    large = make_file("fotos/grande.jpg", b"x" * 200)
+    small = make_file("fotos/pequena.jpg", b"x" * 50)
+    large.hash = small.hash = "c3a1"
+    duplicate = make_file("outros/a.bin", b"abc")
+    copy = make_file("outros/b.bin", b"abc")
+    groups = [SimilarImageGroup('phash', [large, small], [0, 3]),
+              DuplicateGroup("hash", 3, "md5", [duplicate, copy])]
+
+    images, plain = write_and_reload(tmp_path, report_format, groups)
+    assert isinstance(images, SimilarImageGroup) and images.kind == 'similar_image'
+    assert dict(zip([member.path for member in images.members], images.distances)) == \
+        {large.path: 0, small.path: 3}
+    assert images.keeper.path == large.path
+    assert images.reclaimable_bytes == small.size
+    assert type(plain) is DuplicateGroup and plain.kind == 'duplicate' and plain.reference is None
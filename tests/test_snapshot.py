@@ -0,0 +1,45 @@
+import os
+import sqlite3
+
+from engine import run_scan
+
+def stored_dirs(snapshot_dir):
+    conn = sqlite3.connect(os.path.join(snapshot_dir, "snapshots.db"))
+    try:
+        return {directory: (rowid, files) for rowid, directory, files in
+                conn.execute("SELECT rowid, directory, files FROM snapshot_dirs")}
+    finally:
+        conn.close()
+
+def group_paths(result):
+    return sorted(sorted(member.path for member in group.members) for group in result['groups'])
+
+def test_only_changed_directories_are_rewritten(tmp_path):
+    root = tmp_path / "pasta"
+    for folder in ("a", "b", "b/c"):
+        (root / folder).mkdir(parents=True)
+    (root / "a" / "1.txt").write_bytes(b"um")
+    (root / "b" / "1.txt").write_bytes(b"um")
+    (root / "b" / "c" / "2.txt").write_bytes(b"dois!")
+    options = {'incremental': True, 'snapshot_dir': str(tmp_path / "snapshots"),
+               'cache_path': str(tmp_path / "cache.db")}
+    run_scan(str(root), **options)
+    before = stored_dirs(options['snapshot_dir'])
+    assert len(before) == 4
+
+    (root / "a" / "2.txt").write_bytes(b"dois!")
+    (root / "b" / "1.txt").unlink()
+    # Garante o novo mtime mesmo em sistemas de arquivos com resolução grosseira
+    for folder in ("a", "b"):
+        mtime = os.stat(root / folder).st_mtime + 10
+        os.utime(root / folder, (mtime, mtime))
+    result = run_scan(str(root), **options)
+    assert result['scan_stats'] == {'dirs_listed': 2, 'dirs_reused': 2}
+    assert group_paths(result) == group_paths(run_scan(str(root), cache_path=options['cache_path']))
+
+    after = stored_dirs(options['snapshot_dir'])
+    assert after[str(root)] == before[str(root)]
+    # b/c não mudou de listagem, mas o arquivo dele ganhou par e hash completo
+    assert after[str(root / "b" / "c")][0] != before[str(root / "b" / "c")][0]
+    assert after[str(root / "a")] != before[str(root / "a")]
+    assert after[str(root / "b")] != before[str(root / "b")]
@@ -0,0 +1,64 @@
+import os
+
+from engine import DuplicateGroup
+from verify import verify_groups
+
+CONTENT = b"conteudo repetido " * 1000
+
+def make_group(*members):
+    return DuplicateGroup("hash", members[0].size, "md5", list(members))
+
+def test_identical_group_is_verified(make_file):
+    group = make_group(make_file("a.bin", CONTENT), make_file("b.bin", CONTENT))
+    checked, stats = verify_groups([group])
+    assert checked == [group] and group.verification == 'verified'
+    assert stats['groups_verified'] == 1 and stats['groups_split'] == 0
+
+def test_byte_mismatch_splits_group(make_file):
+    # Mesmo hash informado, mas um dos arquivos difere no meio (colisão ou alteração)
+    first = make_file("a.bin", CONTENT)
+    second = make_file("b.bin", CONTENT)
+    other = make_file("c.bin", CONTENT[:5000] + b"X" + CONTENT[5001:])
+    group = make_group(first, second, other)
+    group.keeper_index = group.members.index(second)
+
+    checked, stats = verify_groups([group], workers=2)
+    assert len(checked) == 1
+    subgroup = checked[0]
+    assert {member.path for member in subgroup.members} == {first.path, second.path}
+    assert subgroup.verification == 'split'
+    assert subgroup.keeper.path == second.path
+    assert stats['groups_split'] == 1 and stats['files_dropped'] == 1
+    assert stats['groups_unreadable'] == 0 and stats['read_errors'] == 0
+
+def test_unreadable_member_is_not_a_split(make_file):
+    first = make_file("a.bin", CONTENT)
+    second = make_file("b.bin", CONTENT)
+    missing = make_file("c.bin", CONTENT)
+    os.remove(missing.path)
+
+    checked, stats = verify_groups([make_group(first, second, missing)])
+    assert len(checked) == 1 and checked[0].verification == 'verified'
+    assert {member.path for member in checked[0].members} == {first.path, second.path}
+    assert stats['groups_unreadable'] == 1 and stats['read_errors'] == 1
+    assert stats['groups_split'] == 0 and stats['files_dropped'] == 0
+
+def test_reference_stays_anchored_after_split(make_file):
+    archived = make_file("acervo/foto.jpg", CONTENT)
+    same = make_file("novos/foto.jpg", CONTENT)
+    different = make_file("novos/outra.jpg", CONTENT[:-1] + b"X")
+    lonely = make_file("novos/mais_uma.jpg", CONTENT[:-1] + b"X")
+    group = make_group(same, different, lonely, archived)
+    group.reference = {archived.path}
+    group.kind = 'reference'
+    group.keeper_index = group.members.index(archived)
+
+    checked, stats = verify_groups([group])
+    # O subgrupo sem arquivo do acervo não diz nada sobre o acervo e sai do resultado
+    assert len(checked) == 1
+    subgroup = checked[0]
+    assert {member.path for member in subgroup.members} == {archived.path, same.path}
+    assert subgroup.keeper.path == archived.path
+    assert subgroup.reference == {archived.path} and subgroup.kind == 'reference'
+    assert subgroup.verification == 'split'
+    assert stats['groups_split'] == 1
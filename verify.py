@@ -0,0 +1,200 @@
+import os
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from hashing import LARGE_BLOCK_SIZE, PROGRESS_INTERVAL, ProgressCallback, map_ordered
+from metrics import ScanMetrics
+
+# Situação da conferência de um grupo (DuplicateGroup.verification)
+VERIFICATION_STATES = {
+    'unverified': "Não conferido",
+    'verified': "Conferido byte a byte",
+    'split': "Separado na conferência",
+}
+
+# Memória máxima dos blocos lidos ao mesmo tempo em um grupo (por worker);
+# grupos com muitos membros usam blocos menores (até MIN_VERIFY_BLOCK_SIZE)
+VERIFY_MEMORY_BUDGET = 16 * 1024 * 1024
+MIN_VERIFY_BLOCK_SIZE = 64 * 1024
+# Acima disto, os membros são reabertos a cada bloco em vez de ficarem todos abertos
+MAX_OPEN_FILES = 64
+
+class _MemberReader:
+    """Leitura sequencial de um membro, com o arquivo aberto ou reaberto a cada bloco"""
+    __slots__ = ('path', 'handle', 'offset')
+
+    def __init__(self, path: str, keep_open: bool):
+        self.path = path
+        self.handle = open(path, 'rb') if keep_open else None
+        self.offset = 0
+
+    def read(self, size: int) -> bytes:
+        if self.handle is not None:
+            return self.handle.read(size)
+        with open(self.path, 'rb') as f:
+            f.seek(self.offset)
+            data = f.read(size)
+        self.offset += len(data)
+        return data
+
+    def close(self):
+        if self.handle is not None:
+            self.handle.close()
+
+def compare_members(paths: List[str]) -> Tuple[List[List[int]], List[Tuple[int, Tuple[str, str]]], int, float]:
+    """Compara os arquivos bloco a bloco, todos ao mesmo tempo, e os separa pelo conteúdo.
+
+    A cada rodada lê o próximo bloco de cada membro e divide cada classe de
+    membros pelo conteúdo do bloco; um membro que fica sozinho deixa de ser
+    lido (parada na primeira diferença). Links físicos do mesmo arquivo são
+    lidos uma vez só.
+
+    Retorna as classes de conteúdo idêntico com 2 ou mais membros (índices
+    em 'paths'), os erros de leitura (índice, (tipo, mensagem)), os bytes
+    lidos e os segundos gastos.
+    """
+    start = time.perf_counter()
+    errors = []
+    inodes = {}
+    for index, path in enumerate(paths):
+        try:
+            file_stat = os.stat(path)
+        except OSError as e:
+            errors.append((index, (type(e).__name__, str(e))))
+            continue
+        # Sem inode (0, em alguns sistemas de arquivos), cada caminho conta como um arquivo
+        key = (file_stat.st_dev, file_stat.st_ino) if file_stat.st_ino else ('path', index)
+        inodes.setdefault(key, []).append(index)
+    links = list(inodes.values())
+    block_size = max(MIN_VERIFY_BLOCK_SIZE, min(LARGE_BLOCK_SIZE, VERIFY_MEMORY_BUDGET // max(len(links), 1)))
+    keep_open = len(links) <= MAX_OPEN_FILES
+
+    readers = {}
+    try:
+        for number, indexes in enumerate(links):
+            try:
+                readers[number] = _MemberReader(paths[indexes[0]], keep_open)
+            except OSError as e:
+                errors.extend((index, (type(e).__name__, str(e))) for index in indexes)
+        bytes_read = 0
+        identical = []
+        classes = [list(readers)] if len(readers) > 1 else []
+        # Um só arquivo com vários links: idêntico sem ler nada
+        identical.extend([number] for number in readers if len(links[number]) > 1 and not classes)
+        while classes:
+            next_classes = []
+            for members in classes:
+                blocks = []  # (conteúdo do bloco, membros com esse conteúdo)
+                for number in members:
+                    try:
+                        data = readers[number].read(block_size)
+                    except OSError as e:
+                        errors.extend((index, (type(e).__name__, str(e))) for index in links[number])
+                        continue
+                    bytes_read += len(data)
+                    for block, same in blocks:
+                        if block == data:
+                            same.append(number)
+                            break
+                    else:
+                        blocks.append((data, [number]))
+                for block, same in blocks:
+                    if len(same) > 1 or len(links[same[0]]) > 1:
+                        (next_classes if block else identical).append(same)
+            classes = [members for members in next_classes if len(members) > 1]
+            # Classe com um único arquivo (com vários links): idêntica sem continuar a leitura
+            identical.extend(members for members in next_classes if len(members) == 1)
+    finally:
+        for reader in readers.values():
+            reader.close()
+
+    groups = [sorted(index for number in members for index in links[number]) for members in identical]
+    return [group for group in groups if len(group) > 1], errors, bytes_read, time.perf_counter() - start
+
+def verify_groups(groups: List, workers: int = 1, use_processes: bool = False,
+                  progress: Optional[ProgressCallback] = None,
+                  metrics: Optional[ScanMetrics] = None,
+                  on_group: Optional[Callable] = None) -> Tuple[List, Dict]:
+    """Confere byte a byte os membros de cada grupo (DuplicateGroup) antes de qualquer ação destrutiva.
+
+    Os grupos são conferidos em paralelo (com 'workers'), cada um lendo seus
+    membros em conjunto (compare_members). Um grupo idêntico fica com
+    verification='verified'; um grupo com conteúdos diferentes (colisão de
+    hash ou arquivo alterado depois do cálculo) é dividido nos subconjuntos
+    idênticos, com verification='split', e os membros sem par saem do
+    resultado. Membros que não puderam ser lidos também saem e são contados
+    em 'read_errors'; um grupo que perdeu membros só por isso conta em
+    'groups_unreadable', não como separado. Em grupos do acervo de referência
+    ('reference'), só ficam os subgrupos com um arquivo do acervo e um novo.
+    Emite eventos 'hashing' com hash_stage='verify'; 'on_group' recebe cada
+    grupo conferido assim que ele fica pronto.
+
+    Retorna os grupos conferidos e as estatísticas da conferência.
+    """
+    stats = {'groups_checked': 0, 'groups_verified': 0, 'groups_split': 0, 'groups_unreadable': 0,
+             'files_dropped': 0, 'read_errors': 0, 'bytes_read': 0}
+    checked = []
+    bytes_total = sum(group.size * len(group.members) for group in groups)
+    bytes_done = 0
+    last_report = time.monotonic()
+    tasks = ([member.path for member in group.members] for group in groups)
+    results = map_ordered(compare_members, tasks, workers, use_processes=use_processes)
+    for done, (group, (classes, errors, bytes_read, seconds)) in enumerate(zip(groups, results), 1):
+        group_bytes = group.size * len(group.members)
+        first_new = len(checked)
+        stats['groups_checked'] += 1
+        stats['bytes_read'] += bytes_read
+        stats['read_errors'] += len(errors)
+        bytes_done += group_bytes
+        if metrics is not None:
+            for index, error in errors:
+                metrics.record_error(group.members[index].path, *error)
+            metrics.record_file(group.keeper.path, 'verify', group_bytes, seconds)
+
+        matched = sum(len(members) for members in classes)
+        if len(classes) == 1 and matched == len(group.members):
+            group.verification = 'verified'
+            checked.append(group)
+            stats['groups_verified'] += 1
+        else:
+            # Conteúdo diferente divide o grupo; membros ilegíveis só saem dele
+            # Com um só membro legível não há com o que comparar: não é diferença de conteúdo
+            readable = len(group.members) - len(errors)
+            content_dropped = readable - matched if readable > 1 else 0
+            mismatch = len(classes) > 1 or content_dropped > 0
+            status = 'split' if mismatch else 'verified'
+            for members in classes:
+                subgroup = type(group)(group.digest, group.size, group.algorithm,
+                                       [group.members[index] for index in members])
+                subgroup.verification = status
+                subgroup.kind = group.kind
+                if group.reference is not None:
+                    # Sem arquivo do acervo (ou sem arquivo novo), o subgrupo não diz nada sobre o acervo
+                    subgroup.reference = group.reference
+                    archived = [i for i, member in enumerate(subgroup.members) if member.path in group.reference]
+                    if not archived or len(archived) == len(subgroup.members):
+                        continue
+                    subgroup.keeper_index = archived[0]
+                # Mantém o arquivo escolhido, se ficou no subgrupo
+                if group.keeper in subgroup.members:
+                    subgroup.keeper_index = subgroup.members.index(group.keeper)
+                checked.append(subgroup)
+            stats['groups_split' if mismatch else 'groups_unreadable'] += 1
+            stats['files_dropped'] += content_dropped
+        if on_group is not None:
+            for finished_group in checked[first_new:]:
+                on_group(finished_group)
+
+        if progress is not None:
+            now = time.monotonic()
+            if now - last_report >= PROGRESS_INTERVAL or done == len(groups):
+                last_report = now
+                progress('hashing', {'hash_stage': 'verify', 'files': done, 'files_total': len(groups),
+                                     'bytes': bytes_done, 'bytes_total': bytes_total})
+
+    if metrics is not None:
+        metrics.count('groups_verified', stats['groups_verified'])
+        metrics.count('groups_split', stats['groups_split'])
+        metrics.count('groups_unreadable', stats['groups_unreadable'])
+        metrics.count('bytes_verified', stats['bytes_read'])
+    return checked, stats
@@ -0,0 +1,378 @@
+import os
+import sqlite3
+import stat
+import sys
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, List, Optional, Union
+
+try:
+    from watchdog.events import EVENT_TYPE_MODIFIED, FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:
+    EVENT_TYPE_MODIFIED = None
+    FileSystemEventHandler = object
+    Observer = None
+
+from engine import DuplicateGroup, normalize_roots, run_scan
+from filters import ScanFilter
+from hash_cache import HashCache, DEFAULT_CACHE_PATH
+from hashing import DEFAULT_WORKERS, calculate_hash
+from scanner import FileRecord, inode_matches, scan_files
+from snapshot import build_snapshot, scan_incremental
+
+# Segundos sem novos eventos, com tamanho e data estáveis, antes de processar um arquivo
+DEFAULT_DEBOUNCE = 2.0
+# Intervalo entre as varreduras no modo de consulta periódica
+DEFAULT_POLL_INTERVAL = 5.0
+# Intervalo do laço que processa os arquivos pendentes
+TICK_INTERVAL = 0.25
+# Eventos recentes guardados para exibição
+MAX_EVENTS = 500
+
+WATCH_MODES = {
+    'events': "Eventos do sistema de arquivos (inotify/watchdog)",
+    'polling': "Consulta periódica",
+}
+
+WATCH_STATES = {
+    'starting': "Análise inicial",
+    'watching': "Monitorando",
+    'stopped': "Parado",
+    'error': "Erro",
+}
+
+def watch_events_available() -> bool:
+    """Se o monitoramento por eventos (pacote watchdog) está disponível"""
+    return Observer is not None
+
+class _EventHandler(FileSystemEventHandler):
+    """Repassa ao monitor os caminhos dos eventos do watchdog"""
+
+    def __init__(self, watcher: 'DuplicateWatcher'):
+        super().__init__()
+        self.watcher = watcher
+
+    def on_any_event(self, event):
+        # Aberturas e leituras (inclusive as do próprio cálculo de hash) não alteram nada, e
+        # uma pasta "modificada" só reflete eventos que os próprios arquivos já geram
+        if event.event_type in ('opened', 'closed_no_write') or \
+                (event.is_directory and event.event_type == EVENT_TYPE_MODIFIED):
+            return
+        self.watcher.notify(os.fsdecode(event.src_path))
+        dest_path = getattr(event, 'dest_path', '')
+        if dest_path:
+            self.watcher.notify(os.fsdecode(dest_path))
+
+class DuplicateWatcher:
+    """Monitora pastas e mantém os grupos de duplicados atualizados à medida que arquivos chegam.
+
+    Começa com uma análise completa (run_scan) e passa a manter em memória os
+    índices por tamanho e por hash usados no agrupamento. Cada arquivo criado,
+    alterado, movido ou removido é processado depois de 'debounce' segundos
+    sem novos eventos e com tamanho e data estáveis (um download em andamento
+    não é lido pela metade). Só o arquivo novo ou alterado tem o hash
+    calculado, e apenas se houver outro do mesmo tamanho; arquivos antigos que
+    ainda não tinham hash o recebem quando o tamanho passa a colidir.
+
+    Os eventos vêm do sistema de arquivos (watchdog: inotify no Linux) ou, sem
+    ele, de varreduras periódicas que só listam as pastas com mtime alterado
+    (como a análise incremental, não percebem um arquivo alterado no lugar).
+
+    Cada duplicado novo gera um evento 'duplicate', e um grupo que fica com um
+    só arquivo gera 'resolved'; os eventos ficam em 'events' e são passados a
+    'on_event'. Roda numa thread própria: start() e stop(). 'result' reaproveita
+    uma análise (run_scan) já feita das mesmas pastas, com as mesmas opções.
+    """
+
+    def __init__(self, root: Union[str, List[str]], recursive: bool = True, filters: Optional[ScanFilter] = None,
+                 algorithm: str = "md5", confirm_algorithm: Optional[str] = None, workers: int = DEFAULT_WORKERS,
+                 use_cache: bool = True, cache_path: str = DEFAULT_CACHE_PATH,
+                 debounce: float = DEFAULT_DEBOUNCE, poll_interval: float = DEFAULT_POLL_INTERVAL,
+                 polling: bool = False, on_event: Optional[Callable[[Dict], None]] = None,
+                 result: Optional[Dict] = None):
+        self.roots = [os.path.abspath(path) for path in normalize_roots(root)]
+        self.recursive = recursive
+        self.filters = filters if filters is not None and filters.active else None
+        self.scan_options = {'algorithm': algorithm, 'confirm_algorithm': confirm_algorithm, 'workers': workers}
+        self.use_cache = use_cache
+        self.cache_path = cache_path
+        self.debounce = debounce
+        self.poll_interval = poll_interval
+        self.mode = 'polling' if polling or Observer is None else 'events'
+        self.on_event = on_event
+        self.initial_result = result
+        self.algorithm = confirm_algorithm or algorithm
+        self.state = 'starting'
+        self.error = None
+        self.started_at = time.time()
+        self.events = deque(maxlen=MAX_EVENTS)
+        self.stats = {'files': 0, 'processed': 0, 'hashed': 0, 'bytes_hashed': 0, 'duplicates': 0, 'read_errors': 0}
+
+        self._lock = threading.RLock()
+        self._stop_event = threading.Event()
+        self._pending = {}  # caminho -> [último evento (monotonic), (tamanho, mtime) no último evento]
+        self._records = {}
+        self._by_size = {}
+        self._by_digest = {}  # (tamanho, hash) -> {caminho: FileRecord}
+        self._snapshots = {}
+        self._cache = None
+        self._observer = None
+        self._thread = None
+
+    def start(self) -> 'DuplicateWatcher':
+        self._thread = threading.Thread(target=self._run, name="duplicate-watcher", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout: Optional[float] = None):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    @property
+    def active(self) -> bool:
+        return self.state in ('starting', 'watching')
+
+    def notify(self, path: str):
+        """Marca um caminho como alterado (chamado pelo watchdog ou pela varredura periódica)"""
+        try:
+            file_stat = os.stat(path)
+            signature = (file_stat.st_size, file_stat.st_mtime_ns)
+        except OSError:
+            signature = None
+        with self._lock:
+            entry = self._pending.get(path)
+            # Evento que não mudou tamanho nem data não adia o processamento
+            if entry is None or entry[1] != signature:
+                self._pending[path] = [time.monotonic(), signature]
+
+    def groups(self) -> List[DuplicateGroup]:
+        """Grupos de duplicados atuais (arquivo mais antigo como mantido)"""
+        with self._lock:
+            return [
+                DuplicateGroup(digest, size, self.algorithm, list(members.values()))
+                for (size, digest), members in self._by_digest.items() if len(members) > 1
+            ]
+
+    def recent_events(self) -> List[Dict]:
+        with self._lock:
+            return list(self.events)
+
+    def _emit(self, event: str, **info):
+        info = {'event': event, 'time': round(time.time(), 3), **info}
+        with self._lock:
+            self.events.append(info)
+        if self.on_event is not None:
+            self.on_event(info)
+
+    def _run(self):
+        try:
+            if self.use_cache:
+                try:
+                    self._cache = HashCache(self.cache_path)
+                except (OSError, sqlite3.Error):
+                    self._cache = None
+            if self.mode == 'events':
+                # O observador começa antes da análise inicial: nada que chegar durante ela se perde
+                try:
+                    self._observer = Observer()
+                    for path in self.roots:
+                        self._observer.schedule(_EventHandler(self), path, recursive=self.recursive)
+                    self._observer.start()
+                except OSError as e:
+                    # Ex.: limite de inotify atingido
+                    self._observer = None
+                    self.mode = 'polling'
+                    self._emit('fallback', message=f"{type(e).__name__}: {str(e)}")
+
+            result = self.initial_result or run_scan(
+                self.roots, recursive=self.recursive, filters=self.filters,
+                use_cache=self.use_cache, cache_path=self.cache_path, **self.scan_options
+            )
+            self.initial_result = None
+            self.algorithm = result['hash_stats']['algorithm']
+            with self._lock:
+                for record in result['all_files']:
+                    self._add_record(record)
+            # Confere o que mudou entre a análise inicial e agora (e guarda o snapshot da consulta periódica)
+            for path in self.roots:
+                self._poll(path)
+            self.state = 'watching'
+            self._emit('ready', files=self.stats['files'], groups=len(self.groups()), mode=self.mode)
+
+            next_poll = time.monotonic() + self.poll_interval
+            while not self._stop_event.wait(TICK_INTERVAL):
+                if self.mode == 'polling' and time.monotonic() >= next_poll:
+                    for path in self.roots:
+                        self._poll(path)
+                    next_poll = time.monotonic() + self.poll_interval
+                self._process_pending()
+            self.state = 'stopped'
+        except Exception as e:
+            self.error = f"{type(e).__name__}: {str(e)}"
+            self.state = 'error'
+        finally:
+            if self._observer is not None:
+                self._observer.stop()
+                self._observer.join()
+            if self._cache is not None:
+                self._cache.close()
+
+    def _poll(self, root: str):
+        """Varredura incremental: marca os arquivos novos, alterados e removidos desde a anterior"""
+        files, dir_mtimes, _, _, _ = scan_incremental(root, self.recursive, self._snapshots.get(root), filters=self.filters)
+        self._snapshots[root] = build_snapshot(root, self.recursive, dir_mtimes, files)
+        seen = set()
+        for file_info in files:
+            path = file_info.path
+            seen.add(path)
+            record = self._records.get(path)
+            if record is None or (record.size, record.modified_time) != (file_info.size, file_info.modified_time) \
+                    or not inode_matches(record.inode, file_info.inode):
+                self.notify(path)
+        prefix = os.path.join(root, "")
+        for path in [path for path in self._records if path.startswith(prefix) and path not in seen]:
+            self.notify(path)
+
+    def _process_pending(self):
+        """Processa os caminhos sem eventos há 'debounce' segundos e com tamanho e data estáveis"""
+        now = time.monotonic()
+        with self._lock:
+            due = [(path, entry[1]) for path, entry in self._pending.items() if now - entry[0] >= self.debounce]
+        for path, signature in due:
+            try:
+                file_stat = os.stat(path)
+            except OSError:
+                file_stat = None
+            current = (file_stat.st_size, file_stat.st_mtime_ns) if file_stat is not None else None
+            with self._lock:
+                entry = self._pending.get(path)
+                if entry is None or entry[1] != signature:
+                    continue  # novo evento no meio do caminho
+                if current != signature:
+                    # Ainda sendo gravado: espera mais um intervalo
+                    self._pending[path] = [time.monotonic(), current]
+                    continue
+                del self._pending[path]
+            self.stats['processed'] += 1
+            if file_stat is None:
+                self._remove_path(path)
+            elif stat.S_ISDIR(file_stat.st_mode):
+                self._add_directory(path)
+            elif stat.S_ISREG(file_stat.st_mode):
+                self._update_file(path, file_stat)
+
+    def _accepts(self, path: str, size: Optional[int] = None) -> bool:
+        """Se o arquivo está numa das pastas monitoradas e passa pelos filtros"""
+        for root in self.roots:
+            prefix = os.path.join(root, "")
+            if path.startswith(prefix):
+                parts = path[len(prefix):].replace(os.sep, '/').split('/')
+                if not self.recursive and len(parts) > 1:
+                    return False
+                if self.filters is None:
+                    return True
+                for i in range(len(parts) - 1):
+                    if not self.filters.accepts_dir(parts[i], '/'.join(parts[:i + 1])):
+                        return False
+                return self.filters.accepts_name(parts[-1], '/'.join(parts)) and \
+                    (size is None or self.filters.accepts_size(size))
+        return False
+
+    def _add_directory(self, path: str):
+        """Pasta criada ou movida para dentro: os arquivos dela não geram eventos próprios"""
+        for file_info in scan_files(path, self.recursive):
+            try:
+                self._update_file(file_info.path, os.stat(file_info.path))
+            except OSError:
+                continue
+
+    def _remove_path(self, path: str):
+        """Arquivo removido, ou pasta removida (todos os arquivos dentro dela)"""
+        prefix = os.path.join(path, "")
+        with self._lock:
+            records = [record for record_path, record in self._records.items()
+                       if record_path == path or record_path.startswith(prefix)]
+            for record in records:
+                self._remove_record(record)
+
+    def _update_file(self, path: str, file_stat: os.stat_result):
+        with self._lock:
+            old = self._records.get(path)
+            if old is not None:
+                if (old.size, old.modified_time) == (file_stat.st_size, file_stat.st_mtime) \
+                        and inode_matches(old.inode, file_stat.st_ino):
+                    return
+                self._remove_record(old)
+            if not self._accepts(path, file_stat.st_size):
+                return
+            record = FileRecord(sys.intern(os.path.dirname(path)), os.path.basename(path),
+                                file_stat.st_size, file_stat.st_mtime, file_stat.st_ino)
+            same_size = list(self._by_size.get(record.size, {}).values())
+
+        # Hash só com colisão de tamanho: do arquivo novo e dos que ainda não o tinham
+        if same_size:
+            for file_info in [record] + [other for other in same_size if other.hash is None]:
+                file_info.hash = self._hash(file_info)
+
+        with self._lock:
+            for other in same_size:
+                if other.hash is not None and self._records.get(other.path) is other:
+                    self._by_digest.setdefault((other.size, other.hash), {})[other.path] = other
+            self._add_record(record)
+            members = self._by_digest.get((record.size, record.hash)) if record.hash is not None else None
+            if not members or len(members) < 2:
+                return
+            group = DuplicateGroup(record.hash, record.size, self.algorithm, list(members.values()))
+        self.stats['duplicates'] += 1
+        original = next(member for member in group.members if member is not record)
+        self._emit('duplicate', path=path, original=original.path, hash=record.hash, size=record.size,
+                   copies=len(group.members) - 1)
+
+    def _hash(self, file_info: FileRecord) -> Optional[str]:
+        if self._cache is not None:
+            cached = self._cache.get(file_info, 'full', self.algorithm)
+            if cached:
+                return cached
+        try:
+            digest = calculate_hash(file_info.path, self.algorithm)
+        except OSError as e:
+            self.stats['read_errors'] += 1
+            self._emit('error', path=file_info.path, message=f"{type(e).__name__}: {str(e)}")
+            return None
+        self.stats['hashed'] += 1
+        self.stats['bytes_hashed'] += file_info.size
+        if self._cache is not None:
+            self._cache.put(file_info, 'full', digest, self.algorithm)
+            self._cache.flush()
+        return digest
+
+    def _add_record(self, record: FileRecord):
+        """Inclui o registro nos índices (com o lock)"""
+        path = record.path
+        self._records[path] = record
+        self._by_size.setdefault(record.size, {})[path] = record
+        if record.hash is not None:
+            self._by_digest.setdefault((record.size, record.hash), {})[path] = record
+        self.stats['files'] = len(self._records)
+
+    def _remove_record(self, record: FileRecord):
+        """Retira o registro dos índices (com o lock); um grupo que fica com um arquivo gera 'resolved'"""
+        path = record.path
+        del self._records[path]
+        same_size = self._by_size[record.size]
+        del same_size[path]
+        if not same_size:
+            del self._by_size[record.size]
+        self.stats['files'] = len(self._records)
+        if record.hash is None:
+            return
+        key = (record.size, record.hash)
+        members = self._by_digest.get(key, {})
+        members.pop(path, None)
+        if not members:
+            self._by_digest.pop(key, None)
+        elif len(members) == 1:
+            self._emit('resolved', path=path, remaining=next(iter(members)), hash=record.hash)